@@ -0,0 +1,550 @@
+"""
+Analytics storage for SchemeAssist AI Backend
+Append-only JSON Lines logs partitioned by hour, fed by in-memory buffers
+that are flushed in batches: Web Vitals and client errors reported by the
+frontend, and a rolling log of recommendation and search requests
+"""
+
+import os
+import re
+import json
+import math
+import time
+import atexit
+import random
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from flask import g, has_request_context
+
+from storage import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the analytics partitions
+ANALYTICS_DIR = os.environ.get('ANALYTICS_DIR', os.path.join(os.path.dirname(__file__), 'analytics'))
+
+# Seconds events wait in memory before a batch is written
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', '2'))
+
+# Buffered events that trigger an immediate flush
+ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', '500'))
+
+# Buffered events per process beyond which new events are dropped
+ANALYTICS_MAX_BUFFER = int(os.environ.get('ANALYTICS_MAX_BUFFER', '10000'))
+
+# Days of partitions kept on disk
+ANALYTICS_RETENTION_DAYS = int(os.environ.get('ANALYTICS_RETENTION_DAYS', '30'))
+
+# Example events kept per error fingerprint and flush window
+ERROR_SAMPLES_PER_FINGERPRINT = 3
+
+# Largest accepted analytics request body (bytes)
+ANALYTICS_MAX_BYTES = 16 * 1024
+
+# Upper bounds for plausible Web Vitals (ms, ms, unitless)
+VITAL_LIMITS = {'LCP': 120000, 'FID': 60000, 'CLS': 100}
+
+CONNECTION_TYPES = ('slow-2g', '2g', '3g', '4g')
+
+# Record recommendation and search requests (set to 0 to disable)
+REQUEST_ANALYTICS = os.environ.get('REQUEST_ANALYTICS', '1') == '1'
+
+# (upper limit, label) pairs for annual income; the last band is open-ended
+INCOME_BANDS = [(100000, '<1L'), (250000, '1L-2.5L'), (500000, '2.5L-5L'), (1000000, '5L-10L'), (None, '10L+')]
+
+# Request record fields that queries can group by
+REQUEST_DIMENSIONS = ('endpoint', 'state', 'category', 'caste', 'income_band', 'status', 'hour')
+
+_buffers = []
+
+
+class PartitionedLog:
+    """
+    Append-only JSON Lines log split into one file per hour
+
+    Records carry a 'ts' (epoch seconds) that picks their partition.
+    Batches are appended under a cross-process file lock, and queries only
+    open the partitions overlapping the requested window.
+    """
+
+    def __init__(self, directory, name, retention_days=None):
+        self.directory = directory
+        self.name = name
+        self.retention_days = ANALYTICS_RETENTION_DAYS if retention_days is None else retention_days
+        self._last_prune = 0.0
+
+    def _partition(self, ts):
+        return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y%m%d%H')
+
+    def _path(self, partition):
+        return os.path.join(self.directory, f"{self.name}-{partition}.jsonl")
+
+    def append(self, records):
+        """Append a batch of records, one write per partition"""
+        by_partition = {}
+        for record in records:
+            by_partition.setdefault(self._partition(record['ts']), []).append(
+                json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(os.path.join(self.directory, f".{self.name}.lock")):
+            for partition, lines in by_partition.items():
+                with open(self._path(partition), 'a', encoding='utf-8') as f:
+                    f.write(''.join(lines))
+
+        if time.time() - self._last_prune > 3600:
+            self._last_prune = time.time()
+            self.prune()
+
+    def partitions(self, since=None, until=None):
+        """List the partition files overlapping [since, until], oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        first = self._partition(since) if since is not None else ''
+        last = self._partition(until) if until is not None else '9999999999'
+        pattern = re.compile(rf"^{re.escape(self.name)}-(\d{{10}})\.jsonl$")
+        found = []
+        for filename in os.listdir(self.directory):
+            match = pattern.match(filename)
+            if match and first <= match.group(1) <= last:
+                found.append((match.group(1), os.path.join(self.directory, filename)))
+        return [path for _, path in sorted(found)]
+
+    def iter_records(self, since=None, until=None):
+        """Yield the records with since <= ts <= until, streaming partition by partition"""
+        for path in self.partitions(since, until):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a partial line from a crashed writer
+                    if (since is None or record['ts'] >= since) and (until is None or record['ts'] <= until):
+                        yield record
+
+    def prune(self):
+        """Delete partitions older than the retention period"""
+        if not self.retention_days:
+            return
+        for path in self.partitions(until=time.time() - self.retention_days * 86400 - 3600):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Error pruning {path}: {str(e)}")
+
+
+class EventBuffer:
+    """
+    In-memory buffer handing events to a writer in batches
+
+    Flushes after flush_interval seconds, or right away on the timer thread
+    once batch_size events are waiting, so add() never writes. Beyond
+    max_buffer events (writer down or too slow) new events are dropped and
+    counted instead of growing memory.
+    """
+
+    def __init__(self, name, writer, flush_interval=None, batch_size=None, max_buffer=None):
+        self.name = name
+        self.writer = writer
+        self.flush_interval = ANALYTICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.batch_size = ANALYTICS_BATCH_SIZE if batch_size is None else batch_size
+        self.max_buffer = ANALYTICS_MAX_BUFFER if max_buffer is None else max_buffer
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._metrics = {'accepted': 0, 'dropped': 0, 'written': 0, 'batches': 0, 'errors': 0}
+        _buffers.append(self)
+
+    def add(self, event):
+        """Buffer an event; returns False if it was dropped"""
+        with self._lock:
+            if len(self._events) >= self.max_buffer:
+                self._metrics['dropped'] += 1
+                return False
+            self._events.append(event)
+            self._metrics['accepted'] += 1
+            self._schedule_flush(0 if len(self._events) >= self.batch_size else None)
+        return True
+
+    def flush(self):
+        """Write the buffered events"""
+        with self._flush_lock:
+            with self._lock:
+                events = self._drain()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not events:
+                return
+            try:
+                self.writer(events)
+            except Exception as e:
+                logger.error(f"Error writing {len(events)} {self.name} events: {str(e)}")
+                with self._lock:
+                    self._metrics['errors'] += 1
+                    self._metrics['dropped'] += len(events)
+                return
+            with self._lock:
+                self._metrics['written'] += len(events)
+                self._metrics['batches'] += 1
+
+    def _drain(self):
+        # Called with the lock held: take the batch to write
+        events, self._events = self._events, []
+        return events
+
+    def _schedule_flush(self, delay=None):
+        # Called with the lock held; the batch is written on the timer thread, never the caller's
+        delay = self.flush_interval if delay is None else delay
+        if self._timer is not None:
+            if delay > 0 or self._timer.interval == 0:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stats(self):
+        """Get buffer counters"""
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['buffered'] = len(self._events)
+        return stats
+
+
+def flush_all_buffers():
+    """Flush every event buffer in this process"""
+    for buffer in list(_buffers):
+        try:
+            buffer.flush()
+        except Exception as e:
+            logger.error(f"Error flushing {buffer.name} events on shutdown: {str(e)}")
+
+
+atexit.register(flush_all_buffers)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+# --- Web Vitals ---
+
+vitals_log = PartitionedLog(ANALYTICS_DIR, 'vitals')
+vitals_buffer = EventBuffer('vitals', vitals_log.append)
+
+
+def page_path(value):
+    """Reduce a page URL to its path (no host, query or fragment)"""
+    path = urlsplit(str(value or '')).path or '/'
+    return path[:200]
+
+
+def parse_vitals(data, referrer=None):
+    """
+    Build a Web Vitals record from a performance-monitor payload
+
+    Accepts the frontend's {"coreWebVitals": {...}, "page", "connection"}
+    shape; implausible or non-numeric values are left out.
+
+    Returns:
+        dict: ts, page, connection and the valid vitals
+
+    Raises:
+        ValueError: If the payload holds no usable vital
+    """
+    vitals = data.get('coreWebVitals') or data.get('vitals') or {}
+    if not isinstance(vitals, dict):
+        raise ValueError("coreWebVitals must be an object")
+
+    record = {
+        'ts': time.time(),
+        'page': page_path(data.get('page') or data.get('url') or referrer),
+        'connection': data.get('connection') if data.get('connection') in CONNECTION_TYPES else 'unknown'
+    }
+    for name, limit in VITAL_LIMITS.items():
+        value = vitals.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and math.isfinite(value) and 0 <= value <= limit:
+            record[name] = round(value, 4)
+    if not any(name in record for name in VITAL_LIMITS):
+        raise ValueError("No valid LCP, FID or CLS value")
+    return record
+
+
+def vitals_percentiles(hours=24, group_by='page', page=None, now=None):
+    """
+    Aggregate Web Vitals over a time window
+
+    Args:
+        hours (float): Window length ending now
+        group_by (str): page, connection or all
+        page (str): Only include this page
+
+    Returns:
+        dict: group -> {count, LCP/FID/CLS -> {p50, p75, p95}}
+    """
+    if group_by not in ('page', 'connection', 'all'):
+        raise ValueError("by must be one of page, connection, all")
+    now = time.time() if now is None else now
+    groups = {}
+    for record in vitals_log.iter_records(since=now - hours * 3600, until=now):
+        if page is not None and record.get('page') != page:
+            continue
+        key = 'all' if group_by == 'all' else record.get(group_by, 'unknown')
+        group = groups.setdefault(key, {'count': 0, 'values': {name: [] for name in VITAL_LIMITS}})
+        group['count'] += 1
+        for name in VITAL_LIMITS:
+            if name in record:
+                group['values'][name].append(record[name])
+
+    result = {}
+    for key, group in groups.items():
+        summary = {'count': group['count']}
+        for name, values in group['values'].items():
+            values.sort()
+            summary[name] = {
+                'samples': len(values),
+                'p50': percentile(values, 0.50),
+                'p75': percentile(values, 0.75),
+                'p95': percentile(values, 0.95)
+            }
+        result[key] = summary
+    return result
+
+
+# --- Client errors ---
+
+error_log = PartitionedLog(ANALYTICS_DIR, 'errors')
+
+
+def error_fingerprint(event):
+    """
+    Identify an error independently of the values inside its message
+
+    Numbers and hex ids in the message are masked, so "Item 12 failed" and
+    "Item 13 failed" share a fingerprint.
+    """
+    message = re.sub(r'0x[0-9a-f]+|[0-9a-f]{8,}|\d+', 'N', str(event.get('message', ''))[:500], flags=re.I)
+    parts = [str(event.get('type', '')), message, str(event.get('source', '')), str(event.get('line', '')),
+             str(event.get('status', ''))]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class ErrorAggregator(EventBuffer):
+    """
+    Buffer deduplicating client errors by fingerprint between flushes
+
+    Each flush writes one record per fingerprint with its count and a
+    reservoir sample of up to ERROR_SAMPLES_PER_FINGERPRINT full events,
+    so an error storm costs a counter increment per report. max_buffer
+    bounds the number of distinct fingerprints held.
+    """
+
+    def __init__(self, log, flush_interval=None, max_buffer=None, samples=ERROR_SAMPLES_PER_FINGERPRINT):
+        super().__init__('errors', log.append, flush_interval=flush_interval, max_buffer=max_buffer)
+        self.samples = samples
+        self._groups = {}
+
+    def add(self, event):
+        """Count an error event; returns its fingerprint, or None if it was dropped"""
+        fingerprint = error_fingerprint(event)
+        now = time.time()
+        sample = {key: event.get(key) for key in ('url', 'userAgent', 'timestamp') if event.get(key)}
+        with self._lock:
+            group = self._groups.get(fingerprint)
+            if group is None:
+                if len(self._groups) >= self.max_buffer:
+                    self._metrics['dropped'] += 1
+                    return None
+                group = self._groups[fingerprint] = {
+                    'fingerprint': fingerprint,
+                    'type': event.get('type'),
+                    'message': str(event.get('message', ''))[:500],
+                    'source': event.get('source'),
+                    'line': event.get('line'),
+                    'status': event.get('status'),
+                    'count': 0,
+                    'first_seen': now,
+                    'samples': []
+                }
+            self._metrics['accepted'] += 1
+            group['count'] += 1
+            group['last_seen'] = now
+            if len(group['samples']) < self.samples:
+                group['samples'].append(sample)
+            else:
+                slot = random.randrange(group['count'])
+                if slot < self.samples:
+                    group['samples'][slot] = sample
+            self._schedule_flush()
+        return fingerprint
+
+    def _drain(self):
+        groups, self._groups = self._groups, {}
+        for group in groups.values():
+            group['ts'] = group['last_seen']
+        return list(groups.values())
+
+    def stats(self):
+        """Get buffer counters"""
+        stats = super().stats()
+        with self._lock:
+            stats['buffered'] = len(self._groups)
+        return stats
+
+
+error_aggregator = ErrorAggregator(error_log)
+
+
+def parse_error(data):
+    """Validate a client error report (error-boundary.js payload)"""
+    if not data.get('type') and not data.get('message'):
+        raise ValueError("type or message is required")
+    event = {key: data.get(key) for key in ('type', 'message', 'source', 'line', 'column', 'status', 'userAgent',
+                                            'timestamp')}
+    event['url'] = page_path(data.get('url'))
+    return event
+
+
+def top_errors(hours=24, limit=20, now=None):
+    """
+    Merge error records over a time window
+
+    Returns:
+        list: Fingerprints with total count, first/last seen and samples, most frequent first
+    """
+    now = time.time() if now is None else now
+    merged = {}
+    for record in error_log.iter_records(since=now - hours * 3600, until=now):
+        current = merged.get(record['fingerprint'])
+        if current is None:
+            merged[record['fingerprint']] = dict(record)
+            continue
+        current['count'] += record['count']
+        current['first_seen'] = min(current['first_seen'], record['first_seen'])
+        current['last_seen'] = max(current['last_seen'], record['last_seen'])
+        current['samples'] = (current['samples'] + record['samples'])[-ERROR_SAMPLES_PER_FINGERPRINT:]
+    ranked = sorted(merged.values(), key=lambda record: record['count'], reverse=True)[:limit]
+    for record in ranked:
+        record.pop('ts', None)
+    return ranked
+
+
+def analytics_stats():
+    """Get ingest counters per stream"""
+    return {buffer.name: buffer.stats() for buffer in _buffers}
+
+
+# --- Request analytics ---
+
+request_log = PartitionedLog(ANALYTICS_DIR, 'requests')
+request_buffer = EventBuffer('requests', request_log.append)
+
+
+def income_band(income):
+    """Map an annual income to its INCOME_BANDS label ('any' if unknown)"""
+    try:
+        income = int(income)
+    except (TypeError, ValueError):
+        return 'any'
+    for limit, label in INCOME_BANDS:
+        if limit is None or income < limit:
+            return label
+
+
+def note_request(endpoint, profile, results=None):
+    """
+    Describe the current request's profile segment; it is recorded with
+    its latency and status once the response is ready
+
+    Args:
+        endpoint (str): recommend or search
+        profile (dict): state, category, caste_category and income (missing values become 'any')
+        results (int): Number of results, if known (not for streamed responses)
+    """
+    if not REQUEST_ANALYTICS or not has_request_context():
+        return
+    g.request_segment = {
+        'endpoint': endpoint,
+        'state': str(profile.get('state') or 'any').strip().title()[:50],
+        'category': str(profile.get('category') or 'any')[:50],
+        'caste': str(profile.get('caste_category') or 'any')[:20],
+        'income_band': income_band(profile.get('income')),
+        'results': results
+    }
+
+
+def install_request_analytics(app):
+    """Record the requests described with note_request, with their latency"""
+    @app.before_request
+    def _start_request_analytics():
+        g.request_analytics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_analytics(response):
+        segment = g.pop('request_segment', None)
+        started = g.get('request_analytics_started')
+        if segment is not None and started is not None:
+            segment['ts'] = round(time.time(), 3)
+            segment['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            segment['status'] = response.status_code
+            request_buffer.add(segment)
+        return response
+
+
+def request_aggregates(hours=24, group_by=('state',), endpoint=None, limit=50, now=None):
+    """
+    Aggregate recorded requests over a time window
+
+    Args:
+        hours (float): Window length ending now
+        group_by (tuple): Fields from REQUEST_DIMENSIONS ('hour' buckets by UTC hour)
+        endpoint (str): Only include this endpoint
+        limit (int): Largest groups returned
+
+    Returns:
+        dict: total request count and groups with count, share, mean
+            results and p50/p95 latency, largest first
+    """
+    unknown = [field for field in group_by if field not in REQUEST_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"by must be taken from {', '.join(REQUEST_DIMENSIONS)}")
+    now = time.time() if now is None else now
+    groups = {}
+    total = 0
+    for record in request_log.iter_records(since=now - hours * 3600, until=now):
+        if endpoint is not None and record.get('endpoint') != endpoint:
+            continue
+        total += 1
+        key = tuple(
+            datetime.fromtimestamp(record['ts'], timezone.utc).strftime('%Y-%m-%dT%H:00Z') if field == 'hour'
+            else record.get(field) for field in group_by
+        )
+        group = groups.setdefault(key, {'latencies': [], 'results': 0, 'counted': 0})
+        group['latencies'].append(record['latency_ms'])
+        if record.get('results') is not None:
+            group['results'] += record['results']
+            group['counted'] += 1
+
+    ranked = sorted(groups.items(), key=lambda item: len(item[1]['latencies']), reverse=True)[:limit]
+    result = []
+    for key, group in ranked:
+        latencies = sorted(group['latencies'])
+        result.append(dict(
+            zip(group_by, key),
+            count=len(latencies),
+            share=round(len(latencies) / total, 4),
+            mean_results=round(group['results'] / group['counted'], 2) if group['counted'] else None,
+            p50_ms=percentile(latencies, 0.50),
+            p95_ms=percentile(latencies, 0.95)
+        ))
+    return {'total': total, 'groups': result}
@@ -1,27 +1,54 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, send_file, stream_with_context
 from flask_cors import CORS
-from recommender import recommend_schemes, get_scheme_details, compare_schemes, search_schemes, get_scheme_statistics
+from werkzeug.middleware.proxy_fix import ProxyFix
+from recommender import (get_scheme_details, recommend_schemes, compare_schemes, get_scheme_statistics, get_catalog, get_catalog_version,
+                         loaded_catalog, recommendation_delta, DELTA_FIELDS,
+                         iter_recommendation_matches, iter_search_matches, CATALOG_PATH)
+from http_cache import conditional
+from serializers import (response_format, requested_fields, project, ndjson_response, scheme_list_response, fragment_encoder,
+                         recommendation_fragment, recommendation_record, scheme_fragment, scheme_record)
+from exporter import (EXPORT_FORMATS, EXPORT_BACKGROUND_BYTES, export_columns, export_filename, iter_export,
+                      iter_export_rows, export_file_path, prefetch_rows)
+from jobs import JobQueue, register_job, job_kinds
+from warm_cache import (WARM_CACHE_CHECK_INTERVAL, build_cache_profile, compute_entry, is_fresh, claim_catalog_change,
+                        chunks as warm_cache_chunks)
+from analytics import (ANALYTICS_MAX_BYTES, ANALYTICS_RETENTION_DAYS, vitals_buffer, error_aggregator, parse_vitals,
+                       parse_error, vitals_percentiles, top_errors, analytics_stats, install_request_analytics,
+                       request_buffer, request_aggregates)
+from alerts import generate_alerts
+from singleflight import SingleFlight, canonical_key
+from parallel_scoring import ranked_matches, parallel_scoring_stats
+from ratelimit import (TRUSTED_PROXY_HOPS, INGEST_RATE_LIMIT_RATE, INGEST_RATE_LIMIT_BURST, MAX_TRACKED_CLIENTS,
+                       admission_control, admission_stats, set_user_resolver)
+from metrics import (registry as metrics_registry, install_metrics, metrics_response, server_timing,
+                     debug_timings)
+from timing import stage
+from logconfig import configure_logging, log_stats
+from utils import log_request, build_user_profile
+from profiling import PROFILE_HEADER, profiled, is_authorized, list_profiles, profile_path
+from storage import (load_json_file, save_json_file, readonly_items, read_cache_stats, ShardedJSONBackend,
+                     WriteBehindStore)
+import base64
+import binascii
+import csv
+import io
 import json
+import math
 import os
 import hashlib
 import secrets
 import logging
+import time
 import traceback
 from functools import wraps
 from datetime import datetime
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(os.path.dirname(__file__), 'app.log')),
-        logging.StreamHandler()
-    ]
-)
+# Logging is configured by the entrypoint (wsgi.py or __main__ below), not on import
 logger = logging.getLogger(__name__)
 
 # Storage for user data (in production, use a database)
-USERS_FILE = os.path.join(os.path.dirname(__file__), 'users.json')
+# Directory holding user data files (SCHEMEASSIST_STATE_DIR points load tests at a scratch copy)
+STATE_DIR = os.environ.get('SCHEMEASSIST_STATE_DIR', os.path.dirname(__file__))
+USERS_FILE = os.path.join(STATE_DIR, 'users.json')
 
 # Error handler decorator
 def handle_errors(f):
@@ -83,6 +110,32 @@ def load_users():
 def save_users(users):
     save_json_file(USERS_FILE, users)
 
+def find_user_by_token(users, token):
+    """Username holding a session token, or None; scans users without copying their records"""
+    if not token:
+        return None
+    for username, info in readonly_items(users):
+        if info.get('token') == token:
+            return username
+    return None
+
+# Session token -> username, re-checked against users.json on every use
+_token_users = {}
+
+def resolve_token_user(token):
+    """Username of a session token, for rate limiting; known sessions skip the users scan"""
+    users = load_users()
+    username = _token_users.get(token)
+    if username is not None and username in users and users[username].get('token') == token:
+        return username
+    _token_users.pop(token, None)
+    username = find_user_by_token(users, token)
+    if username is not None:
+        if len(_token_users) >= MAX_TRACKED_CLIENTS:
+            _token_users.clear()
+        _token_users[token] = username
+    return username
+
 def get_user_profile(username):
     users = load_users()
     return users.get(username, {}).get('profile', {})
@@ -104,6 +157,12 @@ app = Flask(__name__,
             static_folder=frontend_folder,
             static_url_path='')
 CORS(app)  # Enable CORS for frontend connection
+if TRUSTED_PROXY_HOPS:
+    # Take the client address from the X-Forwarded-For entries added by our own proxies only
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+install_metrics(app)
+install_request_analytics(app)
+set_user_resolver(resolve_token_user)
 
 @app.route('/api/register', methods=['POST'])
 @handle_errors
@@ -169,61 +228,120 @@ def login():
 def profile():
     token = request.headers.get('Authorization')
     users = load_users()
-    username = None
-    for user, info in users.items():
-        if info.get('token') == token:
-            username = user
-            break
+    username = find_user_by_token(users, token)
     if not username:
         response = jsonify({'success': False, 'message': 'Unauthorized'})
         response.status_code = 401
         return response
     if request.method == 'GET':
-        return jsonify({'success': True, 'profile': users[username].get('profile', {})})
+        profile_data = users[username].get('profile', {})
+        response = {'success': True, 'profile': profile_data}
+        # ?include=recommendations,alerts returns the precomputed results inline
+        include = {part.strip() for part in request.args.get('include', '').split(',')}
+        if include & {'recommendations', 'alerts'}:
+            response.update(warm_cache_response(username, profile_data, include))
+        return jsonify(response)
     elif request.method == 'POST':
         profile_data = request.get_json()
         users[username]['profile'] = profile_data
         save_users(users)
-        return jsonify({'success': True, 'message': 'Profile updated.'})
+        warming = build_cache_profile(profile_data) is not None and schedule_warm_cache([username])
+        return jsonify({'success': True, 'message': 'Profile updated.', 'warming': bool(warming)})
     # Always return a response for all code paths
     return jsonify({'success': False, 'message': 'Invalid request method.'}), 405
 
 # Storage for user data (in production, use a database)
-FAVORITES_FILE = os.path.join(os.path.dirname(__file__), 'user_favorites.json')
-APPLICATIONS_FILE = os.path.join(os.path.dirname(__file__), 'user_applications.json')
+FAVORITES_FILE = os.path.join(STATE_DIR, 'user_favorites.json')
+APPLICATIONS_FILE = os.path.join(STATE_DIR, 'user_applications.json')
 
-def load_json_file(filepath):
-    """Safely load JSON file with error handling"""
-    try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        logger.info(f"File {filepath} does not exist, returning empty dict")
-        return {}
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to decode JSON from {filepath}: {str(e)}")
-        return {}
-    except Exception as e:
-        logger.error(f"Error loading {filepath}: {str(e)}")
-        return {}
-
-def save_json_file(filepath, data):
-    """Safely save JSON file with error handling"""
+# Per-user shards; the single files above are still read for users not yet in a shard
+FAVORITES_SHARD_DIR = os.path.join(STATE_DIR, 'user_favorites')
+APPLICATIONS_SHARD_DIR = os.path.join(STATE_DIR, 'user_applications')
+
+# Write-behind stores: mutations are visible immediately, disk writes are coalesced
+favorites_store = WriteBehindStore(ShardedJSONBackend(FAVORITES_SHARD_DIR, legacy_file=FAVORITES_FILE))
+applications_store = WriteBehindStore(ShardedJSONBackend(APPLICATIONS_SHARD_DIR, legacy_file=APPLICATIONS_FILE))
+
+# Background jobs (exports, batch recommendations, alerts) shared by all worker processes
+job_queue = JobQueue()
+
+@app.before_request
+def _start_job_workers():
+    # Once per process; a no-op after the first request (and safe with preload)
+    job_queue.ensure_started()
+
+# Precomputed recommendations and alerts of registered users
+WARM_CACHE_DIR = os.path.join(STATE_DIR, 'warm_cache')
+warm_store = WriteBehindStore(ShardedJSONBackend(WARM_CACHE_DIR))
+_warm_cache_checked = {'at': 0.0}
+
+def refresh_warm_cache(username, profile_data):
+    """Recompute and store a user's cached results; None for incomplete profiles"""
+    entry = compute_entry(profile_data)
+    if entry is None:
+        return None
+    
+    def replace(record):
+        record.clear()
+        record.update(entry)
+        return True
+    
+    warm_store.mutate(username, replace, default_factory=dict)
+    return entry
+
+def schedule_warm_cache(usernames):
+    """Queue background refreshes; job workers bound how many run at once"""
+    jobs = [job_queue.submit('warm_cache', {'usernames': batch}, ttl=3600)
+            for batch in warm_cache_chunks(list(usernames))]
+    return len(jobs)
+
+@register_job('warm_cache')
+def run_warm_cache(payload, context):
+    """Refresh the cached results of payload.usernames that are missing or stale"""
+    users = load_users()
+    refreshed = 0
+    for username in payload['usernames']:
+        context.check_cancelled()
+        profile_data = users.get(username, {}).get('profile')
+        if not profile_data or is_fresh(warm_store.get(username), profile_data):
+            continue
+        if refresh_warm_cache(username, profile_data):
+            refreshed += 1
+    return {'users': len(payload['usernames']), 'refreshed': refreshed}
+
+def warm_cache_response(username, profile_data, include):
+    """Cached results for /api/profile, computed inline when missing or stale"""
+    entry = warm_store.get(username)
+    cache = 'hit'
+    if not is_fresh(entry, profile_data):
+        entry = refresh_warm_cache(username, profile_data)
+        cache = 'miss'
+    if entry is None:
+        return {'cache': 'incomplete_profile'}
+    
+    response = {'cache': cache, 'catalog_version': entry['catalog_version'],
+                'computed_at': datetime.utcfromtimestamp(entry['computed_at']).isoformat()}
+    if 'recommendations' in include:
+        response.update(recommendations=entry['recommendations'], count=len(entry['recommendations']),
+                        min_match_applied=entry['min_match_score'])
+    if 'alerts' in include:
+        response['alerts'] = entry['alerts']
+    return response
+
+@app.before_request
+def _check_warm_cache_catalog():
+    # When the catalog changes, one process schedules a refresh of every cached user
+    now = time.time()
+    if now - _warm_cache_checked['at'] < WARM_CACHE_CHECK_INTERVAL:
+        return
+    _warm_cache_checked['at'] = now
     try:
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Write to temporary file first
-        temp_filepath = filepath + '.tmp'
-        with open(temp_filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        # Rename to actual file (atomic operation)
-        os.replace(temp_filepath, filepath)
-        logger.debug(f"Successfully saved data to {filepath}")
-    except Exception as e:
-        logger.error(f"Error saving to {filepath}: {str(e)}")
-        raise
+        if claim_catalog_change(WARM_CACHE_DIR, get_catalog_version()):
+            usernames = [username for username, user in readonly_items(load_users()) if user.get('profile')]
+            logger.info(f"Catalog changed, refreshing cached results of {len(usernames)} users")
+            schedule_warm_cache(usernames)
+    except OSError as e:
+        logger.error(f"Error checking the catalog for the warm cache: {str(e)}")
 
 @app.route('/api')
 def api_info():
@@ -234,12 +352,20 @@ def api_info():
         "endpoints": {
             "health": "/api/health",
             "recommend": "/api/recommend",
+            "recommend_delta": "/api/recommend/delta",
             "compare": "/api/compare",
             "search": "/api/search",
             "statistics": "/api/statistics",
+            "scheme": "/api/scheme/<scheme_name>",
             "favorites": "/api/favorites",
+            "favorites_batch": "/api/favorites/batch",
             "applications": "/api/applications",
-            "export": "/api/export"
+            "applications_batch": "/api/applications/batch",
+            "export": "/api/export",
+            "jobs": "/api/jobs",
+            "analytics": "/api/analytics",
+            "log_error": "/api/log-error",
+            "metrics": "/api/metrics"
         }
     })
 
@@ -268,8 +394,57 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "ok", "message": "Civora Nexus Backend is running"})
 
+# Single-flight groups: identical concurrent requests share one computation
+recommend_flight = SingleFlight('recommend')
+search_flight = SingleFlight('search')
+statistics_flight = SingleFlight('statistics')
+
+def ranked_recommendation_matches(catalog, user_profile, min_match_score):
+    """Recommendation matches, best score first, shared by identical concurrent requests"""
+    def compute():
+        # Huge catalogs are scored in parallel shards (see parallel_scoring)
+        return tuple(ranked_matches(user_profile, min_match_score, catalog))
+    # Time spent waiting on another request's identical computation
+    with stage('coalesced'):
+        return recommend_flight.do(canonical_key(catalog.version, user_profile, min_match_score), compute)
+
+def shared_search_matches(catalog, search_query, filters):
+    """Search matches, shared by identical concurrent requests"""
+    def compute():
+        with stage('filter'):
+            return tuple(iter_search_matches(search_query, filters, catalog))
+    with stage('coalesced'):
+        return search_flight.do(canonical_key(catalog.version, search_query, filters), compute)
+
+def result_token(catalog_version, user_profile, min_match_score, count):
+    """
+    Encode the inputs of a recommendation result for /api/recommend/delta
+    
+    The token is self-contained, so no result state is kept on the server.
+    """
+    payload = canonical_key(catalog_version, user_profile, min_match_score, count)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def parse_result_token(token):
+    """
+    Decode a result token
+    
+    Returns:
+        tuple: (catalog_version, user_profile, min_match_score, count)
+    """
+    try:
+        payload = base64.urlsafe_b64decode(str(token) + '=' * (-len(str(token)) % 4))
+        catalog_version, profile, min_match_score, count = json.loads(payload)
+        return catalog_version, build_user_profile(profile), int(min_match_score), int(count)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid result token")
+
 @app.route('/api/recommend', methods=['POST'])
+@admission_control('recommend')
+@server_timing
+@profiled
 @handle_errors
+@conditional(get_catalog_version)
 def recommend():
     """Get scheme recommendations based on user profile"""
     data = request.get_json()
@@ -278,37 +453,114 @@ def recommend():
     if not data:
         raise ValueError("No data provided")
     
-    required_fields = ['state', 'income', 'category']
-    for field in required_fields:
-        if field not in data:
-            raise KeyError(field)
-        
-        # Create user profile with caste category support
-        user_profile = {
-            "state": data['state'],
-            "income": int(data['income']),
-            "category": data['category'],
-            "age": int(data.get('age', 30)) if data.get('age') else 30,
-            "caste_category": data.get('caste_category', 'General')
-        }
+    user_profile = build_user_profile(data)
         
     # Get minimum match score (default 95 for 95-100% matches)
     min_match_score = int(data.get('min_match_score', 95))
     
-    # Get recommendations with minimum match filter
-    results = recommend_schemes(user_profile, min_match_score)
-    logger.info(f"Generated {len(results)} recommendations for state: {user_profile['state']}")
+    with stage('catalog'):
+        catalog = get_catalog()
+    fmt = response_format()
+    fields = requested_fields(data)
     
-    return jsonify({
+    # Streamed results are sent in catalog order as they are found
+    if fmt == 'ndjson':
+        log_request(user_profile, None)
+        return ndjson_response(iter_recommendation_matches(user_profile, min_match_score, catalog), {
+            "success": True,
+            "min_match_applied": min_match_score,
+            "user_caste_category": user_profile['caste_category']
+        }, encode=fragment_encoder(catalog, recommendation_fragment, recommendation_record, fields))
+    
+    # Get recommendations with minimum match filter, best score first
+    matches = ranked_recommendation_matches(catalog, user_profile, min_match_score)
+    log_request(user_profile, len(matches))
+    
+    envelope = {
         "success": True,
-        "count": len(results),
+        "count": len(matches),
         "min_match_applied": min_match_score,
         "user_caste_category": user_profile['caste_category'],
-        "schemes": results
-    })
+        "result_token": result_token(catalog.version, user_profile, min_match_score, len(matches)),
+        **debug_timings(data)
+    }
+    with stage('serialize'):
+        return scheme_list_response(fmt, envelope, "schemes", catalog, matches,
+                                    recommendation_fragment, recommendation_record, fields)
+
+
+@app.route('/api/recommend/delta', methods=['POST'])
+@admission_control('recommend_delta')
+@server_timing
+@profiled
+@handle_errors
+def recommend_delta():
+    """
+    Update a previous recommendation result after profile fields change
+    
+    Takes the result_token of a previous /api/recommend or delta response
+    and the changed fields, and returns only the schemes that enter or
+    leave the result and the score changes. When the catalog changed
+    since the token was issued, the full result is returned instead.
+    """
+    data = request.get_json()
+    if not data or 'result_token' not in data:
+        raise ValueError("result_token is required")
+    changes = data.get('changes')
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError("changes must be an object of profile fields")
+    unknown = sorted(set(changes) - set(DELTA_FIELDS))
+    if unknown:
+        raise ValueError(f"Unsupported fields: {', '.join(unknown)}")
+    
+    catalog_version, previous_profile, min_match_score, count = parse_result_token(data['result_token'])
+    user_profile = build_user_profile(dict(previous_profile, **changes))
+    fields = requested_fields(data)
+    with stage('catalog'):
+        catalog = get_catalog()
+    
+    if catalog.version != catalog_version:
+        matches = ranked_recommendation_matches(catalog, user_profile, min_match_score)
+        log_request(user_profile, len(matches), endpoint='recommend_delta')
+        with stage('serialize'):
+            return jsonify({
+                "success": True,
+                "full": True,
+                "count": len(matches),
+                "min_match_applied": min_match_score,
+                "result_token": result_token(catalog.version, user_profile, min_match_score, len(matches)),
+                "schemes": [project(recommendation_record(catalog, match), fields) for match in matches],
+                **debug_timings(data)
+            })
+    
+    with stage('filter'):
+        delta = recommendation_delta(previous_profile, user_profile, min_match_score, catalog)
+    count += len(delta['added']) - len(delta['removed'])
+    log_request(user_profile, count, endpoint='recommend_delta')
+    
+    with stage('serialize'):
+        return jsonify({
+            "success": True,
+            "full": False,
+            "count": count,
+            "min_match_applied": min_match_score,
+            "changed_fields": delta['fields'],
+            "result_token": result_token(catalog.version, user_profile, min_match_score, count),
+            "added": [project(recommendation_record(catalog, match), fields) for match in delta['added']],
+            "removed": [catalog.schemes[index].get("scheme_id", "") for index in delta['removed']],
+            "updated": [
+                {"scheme_id": catalog.schemes[index].get("scheme_id", ""), "score": score,
+                 "match_percentage": f"{score}%", "age_eligible": age_eligible, "caste_eligible": caste_eligible}
+                for index, score, age_eligible, caste_eligible in delta['updated']
+            ],
+            **debug_timings(data)
+        })
 
 
 @app.route('/api/compare', methods=['POST'])
+@admission_control('compare')
+@server_timing
+@profiled
 @handle_errors
 def compare():
     """Compare multiple schemes in detail"""
@@ -328,14 +580,20 @@ def compare():
     
     comparison_result = compare_schemes(scheme_names, user_profile)
     
-    return jsonify({
-        "success": True,
-        "comparison": comparison_result
-    })
+    with stage('serialize'):
+        return jsonify({
+            "success": True,
+            "comparison": comparison_result,
+            **debug_timings(data)
+        })
 
 
 @app.route('/api/search', methods=['POST'])
+@admission_control('search')
+@server_timing
+@profiled
 @handle_errors
+@conditional(get_catalog_version)
 def search():
     """Search schemes with filters"""
     data = request.get_json()
@@ -349,20 +607,39 @@ def search():
         'caste_category': data.get('caste_category')
     }
     
-    results = search_schemes(search_query, filters)
+    # Segment recorded in the request analytics (max_income stands in for the income)
+    segment = dict(filters, income=filters['max_income'])
     
-    return jsonify({
+    with stage('catalog'):
+        catalog = get_catalog()
+    fmt = response_format()
+    fields = requested_fields(data)
+    
+    if fmt == 'ndjson':
+        log_request(segment, None, 'search')
+        return ndjson_response(iter_search_matches(search_query, filters, catalog), {"success": True},
+                               encode=fragment_encoder(catalog, scheme_fragment, scheme_record, fields))
+    
+    matches = shared_search_matches(catalog, search_query, filters)
+    log_request(segment, len(matches), 'search')
+    
+    envelope = {
         "success": True,
-        "count": len(results),
-        "schemes": results
-    })
+        "count": len(matches),
+        **debug_timings(data)
+    }
+    with stage('serialize'):
+        return scheme_list_response(fmt, envelope, "schemes", catalog, matches,
+                                    scheme_fragment, scheme_record, fields)
 
 
 @app.route('/api/statistics', methods=['GET'])
+@profiled
 @handle_errors
+@conditional(get_catalog_version)
 def get_statistics():
     """Get scheme statistics and analytics"""
-    stats = get_scheme_statistics()
+    stats = statistics_flight.do(canonical_key(get_catalog_version()), get_scheme_statistics)
     
     return jsonify({
         "success": True,
@@ -370,15 +647,79 @@ def get_statistics():
     })
 
 
+def add_favorite(favorites, scheme_name):
+    """Add a scheme to a user's favorites list, returns True if it changed"""
+    if scheme_name in favorites:
+        return False
+    favorites.append(scheme_name)
+    return True
+
+def remove_favorite(favorites, scheme_name):
+    """Remove a scheme from a user's favorites list, returns True if it changed"""
+    if scheme_name not in favorites:
+        return False
+    favorites.remove(scheme_name)
+    return True
+
+def track_application(applications, data):
+    """Start tracking an application, returns True if it changed"""
+    scheme_name = data.get('scheme_name')
+    # Check if already exists
+    existing = next((app for app in applications if app['scheme_name'] == scheme_name), None)
+    if existing:
+        return False
+    applications.append({
+        "scheme_name": scheme_name,
+        "status": data.get('status', 'planned'),
+        "applied_date": data.get('applied_date', ''),
+        "notes": data.get('notes', '')
+    })
+    return True
+
+def update_application(applications, data):
+    """Update a tracked application, returns True if it changed"""
+    scheme_name = data.get('scheme_name')
+    status = data.get('status')
+    for app in applications:
+        if app['scheme_name'] == scheme_name:
+            if status:
+                app['status'] = status
+            if 'notes' in data:
+                app['notes'] = data['notes']
+            if 'applied_date' in data:
+                app['applied_date'] = data['applied_date']
+            return True
+    return False
+
+
+@app.route('/api/scheme/<path:scheme_name>', methods=['GET'])
+@handle_errors
+@conditional(get_catalog_version)
+def scheme_details(scheme_name):
+    """Get full details of a single scheme"""
+    details = get_scheme_details(scheme_name)
+    
+    if details is None:
+        return jsonify({
+            "success": False,
+            "error": "Not found",
+            "message": f"Scheme '{scheme_name}' was not found"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "scheme": details
+    })
+
+
 @app.route('/api/favorites', methods=['GET', 'POST', 'DELETE'])
 @handle_errors
 def manage_favorites():
     """Manage user favorite schemes"""
-    favorites = load_json_file(FAVORITES_FILE)
     user_id = request.args.get('user_id', 'default_user')
     
     if request.method == 'GET':
-        user_favorites = favorites.get(user_id, [])
+        user_favorites = favorites_store.get(user_id, [])
         return jsonify({
             "success": True,
             "favorites": user_favorites,
@@ -392,31 +733,24 @@ def manage_favorites():
         if not scheme_name:
             return jsonify({"error": "scheme_name is required"}), 400
         
-        if user_id not in favorites:
-            favorites[user_id] = []
-        
-        if scheme_name not in favorites[user_id]:
-            favorites[user_id].append(scheme_name)
-            save_json_file(FAVORITES_FILE, favorites)
+        user_favorites = favorites_store.mutate(user_id, lambda favs: add_favorite(favs, scheme_name))
         
         return jsonify({
             "success": True,
             "message": "Scheme added to favorites",
-            "favorites": favorites[user_id]
+            "favorites": user_favorites
         })
     
     elif request.method == 'DELETE':
         data = request.get_json()
         scheme_name = data.get('scheme_name')
         
-        if user_id in favorites and scheme_name in favorites[user_id]:
-            favorites[user_id].remove(scheme_name)
-            save_json_file(FAVORITES_FILE, favorites)
+        user_favorites = favorites_store.mutate(user_id, lambda favs: remove_favorite(favs, scheme_name))
         
         return jsonify({
             "success": True,
             "message": "Scheme removed from favorites",
-            "favorites": favorites.get(user_id, [])
+            "favorites": user_favorites
         })
     
     raise ValueError("Invalid request method")
@@ -426,11 +760,10 @@ def manage_favorites():
 @handle_errors
 def manage_applications():
     """Track scheme application status"""
-    applications = load_json_file(APPLICATIONS_FILE)
     user_id = request.args.get('user_id', 'default_user')
     
     if request.method == 'GET':
-        user_apps = applications.get(user_id, [])
+        user_apps = applications_store.get(user_id, [])
         return jsonify({
             "success": True,
             "applications": user_apps,
@@ -440,59 +773,361 @@ def manage_applications():
     elif request.method == 'POST':
         data = request.get_json()
         scheme_name = data.get('scheme_name')
-        status = data.get('status', 'planned')
         
         if not scheme_name:
             return jsonify({"error": "scheme_name is required"}), 400
         
-        if user_id not in applications:
-            applications[user_id] = []
-        
-        # Check if already exists
-        existing = next((app for app in applications[user_id] if app['scheme_name'] == scheme_name), None)
-        if not existing:
-            applications[user_id].append({
-                "scheme_name": scheme_name,
-                "status": status,
-                "applied_date": data.get('applied_date', ''),
-                "notes": data.get('notes', '')
-            })
-            save_json_file(APPLICATIONS_FILE, applications)
+        user_apps = applications_store.mutate(user_id, lambda apps: track_application(apps, data))
         
         return jsonify({
             "success": True,
             "message": "Application tracked",
-            "applications": applications[user_id]
+            "applications": user_apps
         })
     
     elif request.method == 'PUT':
         data = request.get_json()
-        scheme_name = data.get('scheme_name')
-        status = data.get('status')
         
-        if user_id in applications:
-            for app in applications[user_id]:
-                if app['scheme_name'] == scheme_name:
-                    if status:
-                        app['status'] = status
-                    if 'notes' in data:
-                        app['notes'] = data['notes']
-                    if 'applied_date' in data:
-                        app['applied_date'] = data['applied_date']
-                    break
-            save_json_file(APPLICATIONS_FILE, applications)
+        user_apps = applications_store.mutate(user_id, lambda apps: update_application(apps, data))
         
         return jsonify({
             "success": True,
             "message": "Application updated",
-            "applications": applications.get(user_id, [])
+            "applications": user_apps
         })
     
     raise ValueError("Invalid request method")
 
 
+# Limits for the batch endpoints
+BATCH_MAX_OPERATIONS = 500
+BATCH_MAX_USERS = 200
+
+def remove_application(applications, data):
+    """Stop tracking an application, returns True if it changed"""
+    scheme_name = data.get('scheme_name')
+    for app in applications:
+        if app['scheme_name'] == scheme_name:
+            applications.remove(app)
+            return True
+    return False
+
+FAVORITE_OPERATIONS = {
+    'add': lambda favs, op: add_favorite(favs, op['scheme_name']),
+    'remove': lambda favs, op: remove_favorite(favs, op['scheme_name'])
+}
+
+APPLICATION_OPERATIONS = {
+    'add': track_application,
+    'update': update_application,
+    'remove': remove_application
+}
+
+def parse_batch_operations(data, handlers, default_user_id):
+    """
+    Validate a batch request body and build store mutations
+
+    Every operation is checked before anything is applied, so one bad
+    entry rejects the whole batch.
+    """
+    if not data:
+        raise ValueError("No data provided")
+
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise ValueError(f'At most {BATCH_MAX_OPERATIONS} operations are allowed per batch')
+
+    mutations = []
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict):
+            raise ValueError(f'Operation {index} must be an object')
+        handler = handlers.get(op.get('op'))
+        if handler is None:
+            raise ValueError(f"Operation {index}: op must be one of {', '.join(handlers)}")
+        if not op.get('scheme_name'):
+            raise ValueError(f'Operation {index}: scheme_name is required')
+        user_id = op.get('user_id', default_user_id)
+        mutations.append((user_id, lambda records, handler=handler, op=op: handler(records, op)))
+    return mutations
+
+def parse_batch_user_ids():
+    """Read the comma-separated user_ids query parameter of a batch GET"""
+    user_ids = [uid.strip() for uid in request.args.get('user_ids', '').split(',') if uid.strip()]
+    if not user_ids:
+        raise ValueError('user_ids query parameter is required')
+    if len(user_ids) > BATCH_MAX_USERS:
+        raise ValueError(f'At most {BATCH_MAX_USERS} user_ids are allowed per request')
+    return user_ids
+
+
+@app.route('/api/favorites/batch', methods=['GET', 'POST'])
+@handle_errors
+def batch_favorites():
+    """Read favorites for many users, or apply many favorite changes in one write"""
+    if request.method == 'GET':
+        favorites = favorites_store.get_many(parse_batch_user_ids(), [])
+        return jsonify({
+            "success": True,
+            "favorites": favorites,
+            "count": len(favorites)
+        })
+
+    mutations = parse_batch_operations(request.get_json(), FAVORITE_OPERATIONS,
+                                       request.args.get('user_id', 'default_user'))
+    favorites = favorites_store.mutate_many(mutations)
+    logger.info(f"Applied batch of {len(mutations)} favorite operations for {len(favorites)} users")
+
+    return jsonify({
+        "success": True,
+        "message": "Favorites updated",
+        "applied": len(mutations),
+        "favorites": favorites
+    })
+
+
+@app.route('/api/applications/batch', methods=['GET', 'POST'])
+@handle_errors
+def batch_applications():
+    """Read applications for many users, or apply many application changes in one write"""
+    if request.method == 'GET':
+        applications = applications_store.get_many(parse_batch_user_ids(), [])
+        return jsonify({
+            "success": True,
+            "applications": applications,
+            "count": len(applications)
+        })
+
+    mutations = parse_batch_operations(request.get_json(), APPLICATION_OPERATIONS,
+                                       request.args.get('user_id', 'default_user'))
+    applications = applications_store.mutate_many(mutations)
+    logger.info(f"Applied batch of {len(mutations)} application operations for {len(applications)} users")
+
+    return jsonify({
+        "success": True,
+        "message": "Applications updated",
+        "applied": len(mutations),
+        "applications": applications
+    })
+
+
+@app.route('/api/coalescing/stats', methods=['GET'])
+def coalescing_stats():
+    """Single-flight metrics for the shared catalog computations"""
+    return jsonify({
+        "success": True,
+        "recommend": recommend_flight.stats(),
+        "search": search_flight.stats(),
+        "statistics": statistics_flight.stats()
+    })
+
+
+@app.route('/api/admission/stats', methods=['GET'])
+def admission_control_stats():
+    """Rate limiting and load shedding metrics for the expensive endpoints"""
+    return jsonify({
+        "success": True,
+        "endpoints": admission_stats()
+    })
+
+
+@app.route('/api/profiles', methods=['GET'])
+def stored_profiles():
+    """List the request profiles kept on disk (requires the profiling token)"""
+    if not is_authorized(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"success": False, "error": "Forbidden", "message": "Profiling token required"}), 403
+    return jsonify({"success": True, "profiles": list_profiles()})
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a stored .pstats profile (requires the profiling token)"""
+    if not is_authorized(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"success": False, "error": "Forbidden", "message": "Profiling token required"}), 403
+    path = profile_path(profile_id)
+    if path is None:
+        return jsonify({"success": False, "error": "Not found", "message": "Unknown profile"}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=os.path.basename(path))
+
+
+@app.route('/api/storage/stats', methods=['GET'])
+def storage_stats():
+    """Write coalescing and read cache metrics for the JSON stores"""
+    return jsonify({
+        "success": True,
+        "favorites": favorites_store.stats(),
+        "applications": applications_store.stats(),
+        "read_cache": read_cache_stats()
+    })
+
+
+
+# Service metrics sampled into every /api/metrics snapshot
+metrics_registry.describe('schemeassist_catalog_info', 'gauge', 'Catalog version loaded by a worker', aggregate='max')
+metrics_registry.describe('schemeassist_catalog_schemes', 'gauge', 'Schemes in the loaded catalog', aggregate='max')
+metrics_registry.describe('schemeassist_catalog_load_seconds', 'gauge', 'Time taken to parse the loaded catalog',
+                          aggregate='max')
+metrics_registry.describe('schemeassist_catalog_loaded_timestamp_seconds', 'gauge', 'When the loaded catalog was parsed',
+                          aggregate='max')
+metrics_registry.describe('schemeassist_read_cache_requests_total', 'counter', 'JSON read cache lookups by result')
+metrics_registry.describe('schemeassist_coalescing_calls_total', 'counter', 'Single-flight calls by group and outcome')
+metrics_registry.describe('schemeassist_store_mutations_total', 'counter', 'Mutations applied to write-behind stores')
+metrics_registry.describe('schemeassist_store_flushes_total', 'counter', 'Disk flushes of write-behind stores')
+metrics_registry.describe('schemeassist_log_records_total', 'counter', 'Log records by pipeline outcome')
+metrics_registry.describe('schemeassist_admission_rejected_total', 'counter',
+                          'Requests rejected by admission control by endpoint and reason')
+metrics_registry.describe('schemeassist_analytics_events_total', 'counter',
+                          'Frontend analytics events by stream and outcome')
+metrics_registry.describe('schemeassist_scoring_requests_total', 'counter',
+                          'Recommendation scoring runs by mode (serial, parallel, fallback)')
+metrics_registry.describe('schemeassist_jobs', 'gauge', 'Background jobs in the shared queue by status',
+                          aggregate='max')
+
+
+def collect_service_metrics():
+    """Sample catalog, cache, coalescing, scoring, store, admission, analytics and job counters"""
+    catalog = loaded_catalog()
+    if catalog is not None:
+        yield 'schemeassist_catalog_info', (('version', catalog.version),), 1
+        yield 'schemeassist_catalog_schemes', (), len(catalog.schemes)
+        yield 'schemeassist_catalog_load_seconds', (), catalog.load_seconds
+        yield 'schemeassist_catalog_loaded_timestamp_seconds', (), catalog.loaded_at
+
+    cache = read_cache_stats()
+    yield 'schemeassist_read_cache_requests_total', (('result', 'hit'),), cache['hits']
+    yield 'schemeassist_read_cache_requests_total', (('result', 'miss'),), cache['misses']
+
+    for flight in (recommend_flight, search_flight, statistics_flight):
+        stats = flight.stats()
+        yield 'schemeassist_coalescing_calls_total', (('group', flight.name), ('outcome', 'executed')), stats['executions']
+        yield 'schemeassist_coalescing_calls_total', (('group', flight.name), ('outcome', 'coalesced')), stats['coalesced']
+
+    scoring = parallel_scoring_stats()
+    for mode, key in (('serial', 'serial'), ('parallel', 'parallel'), ('fallback', 'fallbacks')):
+        yield 'schemeassist_scoring_requests_total', (('mode', mode),), scoring[key]
+
+    for name, store in (('favorites', favorites_store), ('applications', applications_store)):
+        stats = store.stats()
+        yield 'schemeassist_store_mutations_total', (('store', name),), stats['mutations']
+        yield 'schemeassist_store_flushes_total', (('store', name),), stats['flushes']
+
+    logs = log_stats()
+    for outcome in ('enqueued', 'dropped', 'sampled_out'):
+        yield 'schemeassist_log_records_total', (('outcome', outcome),), logs[outcome]
+
+    for endpoint, stats in admission_stats().items():
+        yield 'schemeassist_admission_rejected_total', (('endpoint', endpoint), ('reason', 'rate_limited')), stats['rate_limited']
+        yield 'schemeassist_admission_rejected_total', (('endpoint', endpoint), ('reason', 'shed')), stats['shed']
+
+    for stream, stats in analytics_stats().items():
+        for outcome in ('accepted', 'dropped'):
+            yield 'schemeassist_analytics_events_total', (('stream', stream), ('outcome', outcome)), stats[outcome]
+
+    for status, count in job_queue.stats().items():
+        yield 'schemeassist_jobs', (('status', status),), count
+
+
+metrics_registry.register_collector(collect_service_metrics)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request and service metrics of all workers in Prometheus text format"""
+    return metrics_response()
+
+# --- FRONTEND ANALYTICS ---
+
+def analytics_payload():
+    """Read a small JSON analytics body, whatever its content type (sendBeacon posts text/plain)"""
+    if (request.content_length or 0) > ANALYTICS_MAX_BYTES:
+        raise ValueError(f"Analytics payloads are limited to {ANALYTICS_MAX_BYTES} bytes")
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+
+def analytics_hours():
+    """Read the hours query argument of the summary endpoints, bounded by the partitions kept on disk"""
+    hours = float(request.args.get('hours', 24))
+    if not math.isfinite(hours) or not 0 < hours <= ANALYTICS_RETENTION_DAYS * 24:
+        raise ValueError(f"hours must be between 0 and {ANALYTICS_RETENTION_DAYS * 24}")
+    return hours
+
+
+@app.route('/api/analytics', methods=['POST'])
+@admission_control('analytics', rate=INGEST_RATE_LIMIT_RATE, burst=INGEST_RATE_LIMIT_BURST)
+@handle_errors
+def ingest_analytics():
+    """Record Web Vitals reported by performance-monitor.js (buffered, written in batches)"""
+    vitals_buffer.add(parse_vitals(analytics_payload(), request.referrer))
+    return '', 204
+
+
+@app.route('/api/log-error', methods=['POST'])
+@admission_control('log_error', rate=INGEST_RATE_LIMIT_RATE, burst=INGEST_RATE_LIMIT_BURST)
+@handle_errors
+def ingest_client_error():
+    """Record a client error reported by error-boundary.js, deduplicated by fingerprint"""
+    error_aggregator.add(parse_error(analytics_payload()))
+    return '', 204
+
+
+@app.route('/api/analytics/vitals', methods=['GET'])
+@handle_errors
+def analytics_vitals():
+    """
+    Web Vitals percentiles (p50/p75/p95 of LCP, FID and CLS)
+    
+    Query: hours (default 24), by=page|connection|all, page (optional filter)
+    """
+    vitals_buffer.flush()
+    hours = analytics_hours()
+    group_by = request.args.get('by', 'page')
+    return jsonify({
+        "success": True,
+        "hours": hours,
+        "by": group_by,
+        "groups": vitals_percentiles(hours, group_by, request.args.get('page'))
+    })
+
+
+@app.route('/api/analytics/errors', methods=['GET'])
+@handle_errors
+def analytics_errors():
+    """Most frequent client errors by fingerprint. Query: hours (default 24), limit (default 20)"""
+    error_aggregator.flush()
+    hours = analytics_hours()
+    return jsonify({
+        "success": True,
+        "hours": hours,
+        "errors": top_errors(hours, int(request.args.get('limit', 20))),
+        "ingest": analytics_stats()
+    })
+
+@app.route('/api/analytics/requests', methods=['GET'])
+@handle_errors
+def analytics_requests():
+    """
+    Recommendation and search traffic by profile segment
+    
+    Query: hours (default 24), by (comma-separated from endpoint, state,
+    category, caste, income_band, status, hour; default state), endpoint, limit
+    """
+    request_buffer.flush()
+    hours = analytics_hours()
+    group_by = tuple(field.strip() for field in request.args.get('by', 'state').split(',') if field.strip())
+    return jsonify({
+        "success": True,
+        "hours": hours,
+        "by": group_by,
+        **request_aggregates(hours, group_by, request.args.get('endpoint'), int(request.args.get('limit', 50)))
+    })
+
 # Storage for feedback data
-FEEDBACK_FILE = os.path.join(os.path.dirname(__file__), 'feedback.json')
+FEEDBACK_FILE = os.path.join(STATE_DIR, 'feedback.json')
 
 @app.route('/api/feedback', methods=['POST'])
 @handle_errors
@@ -537,22 +1172,218 @@ def submit_feedback():
 
 
 @app.route('/api/export', methods=['POST'])
+@admission_control('export')
 @handle_errors
 def export_data():
-    """Export recommendations in various formats"""
+    """
+    Export schemes in various formats
+    
+    With a 'profile' (recommendations) or 'query'/'filters' (search) the
+    rows are read from the catalog and streamed as a csv (default), jsonl
+    or xlsx download; large catalogs, or 'background': true, produce a
+    background export instead. A 'schemes' list is still accepted for
+    older clients, in its original json or csv format.
+    
+    The background decision looks at the catalog size on purpose: every
+    export scans the whole catalog, so a narrow filter costs as much time
+    as a full dump, and the result size is only known after the scan.
+    """
+    data = request.get_json()
+    if not data:
+        raise ValueError("No data provided")
+    
+    if 'schemes' in data:
+        return export_client_schemes(data['schemes'], data.get('format', 'json'))
+    
+    format_type = data.get('format', 'csv')
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    user_profile = build_user_profile(data['profile']) if data.get('profile') else None
+    query = data.get('query', '')
+    filters = data.get('filters')
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+    min_match_score = int(data.get('min_match_score', 0))
+    
+    if data.get('background') or os.path.getsize(CATALOG_PATH) > EXPORT_BACKGROUND_BYTES:
+        job = job_queue.submit('export', {
+            'format': format_type,
+            'filename': export_filename(format_type),
+            'profile': user_profile,
+            'query': query,
+            'filters': filters,
+            'min_match_score': min_match_score
+        })
+        logger.info(f"Started background export {job['id']} ({format_type})")
+        return jsonify({
+            "success": True,
+            "export": export_job_status(job),
+            "status_url": f"/api/export/{job['id']}"
+        }), 202
+    
+    rows = iter_export_rows(user_profile=user_profile, query=query, filters=filters,
+                            min_match_score=min_match_score)
+    columns = export_columns(user_profile is not None)
+    mimetype, _ = EXPORT_FORMATS[format_type]
+    return Response(
+        stream_with_context(iter_export(format_type, prefetch_rows(rows), columns)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{export_filename(format_type)}"'}
+    )
+
+
+@app.route('/api/export/<export_id>', methods=['GET'])
+@handle_errors
+def export_status(export_id):
+    """Get the status of a background export, or download it once finished"""
+    job = job_queue.get(export_id)
+    if job is None or job['kind'] != 'export':
+        return jsonify({"success": False, "error": "Not found", "message": "Unknown export"}), 404
+    
+    if job['status'] == 'done' and request.args.get('download'):
+        result = job['result']
+        mimetype, _ = EXPORT_FORMATS[result['format']]
+        return send_file(export_file_path(result), mimetype=mimetype, as_attachment=True,
+                         download_name=result['filename'])
+    
+    return jsonify({"success": True, "export": export_job_status(job)})
+
+
+def export_job_status(job):
+    """Describe an export job in the format of the original export status records"""
+    status = {
+        'export_id': job['id'],
+        'status': job['status'],
+        'format': job['payload']['format'],
+        'filename': job['payload'].get('filename'),
+        'created_at': datetime.utcfromtimestamp(job['created_at']).isoformat()
+    }
+    if job['status'] == 'done':
+        status.update(size=job['result']['size'], rows=job['result']['rows'],
+                      finished_at=datetime.utcfromtimestamp(job['finished_at']).isoformat())
+    if job['error']:
+        status['error'] = job['error']
+    return status
+
+
+# --- BACKGROUND JOBS ---
+
+# Profiles accepted by one recommend_batch or alerts job
+JOB_BATCH_MAX_PROFILES = int(os.environ.get('JOB_BATCH_MAX_PROFILES', '1000'))
+
+
+def _validate_batch_job(payload):
+    profiles = payload.get('profiles')
+    if not isinstance(profiles, list) or not profiles:
+        raise ValueError("payload.profiles must be a non-empty list")
+    if len(profiles) > JOB_BATCH_MAX_PROFILES:
+        raise ValueError(f"payload.profiles is limited to {JOB_BATCH_MAX_PROFILES} profiles")
+    for profile in profiles:
+        build_user_profile(profile)
+
+
+@register_job('recommend_batch', validate=_validate_batch_job, public=True)
+def run_recommend_batch(payload, context):
+    """Recommend schemes for each profile in payload.profiles"""
+    min_match_score = int(payload.get('min_match_score', 95))
+    results = []
+    for profile in payload['profiles']:
+        context.check_cancelled()
+        recommendations = recommend_schemes(build_user_profile(profile), min_match_score)
+        results.append({'profile': profile, 'count': len(recommendations), 'recommendations': recommendations})
+    return {'results': results}
+
+
+@register_job('alerts', validate=_validate_batch_job, public=True)
+def run_alerts_batch(payload, context):
+    """Generate alerts for each profile in payload.profiles"""
+    results = []
+    for profile in payload['profiles']:
+        context.check_cancelled()
+        results.append({'profile': profile, 'alerts': generate_alerts(build_user_profile(profile))})
+    return {'results': results}
+
+
+def job_response(job):
+    """Public view of a job: everything except the payload"""
+    def timestamp(value):
+        return datetime.utcfromtimestamp(value).isoformat() if value else None
+
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'cancel_requested': job['cancel_requested'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': timestamp(job['created_at']),
+        'started_at': timestamp(job['started_at']),
+        'finished_at': timestamp(job['finished_at']),
+        'expires_at': timestamp(job['expires_at'])
+    }
+
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+@admission_control('jobs')
+@handle_errors
+def jobs_endpoint():
+    """
+    Submit a background job, or list the job kinds and queue counts
+    
+    POST {"kind": "recommend_batch" | "alerts" | "export", "payload": {...}}
+    returns 202 with the queued job; poll /api/jobs/<id> for its result.
+    """
+    if request.method == 'GET':
+        return jsonify({"success": True, "kinds": job_kinds(public=True), "counts": job_queue.stats()})
+    
     data = request.get_json()
-    schemes = data.get('schemes', [])
-    format_type = data.get('format', 'json')
+    if not data:
+        raise ValueError("No data provided")
+    payload = data.get('payload') or {}
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be an object")
+    
+    if data.get('kind') not in job_kinds(public=True):
+        raise ValueError(f"kind must be one of {', '.join(job_kinds(public=True))}")
     
+    job = job_queue.submit(data['kind'], payload)
+    return jsonify({"success": True, "job": job_response(job), "status_url": f"/api/jobs/{job['id']}"}), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+@handle_errors
+def job_endpoint(job_id):
+    """Get a job's status and result, or cancel it (DELETE)"""
+    job = job_queue.cancel(job_id) if request.method == 'DELETE' else job_queue.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Not found", "message": "Unknown job"}), 404
+    return jsonify({"success": True, "job": job_response(job)})
+
+
+def export_client_schemes(schemes, format_type):
+    """Export a list of schemes posted by the client (original export format)"""
     if format_type == 'csv':
         # Create CSV formatted string
-        csv_data = "Scheme Name,Category,State,Benefit,Min Income,Max Income,Eligibility Score\n"
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(["Scheme Name", "Category", "State", "Benefit", "Min Income", "Max Income", "Eligibility Score"])
         for scheme in schemes:
-            csv_data += f'"{scheme.get("scheme_name", "")}","{scheme.get("category", "")}","{scheme.get("state", "")}","{scheme.get("benefit", "")}",{scheme.get("min_income", 0)},{scheme.get("max_income", 0)},{scheme.get("eligibility_score", 0)}\n'
+            writer.writerow([
+                scheme.get("scheme_name", ""),
+                scheme.get("category", ""),
+                scheme.get("state", ""),
+                scheme.get("benefit", ""),
+                scheme.get("min_income", 0),
+                scheme.get("max_income", 0),
+                scheme.get("eligibility_score", 0)
+            ])
         
         return jsonify({
             "success": True,
-            "data": csv_data,
+            "data": buffer.getvalue(),
             "format": "csv"
         })
     
@@ -597,6 +1428,7 @@ def internal_error(error):
 
 
 if __name__ == "__main__":
+    configure_logging()
     print("=== Civora Nexus Backend ===")
     print("Starting Flask server on http://localhost:5000")
     app.run(debug=True, port=5000)
@@ -0,0 +1,348 @@
+"""
+Export pipeline for SchemeAssist AI Backend
+Streams scheme rows from the catalog into CSV, JSONL or XLSX downloads
+and runs very large exports as background jobs
+"""
+
+import os
+import io
+import re
+import csv
+import json
+import logging
+import zipfile
+from datetime import datetime
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from recommender import iter_recommendations, iter_search_results
+from jobs import register_job
+
+logger = logging.getLogger(__name__)
+
+# Directory holding finished background exports
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports'))
+
+# Catalog size (bytes) above which exports run in the background by default; every
+# export scans the whole catalog, so this bounds request time whatever the filters
+EXPORT_BACKGROUND_BYTES = int(os.environ.get('EXPORT_BACKGROUND_BYTES', str(20 * 1024 * 1024)))
+
+# Rows buffered before a chunk is handed to the client
+EXPORT_CHUNK_ROWS = 500
+
+# (row key, column header) pairs written for every export
+EXPORT_COLUMNS = [
+    ('scheme_id', 'Scheme ID'),
+    ('scheme_name', 'Scheme Name'),
+    ('level', 'Level'),
+    ('state', 'State'),
+    ('category', 'Category'),
+    ('target_group', 'Target Group'),
+    ('benefits', 'Benefits'),
+    ('min_income', 'Min Income'),
+    ('max_income', 'Max Income'),
+    ('min_age', 'Min Age'),
+    ('max_age', 'Max Age'),
+    ('last_updated', 'Last Updated')
+]
+
+# Extra column for exports computed against a user profile
+SCORE_COLUMN = ('score', 'Eligibility Score')
+
+# Control characters that are not allowed in XML 1.0 documents
+_XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+NUMERIC_COLUMNS = {'min_income', 'max_income', 'min_age', 'max_age', 'score'}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx')
+}
+
+
+def export_columns(has_profile):
+    """Get the columns for an export, with the score column for profile exports"""
+    return EXPORT_COLUMNS + [SCORE_COLUMN] if has_profile else list(EXPORT_COLUMNS)
+
+
+def iter_export_rows(user_profile=None, query='', filters=None, min_match_score=0):
+    """
+    Yield catalog rows for an export
+
+    Args:
+        user_profile (dict): Export recommendations for this profile
+        query (str): Otherwise, export search results for this keyword
+        filters (dict): Search filters (state, category, income, caste)
+        min_match_score (int): Minimum score for profile exports
+
+    Returns:
+        generator: Scheme dicts
+    """
+    if user_profile:
+        return iter_recommendations(user_profile, min_match_score)
+    return iter_search_results(query, filters)
+
+
+def prefetch_rows(rows):
+    """
+    Read the first row eagerly so catalog errors are raised before a
+    streamed response has started
+    """
+    rows = iter(rows)
+    first = [row for row in [next(rows, None)] if row is not None]
+    return chain(first, rows)
+
+
+def _cell_value(row, key):
+    value = row.get(key, '')
+    if key in NUMERIC_COLUMNS and value not in ('', None):
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return value
+    return '' if value is None else value
+
+
+def iter_csv(rows, columns):
+    """Encode rows as CSV chunks using csv.writer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in columns])
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_cell_value(row, key) for key, _ in columns])
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(rows, columns):
+    """Encode rows as JSON Lines chunks"""
+    lines = []
+    for row in rows:
+        record = {key: _cell_value(row, key) for key, _ in columns}
+        lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    yield ''.join(lines).encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object collecting bytes for a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Schemes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+}
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(row_number, values):
+    cells = []
+    for index, value in enumerate(values):
+        ref = f"{_column_letter(index)}{row_number}"
+        if isinstance(value, int):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_INVALID_CHARS.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'.encode('utf-8')
+
+
+def iter_xlsx(rows, columns):
+    """
+    Encode rows as a single-sheet XLSX workbook, streamed chunk by chunk
+
+    Uses inline strings and zipfile's unseekable (data descriptor) mode,
+    so the workbook never has to be held in memory.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            workbook.writestr(name, content)
+        yield sink.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            sheet.write(_xlsx_row(1, [header for _, header in columns]))
+            for row_number, row in enumerate(rows, 2):
+                sheet.write(_xlsx_row(row_number, [_cell_value(row, key) for key, _ in columns]))
+                if row_number % EXPORT_CHUNK_ROWS == 0:
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'xlsx': iter_xlsx
+}
+
+
+def iter_export(format_type, rows, columns):
+    """
+    Encode export rows in the requested format
+
+    Args:
+        format_type (str): csv, jsonl or xlsx
+        rows (iterable): Scheme dicts
+        columns (list): (row key, header) pairs
+
+    Returns:
+        generator: Encoded byte chunks
+    """
+    if format_type not in EXPORT_WRITERS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_WRITERS)}")
+    return EXPORT_WRITERS[format_type](rows, columns)
+
+
+def export_filename(format_type):
+    """Build a download filename for an export"""
+    return f"schemes_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[format_type][1]}"
+
+
+# --- Background exports ---
+
+def _validate_export_job(payload):
+    if payload.get('format') not in EXPORT_WRITERS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_WRITERS)}")
+
+
+def _remove_export_file(result):
+    path = export_file_path(result)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def export_file_path(result):
+    """
+    Get the path of a finished background export
+
+    Args:
+        result (dict): Result of an export job
+
+    Returns:
+        str: Path under EXPORT_DIR, or None for an invalid result
+    """
+    name = (result or {}).get('file', '')
+    # Names are generated by us; reject anything that could escape EXPORT_DIR
+    if not name or os.path.basename(name) != name:
+        return None
+    return os.path.join(EXPORT_DIR, name)
+
+
+def _cancellable(rows, context, counter):
+    for row in rows:
+        context.check_cancelled()
+        counter['rows'] += 1
+        yield row
+
+
+@register_job('export', validate=_validate_export_job, on_expire=_remove_export_file, public=True)
+def run_export_job(payload, context):
+    """
+    Write an export to EXPORT_DIR
+
+    The rows are recomputed from the payload (format, profile, query,
+    filters, min_match_score), so a retried or requeued job starts over.
+
+    Returns:
+        dict: file, filename, format, size and rows of the finished export
+    """
+    format_type = payload['format']
+    user_profile = payload.get('profile')
+    rows = iter_export_rows(user_profile=user_profile, query=payload.get('query', ''),
+                            filters=payload.get('filters'), min_match_score=payload.get('min_match_score', 0))
+    counter = {'rows': 0}
+    name = f"{context.job_id}.{EXPORT_FORMATS[format_type][1]}"
+    filepath = os.path.join(EXPORT_DIR, name)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    try:
+        with open(filepath + '.part', 'wb') as f:
+            for chunk in iter_export(format_type, _cancellable(rows, context, counter),
+                                     export_columns(user_profile is not None)):
+                f.write(chunk)
+        os.replace(filepath + '.part', filepath)
+    finally:
+        if os.path.exists(filepath + '.part'):
+            os.remove(filepath + '.part')
+
+    logger.info(f"Background export {context.job_id} finished: {filepath}")
+    return {
+        'file': name,
+        'filename': payload.get('filename') or export_filename(format_type),
+        'format': format_type,
+        'size': os.path.getsize(filepath),
+        'rows': counter['rows']
+    }
@@ -0,0 +1,104 @@
+"""
+HTTP caching helpers for SchemeAssist AI Backend
+Catalog-version ETags and conditional GET for read-only endpoints
+"""
+
+import os
+import json
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+# Seconds clients (and the service worker) may reuse a response without revalidating
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', '60'))
+
+
+def canonical_request():
+    """
+    Build a canonical string for the current request
+
+    Query parameters are sorted and JSON bodies are re-serialised with
+    sorted keys, so equivalent requests map to the same string. The
+    Accept header is included because it selects the response format.
+
+    Returns:
+        str: Canonical representation of method, path, query, body and Accept
+    """
+    query = sorted(request.args.items(multi=True))
+    body = request.get_json(silent=True) if request.method == 'POST' else None
+    accept = request.headers.get('Accept', '')
+    return json.dumps([request.method, request.path, query, body, accept],
+                      sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def make_etag(version, canonical):
+    """
+    Build a strong ETag from a catalog version and a canonical request
+
+    Args:
+        version (str): Catalog version
+        canonical (str): Canonical request string
+
+    Returns:
+        str: Quoted ETag value
+    """
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:20]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(etag, if_none_match):
+    """Check an If-None-Match header value against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_headers(response, etag):
+    """Attach ETag and Cache-Control headers to a response"""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = f'public, max-age={API_CACHE_MAX_AGE}, must-revalidate'
+    response.vary.add('Accept')
+    return response
+
+
+def conditional(version_fn):
+    """
+    Decorator for endpoints whose output depends only on the catalog and the request
+
+    For GET and HEAD the ETag is computed before the handler runs; a
+    matching If-None-Match short-circuits to 304 without doing any work.
+    Other methods (POST search and recommend) get no validators: 304 is
+    only defined for GET/HEAD, so a matching If-None-Match there fails
+    the precondition with 412 (RFC 9110, 13.1.2).
+
+    Args:
+        version_fn (callable): Returns the current catalog version
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = make_etag(version_fn(), canonical_request())
+
+            if request.method not in ('GET', 'HEAD'):
+                if etag_matches(etag, request.headers.get('If-None-Match')):
+                    return make_response('', 412)
+                return f(*args, **kwargs)
+
+            if etag_matches(etag, request.headers.get('If-None-Match')):
+                return cache_headers(make_response('', 304), etag)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                cache_headers(response, etag)
+            return response
+        return decorated_function
+    return decorator
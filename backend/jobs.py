@@ -0,0 +1,383 @@
+"""
+Background jobs for SchemeAssist AI Backend
+A persistent SQLite job queue with a worker thread pool in each process:
+submission, status and results, retries with backoff, cancellation and
+result expiry
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# SQLite database shared by every worker process on the host (created on first use)
+JOBS_DB = os.environ.get('JOBS_DB', os.path.join(os.environ.get('SCHEMEASSIST_STATE_DIR', os.path.dirname(__file__)),
+                                                 'jobs.db'))
+
+# Worker threads per process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+
+# Seconds between polls for new jobs submitted by other processes
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '0.5'))
+
+# Attempts before a failing job is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+
+# Seconds finished jobs and their results are kept
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', str(24 * 3600)))
+
+# Running jobs without a heartbeat for this long are assumed lost and requeued
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', '120'))
+
+# Seconds between heartbeats of a running job, written whatever the job function is doing
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', '10'))
+
+# Seconds between expiry and stale-job sweeps in each process
+JOB_MAINTENANCE_INTERVAL = 30
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    ttl INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, run_after, created_at);
+'''
+
+# kind -> {'run': fn(payload, context), 'validate': fn(payload), 'on_expire': fn(result), 'public': bool}
+_handlers = {}
+
+
+def register_job(kind, validate=None, on_expire=None, public=False):
+    """
+    Decorator registering the function that runs jobs of one kind
+
+    The function receives (payload, context) and returns a JSON-serialisable
+    result. It should call context.check_cancelled() between units of work.
+
+    Args:
+        kind (str): Job kind
+        validate (callable): Raises ValueError for bad payloads at submission
+        on_expire (callable): Cleans up after a result expires (e.g. deletes files)
+        public (bool): Clients may submit it through the API; internal kinds are queued by the server only
+    """
+    def decorator(fn):
+        _handlers[kind] = {'run': fn, 'validate': validate, 'on_expire': on_expire, 'public': public}
+        return fn
+    return decorator
+
+
+def job_kinds(public=None):
+    """Get the registered job kinds, optionally only the public (or internal) ones"""
+    return sorted(kind for kind, handler in _handlers.items() if public is None or handler['public'] == public)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested"""
+
+
+class JobContext:
+    """Passed to job functions: identity, attempt number and cancellation checks"""
+
+    def __init__(self, queue, job_id, attempt):
+        self.queue = queue
+        self.job_id = job_id
+        self.attempt = attempt
+        self._last_check = 0.0
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled"""
+        now = time.time()
+        if now - self._last_check < 0.5:
+            return
+        self._last_check = now
+        row = self.queue._connect().execute('SELECT cancel_requested FROM jobs WHERE id = ?',
+                                            (self.job_id,)).fetchone()
+        if row and row[0]:
+            raise JobCancelled()
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+class JobQueue:
+    """
+    Persistent queue of jobs with a pool of worker threads
+
+    Jobs are claimed inside an IMMEDIATE transaction, so any number of
+    processes can share one database without running a job twice. The
+    database is created by the first call that needs it.
+    """
+
+    def __init__(self, path=None, workers=None, poll_interval=None):
+        self.path = JOBS_DB if path is None else path
+        self.workers = JOB_WORKERS if workers is None else workers
+        self.poll_interval = JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        self._last_maintenance = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    # --- Client API ---
+
+    def submit(self, kind, payload, max_attempts=None, ttl=None):
+        """
+        Queue a job
+
+        Args:
+            kind (str): Registered job kind
+            payload (dict): JSON-serialisable job arguments
+            max_attempts (int): Attempts before giving up
+            ttl (int): Seconds the result is kept after the job finishes
+
+        Returns:
+            dict: The queued job
+        """
+        handler = _handlers.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind} (choose from {', '.join(job_kinds())})")
+        if handler['validate']:
+            handler['validate'](payload)
+
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, payload, status, max_attempts, ttl, created_at, run_after) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, json.dumps(payload), 'queued', max_attempts or JOB_MAX_ATTEMPTS,
+                 ttl or JOB_RESULT_TTL, now, now)
+            )
+        self.ensure_started()
+        self._wakeup.set()
+        logger.info(f"Queued {kind} job {job_id}")
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Get a job by id, or None"""
+        row = self._connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a job
+
+        Queued jobs are cancelled at once; running jobs stop at their next
+        check_cancelled() call.
+
+        Returns:
+            dict: The job, or None if unknown
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? + ttl "
+                "WHERE id = ? AND status = 'queued'", (now, now, job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def stats(self):
+        """Count jobs per status"""
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    # --- Workers ---
+
+    def ensure_started(self):
+        """Start this process's worker threads (once per process, safe after fork)"""
+        with self._start_lock:
+            if self._started_pid == os.getpid() or self.workers <= 0:
+                return
+            self._started_pid = os.getpid()
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, name=f"job-worker-{index}", daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the worker threads after their current jobs"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._started_pid = None
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                if time.time() - self._last_maintenance > JOB_MAINTENANCE_INTERVAL:
+                    self._last_maintenance = time.time()
+                    self.maintain()
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Job queue error: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def _claim(self):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY created_at LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat = ? "
+                "WHERE id = ?", (now, now, row['id']))
+        job = _row_to_job(row)
+        job['attempts'] += 1
+        return job
+
+    def run_job(self, job):
+        """Run a claimed job and record its outcome"""
+        handler = _handlers.get(job['kind'])
+        context = JobContext(self, job['id'], job['attempts'])
+        started = time.time()
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['id'], stop_heartbeat),
+                                     name=f"job-heartbeat-{job['id'][:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind {job['kind']}")
+            result = handler['run'](job['payload'], context)
+        except JobCancelled:
+            self._finish(job['id'], 'cancelled', error='Cancelled while running')
+            logger.info(f"Cancelled {job['kind']} job {job['id']}")
+            return
+        except Exception as e:
+            if job['attempts'] < job['max_attempts'] and handler is not None:
+                delay = 2 ** job['attempts']
+                with self._transaction() as conn:
+                    retried = conn.execute(
+                        "UPDATE jobs SET status = 'queued', run_after = ?, error = ? "
+                        "WHERE id = ? AND cancel_requested = 0", (time.time() + delay, str(e), job['id'])).rowcount
+                if retried:
+                    logger.warning(f"{job['kind']} job {job['id']} failed (attempt {job['attempts']}), "
+                                   f"retrying in {delay}s: {str(e)}")
+                    return
+            status = self._finish(job['id'], 'failed', error=str(e))
+            logger.error(f"{job['kind']} job {job['id']} {status} after {job['attempts']} attempts: {str(e)}")
+            return
+        finally:
+            stop_heartbeat.set()
+        status = self._finish(job['id'], 'done', result=result)
+        logger.info(f"Finished {job['kind']} job {job['id']} ({status}) in {time.time() - started:.2f}s")
+
+    def _heartbeat(self, job_id, stopped):
+        # Keeps the job from looking lost to maintain() while its function runs
+        while not stopped.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                self._connect().execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'running'",
+                                        (time.time(), job_id))
+            except sqlite3.Error as e:
+                logger.error(f"Error updating heartbeat of job {job_id}: {str(e)}")
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # A job whose cancellation was requested while it ran ends up cancelled whatever it returned;
+        # its result is kept so on_expire still cleans up after it. Returns the recorded status.
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row and row[0] and status != 'cancelled':
+                status, error = 'cancelled', 'Cancelled while running'
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, expires_at = ? + ttl WHERE id = ?',
+                (status, json.dumps(result) if result is not None else None, error, now, now, job_id))
+        return status
+
+    def maintain(self):
+        """
+        Requeue jobs whose worker died and delete expired jobs and their results
+
+        A lost job that has used up its attempts (or was being cancelled)
+        is finished as failed (or cancelled) instead of being requeued.
+        """
+        now = time.time()
+        stale = now - JOB_STALE_SECONDS
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = 'Cancelled while running', finished_at = ?, "
+                "expires_at = ? + ttl WHERE status = 'running' AND heartbeat < ? AND cancel_requested = 1",
+                (now, now, stale))
+            failed = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lost after ' || attempts || ' attempts', "
+                "finished_at = ?, expires_at = ? + ttl "
+                "WHERE status = 'running' AND heartbeat < ? AND attempts >= max_attempts", (now, now, stale)).rowcount
+            requeued = conn.execute(
+                "UPDATE jobs SET status = 'queued', run_after = ? WHERE status = 'running' AND heartbeat < ?",
+                (now, stale)).rowcount
+            expired = conn.execute(
+                f"SELECT id, kind, result FROM jobs WHERE expires_at < ? AND status IN {FINISHED_STATES}", (now,)
+            ).fetchall()
+            for row in expired:
+                conn.execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+        if failed or requeued:
+            logger.warning(f"Lost jobs: {requeued} requeued, {failed} failed after their last attempt")
+        for row in expired:
+            handler = _handlers.get(row['kind'])
+            if handler and handler['on_expire'] and row['result']:
+                try:
+                    handler['on_expire'](json.loads(row['result']))
+                except Exception as e:
+                    logger.error(f"Error cleaning up expired job {row['id']}: {str(e)}")
@@ -0,0 +1,219 @@
+"""
+Logging pipeline for SchemeAssist AI Backend
+Request threads only put records on a bounded in-memory queue; a
+background listener writes them to the console (as text, or as JSON lines
+when LOG_FORMAT asks for it or stderr is not a terminal) and, when
+LOG_FILE is set, as JSON lines to a rotating log file. Info logs can be sampled, and
+records that do not fit in the queue are dropped and counted instead of
+blocking. Only the server entrypoints (wsgi.py, app.py run directly) call
+configure_logging(); importing the app leaves logging alone.
+"""
+
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# Log file written by the listener (default: console only, e.g. gunicorn's stderr)
+LOG_FILE = os.environ.get('LOG_FILE', '')
+
+# Console log format: 'text', 'json', or 'auto' (JSON unless stderr is a terminal)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'auto')
+
+# Root log level
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Records held in memory before new ones are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+# Fraction of INFO and DEBUG records kept (warnings and errors are always kept)
+LOG_INFO_SAMPLE_RATE = float(os.environ.get('LOG_INFO_SAMPLE_RATE', '1.0'))
+
+# Size-based rotation: bytes per file and number of old files kept
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '5'))
+
+# Time-based rotation instead of size, e.g. 'midnight' or 'H' (see TimedRotatingFileHandler)
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN', '')
+
+CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_stats_lock = threading.Lock()
+_stats = {'enqueued': 0, 'dropped': 0, 'sampled_out': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including extra fields"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def console_formatter(log_format=None, stream=None):
+    """
+    Get the formatter for the console handler
+
+    Args:
+        log_format (str): text, json or auto (default: LOG_FORMAT)
+        stream: Console stream, checked for a terminal in auto mode
+
+    Returns:
+        logging.Formatter: JsonFormatter or the plain text formatter
+    """
+    log_format = (LOG_FORMAT if log_format is None else log_format).lower()
+    stream = sys.stderr if stream is None else stream
+    if log_format == 'auto':
+        # Containers and process managers collect stderr; give them structured records
+        log_format = 'text' if stream.isatty() else 'json'
+    if log_format == 'json':
+        return JsonFormatter()
+    return logging.Formatter(CONSOLE_FORMAT)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records; always keep warnings and errors"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        if random.random() < self.rate:
+            return True
+        _count('sampled_out')
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the logging thread
+
+    Records that do not fit in the bounded queue are counted and dropped.
+    The listener is restarted after a fork, so workers forked from a
+    preloaded app keep logging.
+    """
+
+    def __init__(self, log_queue, start_listener):
+        super().__init__(log_queue)
+        self._start_listener = start_listener
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Render the message and traceback on the calling thread, keeping
+        # the record's extra fields for the JSON formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+            _count('enqueued')
+        except queue.Full:
+            _count('dropped')
+
+
+_listener = None
+
+
+def configure_logging():
+    """
+    Route all logging through the queue pipeline (idempotent)
+
+    Replaces the root logger's handlers, so only entrypoints call it.
+
+    Returns:
+        QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(console_formatter(stream=sys.stderr))
+    handlers = [console_handler]
+
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
+        if LOG_ROTATE_WHEN:
+            file_handler = TimedRotatingFileHandler(LOG_FILE, when=LOG_ROTATE_WHEN,
+                                                    backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        else:
+            file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES,
+                                               backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    def start_listener():
+        # A forked child inherits the listener object but not its thread
+        listener._thread = None
+        listener.start()
+
+    queue_handler = DroppingQueueHandler(log_queue, start_listener)
+    queue_handler.addFilter(SamplingFilter(LOG_INFO_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    listener.start()
+    atexit.register(listener.stop)
+    _listener = listener
+    return listener
+
+
+def log_stats():
+    """
+    Get logging pipeline counters
+
+    Returns:
+        dict: Records enqueued, dropped (queue full) and sampled out, and current queue depth
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['queue_depth'] = _listener.queue.qsize() if _listener is not None else 0
+    return stats
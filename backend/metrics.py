@@ -0,0 +1,461 @@
+"""
+Request metrics for SchemeAssist AI Backend
+Per-route latency and payload histograms, status counters and in-flight
+gauges, exposed in Prometheus text format and aggregated across gunicorn
+workers through per-process snapshot files in a local directory
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from functools import wraps
+
+from flask import Response, g, request, make_response
+
+from storage import file_lock
+from timing import current_timer, start_timer, stop_timer
+
+logger = logging.getLogger(__name__)
+
+# Directory where each worker publishes its metrics snapshot
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(os.path.dirname(__file__), 'metrics'))
+
+# Seconds between snapshot writes of each worker
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+
+# Histogram buckets for request latency (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Histogram buckets for request and response bodies (bytes)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Snapshot holding the counters and histograms of workers that have exited
+ARCHIVE_FILENAME = 'archive.json'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms for one process
+
+    Counters and histograms from every snapshot file are summed, so
+    totals survive worker restarts. Gauges only count for workers that
+    are still alive and are combined with the metric's aggregate mode
+    ('sum' or 'max').
+
+    Snapshot files are named by pid and process start time. When metrics
+    are collected, the snapshots of exited workers (pid gone, or reused
+    by a newer worker) are folded into ARCHIVE_FILENAME and deleted, so
+    the directory does not grow with restarts and a reused pid never
+    replaces an older worker's totals.
+    """
+
+    def __init__(self, directory=None, pid=None):
+        self.directory = METRICS_DIR if directory is None else directory
+        self._pid = pid
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+        self._timer = None
+        self._started_pid = None
+        self._instance = None
+
+    @property
+    def pid(self):
+        # Resolved on use so a registry created before gunicorn forks
+        # still publishes under each worker's own pid
+        return self._pid if self._pid is not None else os.getpid()
+
+    @property
+    def started(self):
+        """Start time (ns) of the process publishing under self.pid"""
+        pid = self.pid
+        if self._instance is None or self._instance[0] != pid:
+            self._instance = (pid, time.time_ns())
+        return self._instance[1]
+
+    def describe(self, name, metric_type, help_text, buckets=None, aggregate='sum'):
+        """
+        Declare a metric
+
+        Args:
+            name (str): Metric name
+            metric_type (str): counter, gauge or histogram
+            help_text (str): HELP line
+            buckets (tuple): Upper bounds for histograms
+            aggregate (str): How gauges of live workers are combined: sum or max
+        """
+        self._meta[name] = {'type': metric_type, 'help': help_text,
+                            'buckets': list(buckets or ()), 'aggregate': aggregate}
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def set(self, name, labels=(), value=0):
+        with self._lock:
+            self._gauges[(name, tuple(labels))] = value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels))
+        buckets = self._meta[name]['buckets']
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def register_collector(self, fn):
+        """
+        Add a callback sampled on every snapshot
+
+        The callback returns (name, labels, value) samples for metrics
+        declared with describe(); counter samples are absolute totals.
+        """
+        self._collectors.append(fn)
+
+    def snapshot(self):
+        """
+        Get this process's metrics in a JSON-serialisable form
+
+        Returns:
+            dict: pid, counters, gauges and histograms as lists of samples
+        """
+        collected = {'counter': [], 'gauge': []}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    collected[self._meta[name]['type']].append([name, [list(label) for label in labels], value])
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {str(e)}")
+
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'started': self.started,
+                'counters': [[name, [list(label) for label in labels], value]
+                             for (name, labels), value in self._counters.items()] + collected['counter'],
+                'gauges': [[name, [list(label) for label in labels], value]
+                           for (name, labels), value in self._gauges.items()] + collected['gauge'],
+                'histograms': [[name, [list(label) for label in labels], list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self._histograms.items()]
+            }
+
+    def _snapshot_filename(self):
+        return f"{self.pid}-{self.started}.json"
+
+    def _write_json(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def flush(self):
+        """Publish this process's snapshot for the other workers"""
+        snapshot = self.snapshot()
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_json(os.path.join(self.directory, self._snapshot_filename()), snapshot)
+
+    def start(self):
+        """Start publishing snapshots every METRICS_FLUSH_INTERVAL seconds (once per process)"""
+        with self._lock:
+            if self._started_pid == self.pid:
+                return
+            self._started_pid = self.pid
+
+        def run():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+            self._timer = threading.Timer(METRICS_FLUSH_INTERVAL, run)
+            self._timer.daemon = True
+            self._timer.start()
+
+        run()
+        atexit.register(self.flush)
+
+    def _read_snapshot(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics snapshot {filename}: {str(e)}")
+            return None
+
+    def _load_snapshots(self):
+        snapshots = [self.snapshot()]
+        if not os.path.isdir(self.directory):
+            return snapshots
+        own = self._snapshot_filename()
+        others = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json') or filename in (own, ARCHIVE_FILENAME):
+                continue
+            snapshot = self._read_snapshot(filename)
+            if snapshot is not None:
+                others[filename] = snapshot
+
+        # A pid only belongs to its newest snapshot; older ones are from exited workers
+        newest = {self.pid: self.started}
+        for snapshot in others.values():
+            pid, started = snapshot['pid'], snapshot.get('started', 0)
+            newest[pid] = max(newest.get(pid, started), started)
+        dead = [filename for filename, snapshot in others.items()
+                if snapshot.get('started', 0) < newest[snapshot['pid']] or not _pid_alive(snapshot['pid'])]
+        if dead:
+            try:
+                self._archive(dead)
+            except OSError as e:
+                logger.error(f"Error archiving metrics of exited workers: {str(e)}")
+                for filename in dead:
+                    others[filename]['gauges'] = []
+            else:
+                for filename in dead:
+                    del others[filename]
+
+        snapshots.extend(others.values())
+        archive = self._read_snapshot(ARCHIVE_FILENAME)
+        if archive is not None:
+            snapshots.append(archive)
+        return snapshots
+
+    def _archive(self, filenames):
+        # Fold the counters and histograms of exited workers into the archive and delete their snapshots
+        archive_path = os.path.join(self.directory, ARCHIVE_FILENAME)
+        with file_lock(archive_path + '.lock'):
+            archive = self._read_snapshot(ARCHIVE_FILENAME) or {'pid': None, 'counters': [], 'gauges': [],
+                                                                'histograms': []}
+            counters = {(name, json.dumps(labels)): value for name, labels, value in archive['counters']}
+            histograms = {(name, json.dumps(labels)): [counts, total, count]
+                          for name, labels, counts, total, count in archive['histograms']}
+            folded = []
+            for filename in filenames:
+                # Read again under the lock: another worker may have archived it already
+                snapshot = self._read_snapshot(filename)
+                if snapshot is None:
+                    continue
+                folded.append(filename)
+                for name, labels, value in snapshot['counters']:
+                    key = (name, json.dumps(labels))
+                    counters[key] = counters.get(key, 0) + value
+                for name, labels, counts, total, count in snapshot['histograms']:
+                    merged = histograms.setdefault((name, json.dumps(labels)), [[0] * len(counts), 0.0, 0])
+                    merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                    merged[1] += total
+                    merged[2] += count
+            if not folded:
+                return
+            archive['counters'] = [[name, json.loads(labels), value] for (name, labels), value in counters.items()]
+            archive['histograms'] = [[name, json.loads(labels), counts, total, count]
+                                     for (name, labels), (counts, total, count) in histograms.items()]
+            self._write_json(archive_path, archive)
+            for filename in folded:
+                os.remove(os.path.join(self.directory, filename))
+        logger.info(f"Archived metrics of {len(folded)} exited workers")
+
+    def aggregate(self):
+        """
+        Merge the snapshots of every worker
+
+        Returns:
+            dict: (name, labels) -> value for counters and gauges, and
+                (name, labels) -> [counts, sum, count] for histograms
+        """
+        counters, gauges, histograms = {}, {}, {}
+        for snapshot in self._load_snapshots():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, value in snapshot['gauges']:
+                key = (name, tuple(tuple(label) for label in labels))
+                if key not in gauges:
+                    gauges[key] = value
+                elif self._meta.get(name, {}).get('aggregate') == 'max':
+                    gauges[key] = max(gauges[key], value)
+                else:
+                    gauges[key] += value
+            for name, labels, counts, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return {'counter': counters, 'gauge': gauges, 'histogram': histograms}
+
+    def render(self):
+        """
+        Render the metrics of all workers in Prometheus text format
+
+        Returns:
+            str: Exposition text
+        """
+        merged = self.aggregate()
+        lines = []
+        for name, meta in sorted(self._meta.items()):
+            samples = sorted((key, value) for key, value in merged[meta['type']].items() if key[0] == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {meta['help']}")
+            lines.append(f"# TYPE {name} {meta['type']}")
+            for (_, labels), value in samples:
+                if meta['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(meta['buckets'] + [float('inf')], counts + [count - sum(counts)]):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (('le', _format_value(float(bound))),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(total))}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+registry.describe('schemeassist_http_requests_total', 'counter', 'HTTP requests by route, method and status')
+registry.describe('schemeassist_http_request_duration_seconds', 'histogram',
+                  'Time to complete a request, including streamed bodies', buckets=LATENCY_BUCKETS)
+registry.describe('schemeassist_http_requests_in_flight', 'gauge', 'Requests currently being handled')
+registry.describe('schemeassist_http_request_size_bytes', 'histogram', 'Request body size', buckets=SIZE_BUCKETS)
+registry.describe('schemeassist_http_response_size_bytes', 'histogram',
+                  'Response body size (streamed responses are not counted)', buckets=SIZE_BUCKETS)
+
+
+def _route_label():
+    # The URL rule, not the path, so /api/scheme/<name> is one series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def install_metrics(app, registry=registry):
+    """
+    Record request metrics for every request handled by app
+
+    Args:
+        app (Flask): Application to instrument
+        registry (MetricsRegistry): Where to record
+    """
+    @app.before_request
+    def _start_request_metrics():
+        registry.start()
+        g.metrics_started = time.perf_counter()
+        g.metrics_route = _route_label()
+        registry.add('schemeassist_http_requests_in_flight', (('route', g.metrics_route),), 1)
+        registry.observe('schemeassist_http_request_size_bytes', (('route', g.metrics_route),),
+                         request.content_length or 0)
+
+    @app.after_request
+    def _record_response_metrics(response):
+        g.metrics_status = response.status_code
+        if not response.is_streamed:
+            registry.observe('schemeassist_http_response_size_bytes', (('route', g.metrics_route),),
+                             response.calculate_content_length() or 0)
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(error=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        route = g.metrics_route
+        status = g.get('metrics_status', 500)
+        registry.add('schemeassist_http_requests_in_flight', (('route', route),), -1)
+        registry.inc('schemeassist_http_requests_total',
+                     (('route', route), ('method', request.method), ('status', str(status))))
+        registry.observe('schemeassist_http_request_duration_seconds', (('route', route),),
+                         time.perf_counter() - started)
+
+
+def metrics_response(registry=registry):
+    """Build the /api/metrics response"""
+    return Response(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def server_timing(f):
+    """
+    Decorator timing the stages of a request (see timing.stage) and
+    reporting them in a Server-Timing header
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        timer, token = start_timer()
+        try:
+            response = make_response(f(*args, **kwargs))
+        finally:
+            stop_timer(token)
+        response.headers['Server-Timing'] = timer.header()
+        # Lets the frontend performance monitor read the header cross-origin
+        response.headers['Timing-Allow-Origin'] = '*'
+        return response
+    return decorated_function
+
+
+def debug_timings(data=None):
+    """
+    Get the stage timings so far when the client asked for them with
+    ?debug=timing or "debug": "timing" in the body
+
+    Returns:
+        dict: {"server_timing": {stage: ms}} or an empty dict
+    """
+    timer = current_timer()
+    wanted = request.args.get('debug') == 'timing' or (isinstance(data, dict) and data.get('debug') == 'timing')
+    if timer is None or not wanted:
+        return {}
+    return {"server_timing": timer.as_dict()}
@@ -0,0 +1,306 @@
+"""
+Parallel recommendation scoring for SchemeAssist AI Backend
+Scores shards of very large catalogs in a persistent process pool and
+merges the ranked shard results. Workers never parse the catalog: they
+score against its compiled columns (score partitions and income/age
+windows), written once per catalog version to a file every worker maps
+read-only, so the pages are shared through the OS page cache.
+"""
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from itertools import islice
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import recommender
+from timing import stage
+
+logger = logging.getLogger(__name__)
+
+# Worker processes scoring catalog shards (0 scores every request in the calling thread)
+PARALLEL_SCORING_WORKERS = int(os.environ.get('PARALLEL_SCORING_WORKERS', '0'))
+
+# Catalogs with fewer schemes are always scored serially; the pool round trip costs more than it saves
+PARALLEL_SCORING_MIN_SCHEMES = int(os.environ.get('PARALLEL_SCORING_MIN_SCHEMES', '100000'))
+
+# Shards per worker, so a worker that drew a cheap shard (pruned partitions) picks up another
+PARALLEL_SCORING_SHARDS_PER_WORKER = 2
+
+# Directory holding the compiled catalog columns mapped by the workers
+PARALLEL_SCORING_DIR = os.environ.get('PARALLEL_SCORING_DIR', os.path.join(os.path.dirname(__file__), 'scoring'))
+
+# How scoring workers are started. Forking a threaded server can copy locks
+# held by other request threads into the child, so workers are started from
+# a clean forkserver (spawn where that is unavailable).
+PARALLEL_SCORING_START_METHOD = os.environ.get(
+    'PARALLEL_SCORING_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+_pool = {'executor': None, 'catalog_version': None}
+_lock = threading.Lock()
+_stats = {'serial': 0, 'parallel': 0, 'shards': 0, 'fallbacks': 0}
+
+# Per-scheme int64 columns of a columns file, after the partition-ordered scheme indices
+WINDOW_COLUMNS = ('min_income', 'max_income', 'min_age', 'max_age')
+
+# Columns mapped by this worker process
+_attached = {'path': None, 'columns': None}
+
+
+def rank_key(match):
+    """Sort key of a (index, score, ...) match: best score first, then catalog order"""
+    return -match[1], match[0]
+
+
+def shard_ranges(size, shards):
+    """Split range(size) into at most shards contiguous (start, stop) ranges"""
+    if size <= 0:
+        return []
+    shards = max(1, min(shards, size))
+    step = -(-size // shards)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+# --- Compiled columns ---
+
+def columns_path(catalog_path, catalog_version):
+    """Path of the columns file of one catalog version"""
+    digest = hashlib.sha1(f"{os.path.abspath(catalog_path)}|{catalog_version}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(PARALLEL_SCORING_DIR, f"{digest}.cols")
+
+
+def write_columns(catalog, path):
+    """
+    Write the compiled columns of a catalog
+
+    Layout: an 8-byte header length, a JSON header (version, partition
+    directory, column lengths), then native int64 columns: the scheme
+    indices grouped by partition, and one income/age window column each
+    indexed by scheme. Files of other catalog versions are removed;
+    workers still mapping them keep their pages until they detach.
+    """
+    partitions = recommender.get_score_partitions(catalog)
+    order, directory = array('q'), []
+    for state, groups in partitions['partitions'].items():
+        for (category, target), indices in groups.items():
+            directory.append([state, category, target, len(order), len(indices)])
+            order.extend(indices)
+    windows = [array('q', bytes(8 * len(catalog.schemes))) for _ in WINDOW_COLUMNS]
+    for index, window in partitions['windows'].items():
+        for column, value in zip(windows, window):
+            column[index] = value
+
+    header = json.dumps({'version': catalog.version, 'partitions': directory,
+                         'columns': ['order', *WINDOW_COLUMNS],
+                         'lengths': [len(order)] + [len(column) for column in windows]}).encode('utf-8')
+    header += b' ' * (-len(header) % 8)
+
+    os.makedirs(PARALLEL_SCORING_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=PARALLEL_SCORING_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack('=Q', len(header)))
+            f.write(header)
+            for column in [order] + windows:
+                column.tofile(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    for filename in os.listdir(PARALLEL_SCORING_DIR):
+        if filename.endswith('.cols') and os.path.join(PARALLEL_SCORING_DIR, filename) != path:
+            try:
+                os.remove(os.path.join(PARALLEL_SCORING_DIR, filename))
+            except OSError:
+                pass
+
+
+def attach_columns(path):
+    """
+    Map a columns file read-only
+
+    Returns:
+        dict: version, partitions (state -> [(category, target, offset,
+            length)]) and the columns as int64 memoryviews
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_length = struct.unpack_from('=Q', mapped, 0)[0]
+    header = json.loads(mapped[8:8 + header_length])
+    columns, offset = {}, 8 + header_length
+    for name, length in zip(header['columns'], header['lengths']):
+        columns[name] = memoryview(mapped)[offset:offset + 8 * length].cast('q')
+        offset += 8 * length
+    partitions = {}
+    for state, category, target, start, length in header['partitions']:
+        partitions.setdefault(state, []).append((category, target, start, length))
+    return {'version': header['version'], 'partitions': partitions, 'columns': columns}
+
+
+def iter_column_matches(columns, user_profile, min_match_score, start, stop):
+    """
+    Yield (index, score, age_eligible, caste_eligible) for the schemes
+    with start <= index < stop recommended for the profile
+
+    Gives the same matches as recommender.iter_recommendation_matches,
+    using only the compiled columns.
+    """
+    order = columns['columns']['order']
+    min_incomes, max_incomes, min_ages, max_ages = (columns['columns'][name] for name in WINDOW_COLUMNS)
+    income = user_profile.get("income", 0)
+    age = user_profile.get("age", 30)
+    caste_terms = {}
+    for state in dict.fromkeys(("All", user_profile.get("state"))):
+        for category, target, offset, length in columns['partitions'].get(state, ()):
+            base = recommender.partition_base_score(category, state, target, user_profile, caste_terms)
+            if base is None or min(base + recommender.AGE_BONUS, 100) < min_match_score:
+                continue
+            group = order[offset:offset + length]
+            for position in range(bisect_left(group, start), bisect_left(group, stop)):
+                index = group[position]
+                if not min_incomes[index] <= income <= max_incomes[index]:
+                    continue
+                age_eligible = min_ages[index] <= age <= max_ages[index]
+                score = min(base + (recommender.AGE_BONUS if age_eligible else 0), 100)
+                if score >= min_match_score:
+                    yield index, score, age_eligible, True
+
+
+# --- Worker processes ---
+
+def init_worker(path):
+    """Map the columns file the pool was created for, once per worker"""
+    _attached['columns'] = attach_columns(path)
+    _attached['path'] = path
+
+
+def score_shard(catalog_version, user_profile, min_match_score, start, stop, limit=None):
+    """
+    Rank the matches of one catalog shard
+
+    Returns:
+        list: (index, score, age_eligible, caste_eligible) matches in rank_key order
+    """
+    columns = _attached['columns']
+    if columns is None or columns['version'] != catalog_version:
+        raise RuntimeError(f"Worker columns do not match catalog {catalog_version}")
+    matches = list(iter_column_matches(columns, user_profile, min_match_score, start, stop))
+    matches.sort(key=rank_key)
+    return matches[:limit] if limit else matches
+
+
+# --- Request side ---
+
+def get_pool(catalog):
+    """
+    Get the process pool for a catalog, or None when it should be scored serially
+
+    The pool is replaced when a new catalog version is loaded. Requests
+    still holding an older catalog are scored serially.
+    """
+    if PARALLEL_SCORING_WORKERS <= 0 or len(catalog.schemes) < PARALLEL_SCORING_MIN_SCHEMES:
+        return None
+    with _lock:
+        if _pool['executor'] is not None and _pool['catalog_version'] == catalog.version:
+            return _pool['executor']
+        if catalog is not recommender.loaded_catalog():
+            return None
+        if _pool['executor'] is not None:
+            _pool['executor'].shutdown(wait=False, cancel_futures=True)
+        # Written once per catalog version; other server processes reuse the file
+        path = columns_path(recommender.CATALOG_PATH, catalog.version)
+        try:
+            if not os.path.exists(path):
+                write_columns(catalog, path)
+        except OSError as e:
+            logger.error(f"Error writing scoring columns, scoring serially: {str(e)}")
+            return None
+        _pool['executor'] = ProcessPoolExecutor(max_workers=PARALLEL_SCORING_WORKERS,
+                                                mp_context=multiprocessing.get_context(PARALLEL_SCORING_START_METHOD),
+                                                initializer=init_worker, initargs=(path,))
+        _pool['catalog_version'] = catalog.version
+        logger.info(f"Started {PARALLEL_SCORING_WORKERS} scoring workers for catalog {catalog.version} "
+                    f"({len(catalog.schemes)} schemes)")
+        return _pool['executor']
+
+
+def shutdown_pool():
+    """Stop the scoring workers; the next large request starts a new pool"""
+    with _lock:
+        executor, _pool['executor'], _pool['catalog_version'] = _pool['executor'], None, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def ranked_matches(user_profile, min_match_score=95, catalog=None, limit=None):
+    """
+    Recommendation matches for a profile, best score first
+
+    Catalogs of at least PARALLEL_SCORING_MIN_SCHEMES schemes are split
+    into shards scored by the worker pool, and the ranked shard results
+    are merged; the order is the same as a serial scan sorted by score.
+    If the pool fails the request is scored serially.
+
+    Args:
+        user_profile (dict): Profile as built by build_user_profile
+        min_match_score (int): Minimum eligibility score
+        catalog (Catalog): Catalog to score (default the current one)
+        limit (int): Keep only the best limit matches (default all)
+
+    Returns:
+        list: (index, score, age_eligible, caste_eligible) matches
+    """
+    catalog = catalog or recommender.get_catalog()
+    executor = get_pool(catalog)
+    if executor is not None:
+        shards = shard_ranges(len(catalog.schemes), PARALLEL_SCORING_WORKERS * PARALLEL_SCORING_SHARDS_PER_WORKER)
+        try:
+            with stage('filter'):
+                futures = [executor.submit(score_shard, catalog.version, user_profile, min_match_score,
+                                           start, stop, limit) for start, stop in shards]
+                results = [future.result() for future in futures]
+        except (BrokenProcessPool, CancelledError, RuntimeError, OSError) as e:
+            logger.warning(f"Parallel scoring failed, scoring serially: {str(e)}")
+            with _lock:
+                _stats['fallbacks'] += 1
+                if _pool['executor'] is executor:
+                    _pool['executor'], _pool['catalog_version'] = None, None
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            with _lock:
+                _stats['parallel'] += 1
+                _stats['shards'] += len(shards)
+            with stage('sort'):
+                return list(islice(merge(*results, key=rank_key), limit))
+
+    with _lock:
+        _stats['serial'] += 1
+    with stage('filter'):
+        matches = list(recommender.iter_recommendation_matches(user_profile, min_match_score, catalog))
+    with stage('sort'):
+        matches.sort(key=rank_key)
+    return matches[:limit] if limit else matches
+
+
+def parallel_scoring_stats():
+    """
+    Get parallel scoring settings and counters
+
+    Returns:
+        dict: workers, min_schemes, pool catalog version and request counts
+    """
+    with _lock:
+        return dict(_stats, workers=PARALLEL_SCORING_WORKERS, min_schemes=PARALLEL_SCORING_MIN_SCHEMES,
+                    pool_catalog_version=_pool['catalog_version'])
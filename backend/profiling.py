@@ -0,0 +1,209 @@
+"""
+On-demand request profiling for SchemeAssist AI Backend
+Runs a single request under cProfile (kept in a bounded on-disk ring
+buffer of .pstats files) or a stack sampler (returned as collapsed
+stacks), when the request carries the admin profiling token in the
+X-Profile header
+"""
+
+import os
+import sys
+import hmac
+import time
+import uuid
+import cProfile
+import logging
+import threading
+from collections import Counter
+from functools import wraps
+
+from flask import Response, jsonify, request, make_response
+
+logger = logging.getLogger(__name__)
+
+# Secret that enables profiling; profiling is switched off when unset
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+
+# Directory holding the most recent .pstats files
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+
+# Number of .pstats files kept; older ones are deleted
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '20'))
+
+# Seconds between stack samples in collapsed mode
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.001'))
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_FORMAT_HEADER = 'X-Profile-Format'
+
+# Only one cProfile profiler can be active per process (Python 3.12+)
+_profiler_lock = threading.Lock()
+
+
+def is_authorized(token, expected=None):
+    """Check a profiling token against PROFILING_TOKEN in constant time"""
+    expected = PROFILING_TOKEN if expected is None else expected
+    return bool(expected) and bool(token) and hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+
+
+def requested_profile():
+    """
+    Get the profile mode asked for by the current request
+
+    The token is only read from the X-Profile header, never the query
+    string, so it does not end up in access logs; the mode comes from
+    X-Profile-Format.
+
+    Returns:
+        str: 'pstats' or 'collapsed', or None if the request is not
+            (authorised to be) profiled
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return None
+    if not is_authorized(token):
+        logger.warning(f"Rejected profiling token on {request.path} from {request.remote_addr}")
+        return None
+    mode = request.headers.get(PROFILE_FORMAT_HEADER) or 'pstats'
+    return 'collapsed' if mode == 'collapsed' else 'pstats'
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = PROFILE_SAMPLE_INTERVAL if interval is None else interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Samples in collapsed-stack format (one 'frame;frame;frame count' line per stack)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+def _prune_profiles(directory, keep):
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.pstats'))
+    for name in files[:-keep] if keep > 0 else files:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # Another worker pruned it first
+
+
+def save_profile(profiler, endpoint, directory=None, keep=None):
+    """
+    Write a profile to the ring buffer, dropping the oldest files
+
+    Args:
+        profiler (cProfile.Profile): Finished profiler
+        endpoint (str): Name of the profiled endpoint
+        directory (str): Ring buffer directory
+        keep (int): Number of files kept
+
+    Returns:
+        str: Profile id (file name without extension)
+    """
+    directory = PROFILE_DIR if directory is None else directory
+    keep = PROFILE_KEEP if keep is None else keep
+    os.makedirs(directory, exist_ok=True)
+    # Millisecond prefix keeps the files in age order
+    profile_id = f"{int(time.time() * 1000):013d}-{endpoint}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.pstats"))
+    _prune_profiles(directory, keep)
+    return profile_id
+
+
+def list_profiles(directory=None):
+    """List stored profiles, newest first"""
+    directory = PROFILE_DIR if directory is None else directory
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.pstats'):
+            path = os.path.join(directory, name)
+            profiles.append({'profile_id': name[:-len('.pstats')], 'size': os.path.getsize(path)})
+    return profiles
+
+
+def profile_path(profile_id, directory=None):
+    """Get the .pstats path of a stored profile, or None if there is no such profile"""
+    directory = PROFILE_DIR if directory is None else directory
+    # Ids are generated by us; reject anything that could escape the directory
+    if not profile_id.replace('-', '').replace('_', '').isalnum():
+        return None
+    path = os.path.join(directory, f"{profile_id}.pstats")
+    return path if os.path.exists(path) else None
+
+
+def profiled(f):
+    """
+    Decorator allowing an authorised request to be profiled
+
+    When PROFILING_TOKEN is not set the handler is returned unwrapped,
+    so ordinary deployments pay nothing. Otherwise only requests carrying
+    the token are profiled; the rest pay one header lookup. A pstats
+    request arriving while another is being profiled gets 409.
+    """
+    if not PROFILING_TOKEN:
+        return f
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        mode = requested_profile()
+        if mode is None:
+            return f(*args, **kwargs)
+
+        if mode == 'collapsed':
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            try:
+                f(*args, **kwargs)
+            finally:
+                sampler.stop()
+            logger.info(f"Sampled {sum(sampler.counts.values())} stacks for {request.path}")
+            return Response(sampler.collapsed(), mimetype='text/plain')
+
+        if not _profiler_lock.acquire(blocking=False):
+            return jsonify({
+                'success': False,
+                'error': 'Conflict',
+                'message': 'Another request is being profiled in this worker; retry shortly'
+            }), 409
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = make_response(f(*args, **kwargs))
+            finally:
+                profiler.disable()
+        finally:
+            _profiler_lock.release()
+        profile_id = save_profile(profiler, f.__name__)
+        logger.info(f"Stored profile {profile_id} for {request.path}")
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+    return decorated_function
@@ -0,0 +1,330 @@
+"""
+Admission control for SchemeAssist AI Backend
+Per-client token-bucket rate limiting and per-endpoint concurrency
+limits with a bounded wait queue
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from functools import wraps
+
+from flask import request, jsonify, make_response
+
+logger = logging.getLogger(__name__)
+
+# Sustained requests per second allowed per client on a limited endpoint
+RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', '5'))
+
+# Requests a client may burst above the sustained rate
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '20'))
+
+# Per-client rate and burst for the analytics ingest endpoints; page beacons are
+# anonymous, so everyone behind one NAT address shares this budget
+INGEST_RATE_LIMIT_RATE = float(os.environ.get('INGEST_RATE_LIMIT_RATE', '50'))
+INGEST_RATE_LIMIT_BURST = float(os.environ.get('INGEST_RATE_LIMIT_BURST', '200'))
+
+# Where bucket state lives: 'memory' (per process) or a SQLite file shared by all workers
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+
+# Requests allowed to run at once per endpoint and per process
+CONCURRENCY_LIMIT = int(os.environ.get('CONCURRENCY_LIMIT', '8'))
+
+# Requests allowed to wait for a slot before new ones are rejected
+CONCURRENCY_QUEUE = int(os.environ.get('CONCURRENCY_QUEUE', '16'))
+
+# Longest time (seconds) a queued request waits for a slot
+CONCURRENCY_QUEUE_TIMEOUT = float(os.environ.get('CONCURRENCY_QUEUE_TIMEOUT', '2'))
+
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted (0 = none; see app.py)
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+
+# Idle buckets are pruned once the in-memory store holds this many clients
+MAX_TRACKED_CLIENTS = 10000
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, rate, burst, now):
+        """Take one token; returns 0 if allowed, else seconds until one is available"""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._prune(rate, burst, now)
+            return wait
+
+    def _prune(self, rate, burst, now):
+        # A bucket that has refilled completely carries no state worth keeping
+        self._buckets = {key: value for key, value in self._buckets.items()
+                         if _refill(value[0], value[1], now, rate, burst) < burst}
+
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file, shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, now):
+        """Take one token; returns 0 if allowed, else seconds until one is available"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def create_bucket_store(setting=None):
+    """Build the bucket store selected by RATE_LIMIT_STORE"""
+    setting = RATE_LIMIT_STORE if setting is None else setting
+    if setting == 'memory':
+        return MemoryBucketStore()
+    return SQLiteBucketStore(setting)
+
+
+class TokenBucketLimiter:
+    """Per-client token bucket for one endpoint"""
+
+    def __init__(self, name, rate=None, burst=None, store=None):
+        self.name = name
+        self.rate = RATE_LIMIT_RATE if rate is None else rate
+        self.burst = RATE_LIMIT_BURST if burst is None else burst
+        self.store = store or _default_store()
+        self.rejected = 0
+
+    def acquire(self, client):
+        """
+        Check whether client may make a request now
+
+        Args:
+            client (str): Client identifier
+
+        Returns:
+            float: 0 if allowed, otherwise seconds to wait before retrying
+        """
+        try:
+            wait = self.store.take(f"{self.name}:{client}", self.rate, self.burst, time.time())
+        except sqlite3.Error as e:
+            # Never turn a limiter failure into an outage
+            logger.error(f"Rate limiter store error for {self.name}: {str(e)}")
+            return 0.0
+        if wait:
+            self.rejected += 1
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests for one endpoint, with a bounded wait queue"""
+
+    def __init__(self, name, limit=None, queue=None, queue_timeout=None):
+        self.name = name
+        self.limit = CONCURRENCY_LIMIT if limit is None else limit
+        self.queue = CONCURRENCY_QUEUE if queue is None else queue
+        self.queue_timeout = CONCURRENCY_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Wait for a slot; returns False if the queue is full or the wait timed out"""
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.active += 1
+            return True
+
+        with self._lock:
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+            else:
+                self.rejected += 1
+        return acquired
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+# Limiters by endpoint name, for metrics
+limiters = {}
+
+# Maps a session token to the authenticated user, or None (see set_user_resolver)
+_user_resolver = None
+
+
+def _default_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_bucket_store()
+        return _store
+
+
+def set_user_resolver(resolver):
+    """
+    Let rate limits key on the authenticated user
+
+    Args:
+        resolver (callable): Session token (Authorization header) ->
+            user id, or None if the token is not a valid session
+    """
+    global _user_resolver
+    _user_resolver = resolver
+
+
+def client_id():
+    """
+    Identify the client of the current request
+
+    Requests with a valid session are keyed on the user, so users behind
+    one NAT address get separate buckets; an unknown token falls back to
+    the address and cannot mint fresh buckets. Anonymous requests are
+    keyed on the peer address: X-Forwarded-For is client-controlled and
+    never read here; behind trusted proxies ProxyFix rewrites
+    remote_addr from it instead.
+    """
+    token = request.headers.get('Authorization')
+    if token and _user_resolver is not None:
+        try:
+            user = _user_resolver(token)
+        except Exception as e:
+            # Never turn a lookup failure into an outage
+            logger.error(f"Rate limit user lookup failed: {str(e)}")
+            user = None
+        if user:
+            return f"user:{user}"
+    return request.remote_addr or 'unknown'
+
+
+def _rejection(status, error, message, retry_after):
+    response = jsonify({
+        'success': False,
+        'error': error,
+        'message': message,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_control(name, rate=None, burst=None, limit=None, queue=None):
+    """
+    Decorator applying a per-client rate limit and a concurrency limit to an endpoint
+
+    Requests over the client's rate get 429, requests that cannot get a
+    slot within the queue bounds get 503; both carry Retry-After.
+
+    Args:
+        name (str): Endpoint name used for bucket keys and metrics
+        rate (float): Tokens per second per client
+        burst (float): Bucket size
+        limit (int): Concurrent requests per process
+        queue (int): Requests allowed to wait for a slot
+    """
+    bucket = TokenBucketLimiter(name, rate=rate, burst=burst)
+    concurrency = ConcurrencyLimiter(name, limit=limit, queue=queue)
+    limiters[name] = (bucket, concurrency)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            client = client_id()
+            wait = bucket.acquire(client)
+            if wait:
+                logger.warning(f"Rate limit exceeded on {name} for {client}")
+                return _rejection(429, 'Too many requests',
+                                  'Rate limit exceeded, please retry later', wait)
+
+            if not concurrency.acquire():
+                logger.warning(f"Shedding request on {name}: {concurrency.active} active, "
+                               f"{concurrency.waiting} waiting")
+                return _rejection(503, 'Service overloaded',
+                                  'Server is busy, please retry shortly', concurrency.queue_timeout)
+            try:
+                response = make_response(f(*args, **kwargs))
+            except BaseException:
+                concurrency.release()
+                raise
+            # Streamed bodies are produced after the view returns; keep the slot until they finish
+            response.call_on_close(concurrency.release)
+            return response
+        return decorated_function
+    return decorator
+
+
+def admission_stats():
+    """
+    Get rate limit and concurrency metrics per endpoint
+
+    Returns:
+        dict: endpoint -> counters
+    """
+    return {
+        name: {
+            'rate_limited': bucket.rejected,
+            'shed': concurrency.rejected,
+            'active': concurrency.active,
+            'waiting': concurrency.waiting,
+            'concurrency_limit': concurrency.limit,
+            'queue_limit': concurrency.queue
+        }
+        for name, (bucket, concurrency) in limiters.items()
+    }
@@ -1,22 +1,109 @@
 import csv
 import os
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import repeat
+import threading
+import time
+
+from timing import current_timer, stage
+
+# Get the path relative to this file (SCHEMEASSIST_DATA_DIR points at another data directory)
+CATALOG_PATH = os.path.join(
+    os.environ.get("SCHEMEASSIST_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")),
+    "combined_schemes.csv"
+)
+
+
+class Catalog:
+    """
+    Parsed scheme catalog for one catalog version.
+    Rows are shared by every request and must not be modified.
+    """
+
+    def __init__(self, version, schemes, load_seconds=0.0):
+        self.version = version
+        self.schemes = schemes
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, builder):
+        """
+        Get data derived from this catalog version, building it on first use.
+        Derived data is dropped together with the catalog when the file changes.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = builder()
+                    self._derived[name] = value
+        return value
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Get the current catalog, reloading it when the catalog file changes"""
+    global _catalog
+    version = get_catalog_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                started = time.perf_counter()
+                with open(CATALOG_PATH, newline="", encoding="utf-8") as file:
+                    schemes = list(csv.DictReader(file))
+                catalog = Catalog(version, schemes, time.perf_counter() - started)
+                _catalog = catalog
+    return catalog
+
+
+def loaded_catalog():
+    """Get the catalog currently in memory without checking the file, or None"""
+    return _catalog
+
 
 def load_schemes():
-    schemes = []
-    # Get the path relative to this file
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(current_dir, "..", "data", "combined_schemes.csv")
-    
-    with open(csv_path, newline="", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            schemes.append(row)
-    return schemes
+    return list(iter_schemes())
+
+
+def iter_schemes():
+    """Yield rows of the current catalog one at a time"""
+    return iter(get_catalog().schemes)
+
+
+def get_catalog_version():
+    """
+    Identify the current contents of the scheme catalog.
+    Changes whenever the catalog file is rewritten.
+    """
+    st = os.stat(CATALOG_PATH)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
 
 
 # Valid caste categories
 CASTE_CATEGORIES = ["SC", "ST", "OBC", "BC", "General", "All"]
 
+# Recommendation fields that depend on the user profile
+RECOMMENDATION_DYNAMIC_FIELDS = ("score", "match_percentage", "age_eligible", "caste_eligible")
+
+# User categories that earn a partial category bonus on schemes of other categories
+PARTIAL_MATCH_CATEGORIES = ["Social Welfare", "Education", "Health"]
+
+# Score every scheme gets for passing the income filter, and the bonus for an age match
+INCOME_BASE_SCORE = 25
+AGE_BONUS = 20
+
+# Profile fields a recommendation delta can change
+DELTA_FIELDS = ("state", "income", "age", "category", "caste_category")
+
 
 def recommend_schemes(user_profile, min_match_score=95):
     """
@@ -27,65 +114,336 @@ def recommend_schemes(user_profile, min_match_score=95):
         user_profile: dict with keys - state, income, age, category, caste_category
         min_match_score: minimum eligibility score (default 95 for 95-100% matches)
     """
-    schemes = load_schemes()
-    recommended = []
+    with stage("filter"):
+        recommended = list(iter_recommendations(user_profile, min_match_score))
+    with stage("sort"):
+        recommended.sort(key=lambda x: x["score"], reverse=True)
+    return recommended
 
-    for scheme in schemes:
-        if scheme["is_active"] != "Yes":
+
+def iter_recommendations(user_profile, min_match_score=95):
+    """
+    Yield matching schemes in catalog order as they are found.
+    Same filtering and scoring as recommend_schemes, without the final sort.
+    """
+    with stage("catalog"):
+        catalog = get_catalog()
+    for index, score, age_eligible, caste_eligible in iter_recommendation_matches(user_profile, min_match_score, catalog):
+        yield build_recommendation(catalog.schemes[index], score, age_eligible, caste_eligible)
+
+
+def iter_recommendation_matches(user_profile, min_match_score=95, catalog=None, index_range=None):
+    """
+    Yield (index, score, age_eligible, caste_eligible) for every scheme
+    recommended for the profile, in catalog order.
+    
+    Only partitions in the user's state (or central) whose score bound
+    reaches min_match_score are visited, and schemes are skipped on the
+    cheap income and age checks before the full score is computed.
+    index_range (start, stop) limits the scan to one shard of the catalog.
+    """
+    catalog = catalog or get_catalog()
+    timer = current_timer()
+    partitions = get_score_partitions(catalog)
+    windows = partitions["windows"]
+    income = user_profile.get("income", 0)
+    age = user_profile.get("age", 30)
+    
+    for index, bound in merge(*iter_candidate_partitions(partitions, user_profile, min_match_score, index_range)):
+        min_income, max_income, min_age, max_age = windows[index]
+        if not min_income <= income <= max_income:
+            continue
+        # Outside the age window the scheme loses the age bonus
+        if bound - AGE_BONUS < min_match_score and not min_age <= age <= max_age:
             continue
+        
+        scheme = catalog.schemes[index]
+        if timer is None:
+            match = score_match(scheme, user_profile, min_match_score)
+        else:
+            started = time.perf_counter()
+            match = score_match(scheme, user_profile, min_match_score)
+            timer.add("score", time.perf_counter() - started)
+
+        if match is not None:
+            yield (index,) + match
 
-        if scheme["state"] != "All" and scheme["state"] != user_profile.get("state"):
+
+def build_score_partitions(catalog):
+    """
+    Group the active schemes of a catalog by state, then by category and
+    target group, the fields that fix every score term except the age
+    bonus. Income and age windows are parsed once per catalog.
+    """
+    partitions, windows = {}, {}
+    for index, scheme in enumerate(catalog.schemes):
+        if scheme["is_active"] != "Yes":
             continue
+        key = (scheme["category"], scheme.get("target_group", "").upper())
+        partitions.setdefault(scheme["state"], {}).setdefault(key, []).append(index)
+        windows[index] = (int(scheme["min_income"]), int(scheme["max_income"]),
+                          int(scheme.get("min_age", 0)), int(scheme.get("max_age", 100)))
+    return {"partitions": partitions, "windows": windows}
 
-        income = user_profile.get("income", 0)
-        min_income = int(scheme["min_income"])
-        max_income = int(scheme["max_income"])
 
-        if min_income <= income <= max_income:
-            # Calculate eligibility score
-            score = calculate_eligibility_score(scheme, user_profile)
-            
-            # Only include schemes with 95-100% match
-            if score < min_match_score:
-                continue
-            
-            # Check age eligibility if provided
-            age = user_profile.get("age", 30)
-            min_age = int(scheme.get("min_age", 0))
-            max_age = int(scheme.get("max_age", 100))
-            
-            age_eligible = min_age <= age <= max_age
-            
-            # Check caste category eligibility
-            user_caste = user_profile.get("caste_category", "General").upper()
-            scheme_target = scheme.get("target_group", "").upper()
-            caste_eligible = check_caste_eligibility(user_caste, scheme_target)
-            
-            if not caste_eligible:
+def get_score_partitions(catalog):
+    """Get the score partitions of a catalog, building them on first use"""
+    return catalog.derived("score_partitions", lambda: build_score_partitions(catalog))
+
+
+def partition_base_score(category, state, target, user_profile, caste_terms=None):
+    """
+    Score of a scheme in a partition before the age bonus and the cap at
+    100; the fields of the partition fix every other score term.
+    Returns None when the target group rules out the user's caste.
+    
+    Args:
+        caste_terms (dict): Caste bonus per target group, shared across
+            the partitions of one request
+    """
+    user_caste = user_profile.get("caste_category", "General").upper()
+    if caste_terms is None:
+        caste_terms = {}
+    caste = caste_terms.get(target)
+    if caste is None:
+        caste = caste_terms[target] = caste_bonus(user_caste, target)
+    if not caste:
+        return None
+    
+    score = INCOME_BASE_SCORE + caste
+    if category == user_profile.get("category"):
+        score += 25
+    elif user_profile.get("category") in PARTIAL_MATCH_CATEGORIES:
+        score += 10
+    if state == "All":
+        score += 5
+    elif state == user_profile.get("state"):
+        score += 10
+    return score
+
+
+def partition_score_bound(category, state, target, user_profile, caste_terms=None):
+    """
+    Highest eligibility score of a scheme in a partition: the score of a
+    scheme whose age window contains the user's age.
+    Returns None when the target group rules out the user's caste.
+    """
+    score = partition_base_score(category, state, target, user_profile, caste_terms)
+    if score is None:
+        return None
+    return min(score + AGE_BONUS, 100)
+
+
+def iter_candidate_partitions(partitions, user_profile, min_match_score, index_range=None):
+    """
+    Yield, per partition that can reach min_match_score, the (index,
+    bound) pairs of its schemes in catalog order, optionally only those
+    with start <= index < stop for index_range (start, stop)
+    """
+    caste_terms = {}
+    for state in dict.fromkeys(("All", user_profile.get("state"))):
+        for (category, target), indices in partitions["partitions"].get(state, {}).items():
+            bound = partition_score_bound(category, state, target, user_profile, caste_terms)
+            if bound is None or bound < min_match_score:
                 continue
-            
-            recommended.append({
-                "scheme_id": scheme.get("scheme_id", ""),
-                "scheme_name": scheme["scheme_name"],
-                "category": scheme["category"],
-                "caste_category": get_scheme_caste_category(scheme_target),
-                "score": score,
-                "match_percentage": f"{score}%",
-                "last_updated": scheme["last_updated"],
-                "benefits": scheme.get("benefits", ""),
-                "target_group": scheme.get("target_group", ""),
-                "min_income": min_income,
-                "max_income": max_income,
-                "min_age": min_age,
-                "max_age": max_age,
-                "level": scheme.get("level", "Central"),
-                "state": scheme.get("state", "All"),
-                "age_eligible": age_eligible,
-                "caste_eligible": caste_eligible
-            })
+            if index_range is not None:
+                indices = indices[bisect_left(indices, index_range[0]):bisect_left(indices, index_range[1])]
+            yield zip(indices, repeat(bound))
 
-    recommended.sort(key=lambda x: x["score"], reverse=True)
-    return recommended
+
+def passes_filters(scheme, user_profile):
+    """Check the active, state and income filters applied before scoring"""
+    if scheme["is_active"] != "Yes":
+        return False
+
+    if scheme["state"] != "All" and scheme["state"] != user_profile.get("state"):
+        return False
+
+    income = user_profile.get("income", 0)
+    return int(scheme["min_income"]) <= income <= int(scheme["max_income"])
+
+
+def score_match(scheme, user_profile, min_match_score):
+    """
+    Score a scheme that passed the state and income filters.
+    Returns (score, age_eligible, caste_eligible), or None if it is not recommended.
+    """
+    # Calculate eligibility score
+    score = calculate_eligibility_score(scheme, user_profile)
+    
+    # Only include schemes with 95-100% match
+    if score < min_match_score:
+        return None
+    
+    # Check age eligibility if provided
+    age = user_profile.get("age", 30)
+    min_age = int(scheme.get("min_age", 0))
+    max_age = int(scheme.get("max_age", 100))
+    
+    age_eligible = min_age <= age <= max_age
+    
+    # Check caste category eligibility
+    user_caste = user_profile.get("caste_category", "General").upper()
+    scheme_target = scheme.get("target_group", "").upper()
+    caste_eligible = check_caste_eligibility(user_caste, scheme_target)
+    
+    if not caste_eligible:
+        return None
+    
+    return score, age_eligible, caste_eligible
+
+
+def build_recommendation(scheme, score, age_eligible, caste_eligible):
+    """Build the recommendation record returned for a matching scheme"""
+    scheme_target = scheme.get("target_group", "").upper()
+    return {
+        "scheme_id": scheme.get("scheme_id", ""),
+        "scheme_name": scheme["scheme_name"],
+        "category": scheme["category"],
+        "caste_category": get_scheme_caste_category(scheme_target),
+        "score": score,
+        "match_percentage": f"{score}%",
+        "last_updated": scheme["last_updated"],
+        "benefits": scheme.get("benefits", ""),
+        "target_group": scheme.get("target_group", ""),
+        "min_income": int(scheme["min_income"]),
+        "max_income": int(scheme["max_income"]),
+        "min_age": int(scheme.get("min_age", 0)),
+        "max_age": int(scheme.get("max_age", 100)),
+        "level": scheme.get("level", "Central"),
+        "state": scheme.get("state", "All"),
+        "age_eligible": age_eligible,
+        "caste_eligible": caste_eligible
+    }
+
+
+def recommendation_static_fields(scheme):
+    """The part of a recommendation record that does not depend on the user profile"""
+    record = build_recommendation(scheme, 0, False, False)
+    for field in RECOMMENDATION_DYNAMIC_FIELDS:
+        del record[field]
+    return record
+
+
+def match_scheme(scheme, user_profile, min_match_score=95):
+    """
+    Filter and score one scheme for a profile.
+    Returns (score, age_eligible, caste_eligible), or None if it is not recommended.
+    """
+    if not passes_filters(scheme, user_profile):
+        return None
+    return score_match(scheme, user_profile, min_match_score)
+
+
+def _interval_bounds(intervals):
+    """Sorted interval starts and ends, each with the catalog indices in the same order"""
+    starts = sorted((low, index) for index, low, _ in intervals)
+    ends = sorted((high, index) for index, _, high in intervals)
+    return ([value for value, _ in starts], [index for _, index in starts],
+            [value for value, _ in ends], [index for _, index in ends])
+
+
+def build_delta_index(catalog):
+    """
+    Index the active schemes of a catalog by each profile field.
+    Income and age windows are kept as sorted interval bounds; state,
+    category and target group are partitions of catalog indices.
+    """
+    active, incomes, ages = [], [], []
+    partitions = {"state": {}, "category": {}, "target": {}}
+    for index, scheme in enumerate(catalog.schemes):
+        if scheme["is_active"] != "Yes":
+            continue
+        active.append(index)
+        incomes.append((index, int(scheme["min_income"]), int(scheme["max_income"])))
+        ages.append((index, int(scheme.get("min_age", 0)), int(scheme.get("max_age", 100))))
+        if scheme["state"] != "All":
+            partitions["state"].setdefault(scheme["state"], []).append(index)
+        partitions["category"].setdefault(scheme["category"], []).append(index)
+        partitions["target"].setdefault(scheme.get("target_group", "").upper(), []).append(index)
+    return dict(partitions, active=active, income=_interval_bounds(incomes), age=_interval_bounds(ages))
+
+
+def get_delta_index(catalog):
+    """Get the delta index of a catalog, building it on first use"""
+    return catalog.derived("delta_index", lambda: build_delta_index(catalog))
+
+
+def interval_changes(bounds, old_value, new_value):
+    """
+    Indices of the intervals that may contain one value but not the other:
+    those with a start or an end between the two values.
+    """
+    starts, start_indices, ends, end_indices = bounds
+    low, high = sorted((old_value, new_value))
+    if low == high:
+        return set()
+    changed = set(start_indices[bisect_right(starts, low):bisect_right(starts, high)])
+    changed.update(end_indices[bisect_left(ends, low):bisect_left(ends, high)])
+    return changed
+
+
+def delta_candidates(catalog, old_profile, new_profile, fields):
+    """
+    Catalog indices whose filters or score terms differ between two
+    profiles that differ in the given fields. Every other scheme keeps
+    its result.
+    """
+    delta_index = get_delta_index(catalog)
+    candidates = set()
+    for field in fields:
+        old_value, new_value = old_profile.get(field), new_profile.get(field)
+        if field in ("income", "age"):
+            candidates |= interval_changes(delta_index[field], old_value, new_value)
+        elif field == "state":
+            for state in (old_value, new_value):
+                candidates.update(delta_index["state"].get(state, ()))
+        elif field == "category":
+            if (old_value in PARTIAL_MATCH_CATEGORIES) != (new_value in PARTIAL_MATCH_CATEGORIES):
+                # The partial bonus moves every scheme of another category
+                return set(delta_index["active"])
+            for category in (old_value, new_value):
+                candidates.update(delta_index["category"].get(category, ()))
+        elif field == "caste_category":
+            old_caste, new_caste = old_value.upper(), new_value.upper()
+            for target, indices in delta_index["target"].items():
+                if (check_caste_eligibility(old_caste, target) != check_caste_eligibility(new_caste, target)
+                        or caste_bonus(old_caste, target) != caste_bonus(new_caste, target)):
+                    candidates.update(indices)
+    return candidates
+
+
+def recommendation_delta(old_profile, new_profile, min_match_score=95, catalog=None):
+    """
+    Changes to the recommendations of old_profile when it becomes new_profile.
+    Only schemes indexed under the changed fields are scored again.
+    
+    Args:
+        old_profile, new_profile: complete profiles as built by build_user_profile
+        min_match_score: minimum eligibility score of both result sets
+    
+    Returns:
+        dict: fields (changed profile fields), candidates (schemes scored),
+            added and updated (matches as (index, score, age_eligible,
+            caste_eligible)) and removed (catalog indices)
+    """
+    catalog = catalog or get_catalog()
+    fields = [field for field in DELTA_FIELDS if old_profile.get(field) != new_profile.get(field)]
+    candidates = delta_candidates(catalog, old_profile, new_profile, fields)
+    added, removed, updated = [], [], []
+    for index in sorted(candidates):
+        scheme = catalog.schemes[index]
+        before = match_scheme(scheme, old_profile, min_match_score)
+        after = match_scheme(scheme, new_profile, min_match_score)
+        if after is None:
+            if before is not None:
+                removed.append(index)
+        elif before is None:
+            added.append((index,) + after)
+        elif before != after:
+            updated.append((index,) + after)
+    added.sort(key=lambda match: match[1], reverse=True)
+    return {"fields": fields, "candidates": len(candidates), "added": added, "removed": removed, "updated": updated}
 
 
 def check_caste_eligibility(user_caste, scheme_target):
@@ -158,12 +516,12 @@ def calculate_eligibility_score(scheme, user_profile):
     score = 0
     
     # Base score for income match (25 points)
-    score += 25
+    score += INCOME_BASE_SCORE
     
     # Category match bonus (25 points)
     if scheme["category"] == user_profile.get("category"):
         score += 25
-    elif user_profile.get("category") in ["Social Welfare", "Education", "Health"]:
+    elif user_profile.get("category") in PARTIAL_MATCH_CATEGORIES:
         # Partial match for related categories
         score += 10
     
@@ -173,26 +531,13 @@ def calculate_eligibility_score(scheme, user_profile):
     max_age = int(scheme.get("max_age", 100))
     
     if min_age <= age <= max_age:
-        score += 20
+        score += AGE_BONUS
     
     # Caste category match bonus (20 points)
     user_caste = user_profile.get("caste_category", "General").upper()
     scheme_target = scheme.get("target_group", "").upper()
     
-    if check_caste_eligibility(user_caste, scheme_target):
-        # Check if scheme specifically targets user's caste
-        caste_specific_match = False
-        if user_caste == "SC" and ("SC" in scheme_target or "SCHEDULED CASTE" in scheme_target):
-            caste_specific_match = True
-        elif user_caste == "ST" and ("ST" in scheme_target or "SCHEDULED TRIBE" in scheme_target):
-            caste_specific_match = True
-        elif user_caste in ["OBC", "BC"] and ("OBC" in scheme_target or "BC" in scheme_target or "BACKWARD" in scheme_target):
-            caste_specific_match = True
-        
-        if caste_specific_match:
-            score += 20  # Full bonus for specific caste match
-        else:
-            score += 15  # Partial bonus for general eligibility
+    score += caste_bonus(user_caste, scheme_target)
     
     # State-specific scheme bonus (10 points)
     if scheme.get("state") == user_profile.get("state") and scheme.get("state") != "All":
@@ -203,6 +548,31 @@ def calculate_eligibility_score(scheme, user_profile):
     return min(score, 100)
 
 
+def caste_bonus(user_caste, scheme_target):
+    """
+    Caste category part of the eligibility score (0, 15 or 20 points).
+    
+    Args:
+        user_caste: User's caste category, upper case
+        scheme_target: Scheme's target group text, upper case
+    """
+    if not check_caste_eligibility(user_caste, scheme_target):
+        return 0
+    
+    # Check if scheme specifically targets user's caste
+    caste_specific_match = False
+    if user_caste == "SC" and ("SC" in scheme_target or "SCHEDULED CASTE" in scheme_target):
+        caste_specific_match = True
+    elif user_caste == "ST" and ("ST" in scheme_target or "SCHEDULED TRIBE" in scheme_target):
+        caste_specific_match = True
+    elif user_caste in ["OBC", "BC"] and ("OBC" in scheme_target or "BC" in scheme_target or "BACKWARD" in scheme_target):
+        caste_specific_match = True
+    
+    if caste_specific_match:
+        return 20  # Full bonus for specific caste match
+    return 15  # Partial bonus for general eligibility
+
+
 def get_scheme_details(scheme_name):
     """Get detailed information about a specific scheme"""
     schemes = load_schemes()
@@ -230,7 +600,26 @@ def get_scheme_details(scheme_name):
 
 def compare_schemes(scheme_names, user_profile=None):
     """Compare multiple schemes with detailed analysis"""
-    schemes = load_schemes()
+    with stage("catalog"):
+        schemes = get_catalog().schemes
+    
+    with stage("filter"):
+        comparison_data = find_comparison_schemes(schemes, scheme_names, user_profile)
+    
+    # Add comparison insights
+    with stage("insights"):
+        insights = generate_comparison_insights(comparison_data, user_profile)
+        recommendation = get_best_scheme_recommendation(comparison_data, user_profile)
+    
+    return {
+        "schemes": comparison_data,
+        "insights": insights,
+        "recommendation": recommendation
+    }
+
+
+def find_comparison_schemes(schemes, scheme_names, user_profile=None):
+    """Look up the schemes to compare, in the requested order, with eligibility scores"""
     comparison_data = []
     
     for name in scheme_names:
@@ -260,19 +649,13 @@ def compare_schemes(scheme_names, user_profile=None):
                 
                 # Calculate eligibility score if user profile provided
                 if user_profile:
-                    scheme_data["eligibility_score"] = calculate_eligibility_score(scheme, user_profile)
+                    with stage("score"):
+                        scheme_data["eligibility_score"] = calculate_eligibility_score(scheme, user_profile)
                 
                 comparison_data.append(scheme_data)
                 break
     
-    # Add comparison insights
-    insights = generate_comparison_insights(comparison_data, user_profile)
-    
-    return {
-        "schemes": comparison_data,
-        "insights": insights,
-        "recommendation": get_best_scheme_recommendation(comparison_data, user_profile)
-    }
+    return comparison_data
 
 
 def format_income_range(min_income, max_income):
@@ -365,12 +748,24 @@ def search_schemes(query, filters=None):
         query: search keyword
         filters: dict with state, category, min_income, max_income, caste_category
     """
-    schemes = load_schemes()
-    results = []
-    
+    with stage("filter"):
+        return list(iter_search_results(query, filters))
+
+
+def iter_search_results(query, filters=None):
+    """Yield schemes matching a search in catalog order as they are found"""
+    with stage("catalog"):
+        catalog = get_catalog()
+    for index in iter_search_matches(query, filters, catalog):
+        yield catalog.schemes[index]
+
+
+def iter_search_matches(query, filters=None, catalog=None):
+    """Yield the catalog index of every scheme matching a search"""
+    catalog = catalog or get_catalog()
     query_lower = query.lower() if query else ""
     
-    for scheme in schemes:
+    for index, scheme in enumerate(catalog.schemes):
         if scheme["is_active"] != "Yes":
             continue
         
@@ -408,9 +803,7 @@ def search_schemes(query, filters=None):
                 if int(scheme["min_income"]) > int(filters['max_income']):
                     continue
         
-        results.append(scheme)
-    
-    return results
+        yield index
 
 
 def get_scheme_statistics():
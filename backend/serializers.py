@@ -0,0 +1,284 @@
+"""
+Response serialisation for SchemeAssist AI Backend
+Negotiates the wire format of scheme list responses (JSON, NDJSON,
+columnar JSON, MessagePack), applies field projection, streams results
+and assembles JSON bodies from per-scheme fragments cached for each
+catalog version
+"""
+
+import json
+import logging
+from itertools import chain
+
+from flask import Response, request, stream_with_context
+
+from recommender import recommendation_static_fields
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is only offered when msgpack is installed
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+COLUMNAR_MIMETYPE = 'application/vnd.schemeassist.columnar+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+
+RESPONSE_FORMATS = {
+    JSON_MIMETYPE: 'json',
+    NDJSON_MIMETYPE: 'ndjson',
+    COLUMNAR_MIMETYPE: 'columnar',
+    MSGPACK_MIMETYPE: 'msgpack'
+}
+
+
+def response_format():
+    """
+    Pick the wire format for a scheme list from the Accept header
+
+    MessagePack is only offered when the optional msgpack package is
+    installed; clients asking only for it then get JSON.
+
+    Returns:
+        str: json, ndjson, columnar or msgpack
+    """
+    offered = [JSON_MIMETYPE, NDJSON_MIMETYPE, COLUMNAR_MIMETYPE]
+    if msgpack is not None:
+        offered.append(MSGPACK_MIMETYPE)
+    best = request.accept_mimetypes.best_match(offered)
+    return RESPONSE_FORMATS.get(best, 'json')
+
+
+def requested_fields(data=None):
+    """
+    Read the fields= projection from the query string or the JSON body
+
+    Args:
+        data (dict): Parsed request body, if any
+
+    Returns:
+        list: Field names to return, or None for all fields
+    """
+    fields = request.args.get('fields')
+    if fields is None and data:
+        fields = data.get('fields')
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    if not isinstance(fields, list):
+        raise ValueError('fields must be a list or a comma-separated string')
+    fields = [str(field).strip() for field in fields if str(field).strip()]
+    return fields or None
+
+
+def project(record, fields):
+    """Keep only the requested fields of a record"""
+    if not fields:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+# Bodies built here are UTF-8 with keys in insertion order, unlike jsonify's
+# ASCII-escaped sorted output; fragments are spliced together as bytes, so they
+# cannot be re-sorted. Clients parse JSON and must not rely on byte equality.
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _ndjson_line(record):
+    return (_dumps(record) + '\n').encode('utf-8')
+
+
+def _json_bool(value):
+    return 'true' if value else 'false'
+
+
+def recommendation_fragment(catalog, match):
+    """
+    Encode one recommendation from a (index, score, age_eligible,
+    caste_eligible) match
+
+    The scheme's static fields are encoded once per catalog version and
+    cached as bytes; only the per-request fields are formatted here.
+
+    Returns:
+        bytes: JSON object for the recommendation
+    """
+    index, score, age_eligible, caste_eligible = match
+    fragments = catalog.derived('recommendation_fragments', dict)
+    static = fragments.get(index)
+    if static is None:
+        # Encoded without the closing brace so per-request fields can follow
+        static = _dumps(recommendation_static_fields(catalog.schemes[index]))[:-1].encode('utf-8')
+        fragments[index] = static
+    dynamic = (f',"score":{int(score)},"match_percentage":"{int(score)}%",'
+               f'"age_eligible":{_json_bool(age_eligible)},"caste_eligible":{_json_bool(caste_eligible)}}}')
+    return static + dynamic.encode('utf-8')
+
+
+def recommendation_record(catalog, match):
+    """Build a recommendation dict from a match, reusing the cached static fields"""
+    index, score, age_eligible, caste_eligible = match
+    statics = catalog.derived('recommendation_static', dict)
+    static = statics.get(index)
+    if static is None:
+        static = recommendation_static_fields(catalog.schemes[index])
+        statics[index] = static
+    return dict(static, score=score, match_percentage=f"{score}%",
+                age_eligible=age_eligible, caste_eligible=caste_eligible)
+
+
+def scheme_record(catalog, index):
+    """Get the raw catalog row for a search match"""
+    return catalog.schemes[index]
+
+
+def scheme_fragment(catalog, index):
+    """
+    Encode a raw catalog row, cached as bytes per catalog version
+
+    Returns:
+        bytes: JSON object for the scheme
+    """
+    fragments = catalog.derived('scheme_fragments', dict)
+    fragment = fragments.get(index)
+    if fragment is None:
+        fragment = _dumps(catalog.schemes[index]).encode('utf-8')
+        fragments[index] = fragment
+    return fragment
+
+
+def fragments_response(envelope, list_key, fragments):
+    """
+    Build a JSON response from an envelope and pre-encoded list items
+
+    Args:
+        envelope (dict): Top-level fields of the response
+        list_key (str): Name of the field holding the list
+        fragments (iterable): Encoded JSON objects (bytes)
+
+    Returns:
+        Response: application/json response
+    """
+    head = _dumps(envelope)[:-1]
+    separator = ',' if envelope else ''
+    body = b''.join([
+        f'{head}{separator}"{list_key}":['.encode('utf-8'),
+        b','.join(fragments),
+        b']}'
+    ])
+    return Response(body, mimetype='application/json')
+
+
+def fragment_encoder(catalog, fragment_fn, record_fn, fields=None):
+    """
+    Get a function turning matches into JSON bytes
+
+    Uses the cached fragments unless a projection was requested.
+    """
+    if not fields:
+        return lambda match: fragment_fn(catalog, match)
+    return lambda match: _dumps(project(record_fn(catalog, match), fields)).encode('utf-8')
+
+
+def columnar_payload(records, fields=None):
+    """
+    Lay records out with the field names listed once
+
+    Returns:
+        dict: {"fields": [...], "values": [[...], ...]}, one values row per record
+    """
+    records = list(records)
+    if not fields:
+        fields = list(records[0].keys()) if records else []
+    return {
+        "fields": fields,
+        "values": [[record.get(field) for field in fields] for record in records]
+    }
+
+
+def scheme_list_response(fmt, envelope, list_key, catalog, matches, fragment_fn, record_fn, fields=None):
+    """
+    Serialise a list of scheme matches in a negotiated (non-streaming) format
+
+    Args:
+        fmt (str): json, columnar or msgpack
+        envelope (dict): Top-level fields of the response
+        list_key (str): Name of the field holding the list
+        catalog (Catalog): Catalog the matches refer to
+        matches (list): Matches in response order
+        fragment_fn (callable): (catalog, match) -> cached JSON bytes
+        record_fn (callable): (catalog, match) -> dict
+        fields (list): Optional projection
+
+    Returns:
+        Response: Flask response
+    """
+    if fmt == 'msgpack' and msgpack is None:
+        fmt = 'json'
+
+    if fmt == 'json':
+        encode = fragment_encoder(catalog, fragment_fn, record_fn, fields)
+        return fragments_response(envelope, list_key, [encode(match) for match in matches])
+
+    records = [project(record_fn(catalog, match), fields) for match in matches]
+    if fmt == 'columnar':
+        body = dict(envelope, format='columnar')
+        body[list_key] = columnar_payload(records, fields)
+        return Response(_dumps(body), mimetype=COLUMNAR_MIMETYPE)
+
+    if fmt == 'msgpack':
+        body = dict(envelope)
+        body[list_key] = records
+        return Response(msgpack.packb(body, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+
+    raise ValueError(f"Unsupported response format: {fmt}")
+
+
+def ndjson_response(records, summary=None, encode=None):
+    """
+    Stream records to the client as newline-delimited JSON
+
+    Each record is written as {"type": "scheme", "scheme": {...}} as soon
+    as the generator produces it. The stream ends with a single
+    {"type": "end", "count": n, ...} line carrying the summary fields, or
+    {"type": "error", ...} if producing the records failed part way.
+
+    Args:
+        records (iterable): Scheme dicts, typically a generator
+        summary (dict): Extra fields for the closing line
+        encode (callable): Turns a record into JSON bytes; defaults to
+            json.dumps, pass a fragment encoder to reuse cached bytes
+
+    Returns:
+        Response: Streaming Flask response
+    """
+    # Produce the first record eagerly so failures to open the catalog
+    # still surface as a normal error response instead of a broken stream
+    records = iter(records)
+    first = [record for record in [next(records, None)] if record is not None]
+
+    def generate():
+        count = 0
+        try:
+            for record in chain(first, records):
+                count += 1
+                if encode is None:
+                    yield _ndjson_line({"type": "scheme", "scheme": record})
+                else:
+                    yield b'{"type":"scheme","scheme":' + encode(record) + b'}\n'
+        except Exception as e:
+            logger.error(f"Error while streaming results after {count} records: {str(e)}")
+            yield _ndjson_line({
+                "type": "error",
+                "error": "Internal server error",
+                "message": "An unexpected error occurred",
+                "count": count
+            })
+            return
+        yield _ndjson_line(dict(summary or {}, type="end", count=count))
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
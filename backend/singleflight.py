@@ -0,0 +1,94 @@
+"""
+Single-flight request coalescing for SchemeAssist AI Backend
+Concurrent identical computations wait on one in-flight call and share
+its result
+"""
+
+import json
+import threading
+
+
+class _Call:
+    """One in-flight computation and the threads waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls with the same key
+
+    The first caller for a key runs the computation; callers arriving
+    while it is running block until it finishes and receive the same
+    result (or exception). Nothing is cached once the call completes.
+    Results are shared between threads, so they must be treated as
+    read-only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._metrics = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or join an identical call already in flight
+
+        Args:
+            key (str): Canonical description of the computation
+            fn (callable): Computes the result
+
+        Returns:
+            Result of fn, possibly computed by another thread
+        """
+        with self._lock:
+            self._metrics['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._metrics['executions'] += 1
+            else:
+                self._metrics['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._metrics['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """
+        Get coalescing metrics
+
+        Returns:
+            dict: Calls, executions, coalesced calls and in-flight keys
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['in_flight'] = len(self._calls)
+        stats['coalesced_ratio'] = round(stats['coalesced'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
+
+
+def canonical_key(*parts):
+    """Build a stable key from JSON-serialisable parts (dict keys sorted)"""
+    return json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
@@ -0,0 +1,749 @@
+"""
+Storage layer for SchemeAssist AI Backend
+JSON file helpers, a per-user sharded JSON backend and a write-behind
+store for per-user data (favorites, tracked applications)
+"""
+
+import os
+import re
+import json
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from types import MappingProxyType
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Maximum time (seconds) a mutation may wait in memory before it is flushed
+WRITE_BEHIND_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', '0.5'))
+
+# Number of pending mutations that forces an immediate flush
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '50'))
+
+# Number of shard files per sharded store
+STORE_SHARDS = int(os.environ.get('STORE_SHARDS', '64'))
+
+# All write-behind stores created in this process, flushed on shutdown
+_stores = []
+
+# Parsed JSON files: filepath -> ((inode, mtime_ns, size), data)
+_read_cache = {}
+_read_cache_lock = threading.Lock()
+_read_cache_metrics = {'hits': 0, 'misses': 0}
+
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_NUMBER_END = re.compile(r'[ \t\n\r,}\]]')
+
+
+class CopyOnWriteDict(MutableMapping):
+    """
+    Private view over a cached top-level JSON object
+
+    Wraps the cached dict without copying it. A value is copied the
+    first time it is read through the view, so nested lists and dicts can
+    be mutated by request code without reaching the shared cache; writes
+    and deletions are kept in the view. dict(view) and {**view} go through
+    the keys and copy. items() and values() are read-only views for scans
+    over every record: their values may be the cached objects and must
+    not be modified.
+    """
+
+    def __init__(self, shared):
+        # Cached dict, never modified through the view
+        self._shared = shared
+        # key -> private value, for keys read or written through the view
+        self._local = {}
+        # Keys of the shared dict deleted through the view
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        if key in self._local:
+            return self._local[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        value = clone_json(self._shared[key])
+        self._local[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._local[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._local.pop(key, None)
+        if key in self._shared:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self._local or (key in self._shared and key not in self._deleted)
+
+    def __iter__(self):
+        for key in self._shared:
+            if key not in self._deleted:
+                yield key
+        # Reads during iteration add shared keys to _local; walk a snapshot of the added keys
+        for key in [key for key in self._local if key not in self._shared]:
+            yield key
+
+    def __len__(self):
+        added = sum(1 for key in self._local if key not in self._shared)
+        return len(self._shared) - len(self._deleted) + added
+
+    def __repr__(self):
+        return repr(self._merged())
+
+    def items(self):
+        return MappingProxyType(self._merged()).items()
+
+    def values(self):
+        return MappingProxyType(self._merged()).values()
+
+    def copy(self):
+        view = CopyOnWriteDict(self._shared)
+        view._local = {key: clone_json(value) for key, value in self._local.items()}
+        view._deleted = set(self._deleted)
+        return view
+
+    def _merged(self):
+        # Shared dict itself while the view is untouched; changed views pay one shallow merge
+        if not self._local and not self._deleted:
+            return self._shared
+        merged = {key: value for key, value in self._shared.items() if key not in self._deleted}
+        merged.update(self._local)
+        return merged
+
+    def _snapshot(self):
+        # Values never handed out are still the cached (unmodified) objects
+        return {key: clone_json(value) if key in self._local else value
+                for key, value in self._merged().items()}
+
+
+def _file_signature(st):
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _view(data):
+    if isinstance(data, dict):
+        return CopyOnWriteDict(data)
+    return clone_json(data)
+
+
+def _raw(data):
+    # Plain dict for serialisation; skips CopyOnWriteDict's copying accessors
+    if isinstance(data, CopyOnWriteDict):
+        return data._merged()
+    return data
+
+
+def readonly_items(data):
+    """
+    (key, value) pairs of a load_json_file result without copying
+
+    Values may be shared with the read cache: callers must not modify
+    them, and should index the view (data[key]) for a record they change.
+    """
+    return data.items()
+
+
+def _snapshot(data):
+    if isinstance(data, CopyOnWriteDict):
+        return data._snapshot()
+    return clone_json(data)
+
+
+def _cache_put(filepath, signature, data):
+    with _read_cache_lock:
+        _read_cache[filepath] = (signature, data)
+
+
+def read_cache_stats():
+    """
+    Get hit/miss counters for the load_json_file cache
+
+    Returns:
+        dict: Hits, misses, hit ratio and number of cached files
+    """
+    with _read_cache_lock:
+        stats = dict(_read_cache_metrics)
+        stats['cached_files'] = len(_read_cache)
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+    return stats
+
+
+def load_json_file(filepath):
+    """
+    Safely load JSON file with error handling
+
+    Parsed contents are cached per process and revalidated against the
+    file's (inode, mtime_ns, size) on every call, so unchanged files are
+    never parsed twice. Dict contents are returned as a CopyOnWriteDict
+    view: callers may modify it freely without touching the cache.
+    """
+    try:
+        if os.path.exists(filepath):
+            signature = _file_signature(os.stat(filepath))
+            with _read_cache_lock:
+                cached = _read_cache.get(filepath)
+                if cached is not None and cached[0] == signature:
+                    _read_cache_metrics['hits'] += 1
+                    return _view(cached[1])
+                _read_cache_metrics['misses'] += 1
+
+            with open(filepath, 'r', encoding='utf-8') as f:
+                signature = _file_signature(os.fstat(f.fileno()))
+                data = json.load(f)
+            _cache_put(filepath, signature, data)
+            return _view(data)
+        logger.info(f"File {filepath} does not exist, returning empty dict")
+        return {}
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to decode JSON from {filepath}: {str(e)}")
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading {filepath}: {str(e)}")
+        return {}
+
+
+def save_json_file(filepath, data):
+    """Safely save JSON file with error handling"""
+    try:
+        # Create directory if it doesn't exist
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # Write to a unique temporary file first so concurrent writers
+        # never share a temp file
+        fd, temp_filepath = tempfile.mkstemp(dir=os.path.dirname(filepath),
+                                             prefix=os.path.basename(filepath) + '.',
+                                             suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(_raw(data), f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+                # rename keeps inode, mtime and size, so this is the
+                # signature readers will see once the file is in place
+                signature = _file_signature(os.fstat(f.fileno()))
+        except Exception:
+            os.unlink(temp_filepath)
+            raise
+
+        # Rename to actual file (atomic operation)
+        os.replace(temp_filepath, filepath)
+        _cache_put(filepath, signature, _snapshot(data))
+        logger.debug(f"Successfully saved data to {filepath}")
+    except Exception as e:
+        logger.error(f"Error saving to {filepath}: {str(e)}")
+        raise
+
+
+def iter_json_object(filepath, block_size=64 * 1024):
+    """
+    Yield the (key, value) pairs of a file holding one JSON object, one at a time
+
+    Unlike load_json_file the file is read in blocks and never held (or
+    cached) as a whole, for batch jobs walking large files such as
+    users.json.
+
+    Args:
+        filepath (str): Path of the JSON file
+        block_size (int): Characters read at a time
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON object
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer, pos = '', 0
+
+        def more():
+            nonlocal buffer
+            block = f.read(block_size)
+            buffer += block
+            return bool(block)
+
+        def peek():
+            # Next non-whitespace character, reading further blocks as needed
+            nonlocal pos
+            while True:
+                pos = _JSON_WHITESPACE.match(buffer, pos).end()
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not more():
+                    raise ValueError(f"Unexpected end of {filepath}")
+
+        def expect(char):
+            nonlocal pos
+            if peek() != char:
+                raise ValueError(f"Expected '{char}' at character {pos} of {filepath}")
+            pos += 1
+
+        def read_value():
+            nonlocal pos
+            if peek() in '-0123456789':
+                # A number cut off by the end of a block would still parse
+                while not _JSON_NUMBER_END.search(buffer, pos) and more():
+                    pass
+            while True:
+                try:
+                    value, pos = decoder.raw_decode(buffer, pos)
+                    return value
+                except json.JSONDecodeError:
+                    if not more():
+                        raise
+
+        expect('{')
+        if peek() == '}':
+            return
+        while True:
+            if peek() != '"':
+                raise ValueError(f"Expected a key at character {pos} of {filepath}")
+            key = read_value()
+            expect(':')
+            yield key, read_value()
+            if peek() == '}':
+                return
+            expect(',')
+            if pos > block_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def clone_json(value):
+    """
+    Copy a JSON-shaped value (dicts, lists and scalars)
+
+    Much cheaper than copy.deepcopy for the plain structures we store.
+
+    Args:
+        value: Parsed JSON value
+
+    Returns:
+        A structurally independent copy of value
+    """
+    if isinstance(value, dict):
+        return {k: clone_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone_json(v) for v in value]
+    return value
+
+
+class JSONFileBackend:
+    """Keyed access to a single JSON file mapping user_id -> record"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def read(self, key):
+        """Return the stored record for key, or None"""
+        return load_json_file(self.filepath).get(key)
+
+    def write(self, updates):
+        """Merge a dict of key -> record into the file with one save"""
+        with file_lock(self.filepath + '.lock'):
+            data = load_json_file(self.filepath)
+            data.update(updates)
+            save_json_file(self.filepath, data)
+
+    def update(self, changes):
+        """
+        Apply key -> change(current record or None) -> new record under
+        the file lock, against the records as they are on disk now
+        """
+        with file_lock(self.filepath + '.lock'):
+            data = load_json_file(self.filepath)
+            for key, change in changes.items():
+                data[key] = change(data.get(key))
+            save_json_file(self.filepath, data)
+
+
+# Serialises lock holders inside this process when fcntl is unavailable
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Hold an exclusive cross-process lock on lock_path
+
+    Uses fcntl.flock so separate gunicorn workers exclude each other.
+
+    Args:
+        lock_path (str): Path of the lock file (created if missing)
+    """
+    if fcntl is None:
+        with _local_locks_guard:
+            lock = _local_locks.setdefault(lock_path, threading.Lock())
+        with lock:
+            yield
+        return
+
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class ShardedJSONBackend:
+    """
+    Keyed JSON storage split across shard files by a hash of the key
+
+    Each write touches only the shards holding the changed keys and is
+    done under an fcntl lock with an atomic os.replace, so workers never
+    lose each other's updates. Keys missing from the shards are read from
+    the legacy single-file store, if one is given.
+    """
+
+    def __init__(self, directory, legacy_file=None, shards=None):
+        self.directory = directory
+        self.legacy_file = legacy_file
+        self.shards = STORE_SHARDS if shards is None else shards
+
+    def shard_path(self, key):
+        """Get the shard file holding key"""
+        digest = hashlib.sha1(str(key).encode('utf-8')).hexdigest()
+        index = int(digest[:8], 16) % self.shards
+        return os.path.join(self.directory, f"shard_{index:03d}.json")
+
+    def _load_shard(self, path):
+        # Most shards start out missing; skip load_json_file's log line
+        if not os.path.exists(path):
+            return {}
+        return load_json_file(path)
+
+    def read(self, key):
+        """Return the stored record for key, or None"""
+        data = self._load_shard(self.shard_path(key))
+        if key in data:
+            return data[key]
+        if self.legacy_file:
+            return load_json_file(self.legacy_file).get(key)
+        return None
+
+    def write(self, updates):
+        """Merge a dict of key -> record into the shards holding each key"""
+        by_shard = {}
+        for key, value in updates.items():
+            by_shard.setdefault(self.shard_path(key), {})[key] = value
+
+        for path, shard_updates in by_shard.items():
+            with file_lock(path + '.lock'):
+                data = self._load_shard(path)
+                data.update(shard_updates)
+                save_json_file(path, data)
+
+    def update(self, changes):
+        """
+        Apply key -> change(current record or None) -> new record
+
+        Each shard is re-read under its lock and the changes are applied
+        to the records as they are now, so updates another worker wrote
+        since this process read a record are kept.
+        """
+        by_shard = {}
+        for key, change in changes.items():
+            by_shard.setdefault(self.shard_path(key), {})[key] = change
+
+        for path, shard_changes in by_shard.items():
+            with file_lock(path + '.lock'):
+                data = self._load_shard(path)
+                for key, change in shard_changes.items():
+                    if key in data:
+                        current = data[key]
+                    elif self.legacy_file:
+                        current = load_json_file(self.legacy_file).get(key)
+                    else:
+                        current = None
+                    data[key] = change(current)
+                save_json_file(path, data)
+
+    def migrate_legacy(self):
+        """
+        Copy records from the legacy single-file store into the shards
+
+        Keys already present in a shard are left untouched.
+
+        Returns:
+            int: Number of records copied
+        """
+        if not self.legacy_file:
+            return 0
+        legacy = load_json_file(self.legacy_file)
+        missing = {}
+        for key, value in readonly_items(legacy):
+            if key not in self._load_shard(self.shard_path(key)):
+                missing[key] = value
+        if missing:
+            self.write(missing)
+        return len(missing)
+
+
+class WriteBehindStore:
+    """
+    Write-behind layer over a keyed JSON backend
+
+    Mutations are applied in memory immediately and become visible to
+    readers in this process at once. The mutation functions themselves
+    are kept pending and replayed at flush time against the record as it
+    is stored then (under the backend's lock), so concurrent workers
+    changing the same record do not overwrite each other. A background
+    flush runs WRITE_BEHIND_INTERVAL seconds after the first unflushed
+    mutation, or right away once WRITE_BEHIND_MAX_PENDING mutations are
+    waiting. Pending data is also flushed when the process exits.
+    """
+
+    def __init__(self, backend, flush_interval=None, max_pending=None):
+        self.backend = backend
+        self.flush_interval = WRITE_BEHIND_INTERVAL if flush_interval is None else flush_interval
+        self.max_pending = WRITE_BEHIND_MAX_PENDING if max_pending is None else max_pending
+        self._lock = threading.RLock()
+        # Serialises flushes so batches reach the backend in order; never held with _lock while waiting
+        self._flush_lock = threading.Lock()
+        # key -> (default_factory, [mutation functions]) not yet written
+        self._pending = {}
+        # key -> record with the pending mutations applied, for readers in this process
+        self._values = {}
+        self._pending_ops = 0
+        self._timer = None
+        self._metrics = {
+            'mutations': 0,
+            'flushes': 0,
+            'flushed_mutations': 0,
+            'flushed_keys': 0,
+            'flush_errors': 0,
+            'last_flush_seconds': 0.0
+        }
+        _stores.append(self)
+
+    def _current(self, key, default_factory):
+        # Caller must hold self._lock
+        if key in self._values:
+            return self._values[key]
+        value = self.backend.read(key)
+        if value is None and default_factory is not None:
+            value = default_factory()
+        return value
+
+    def _record(self, key, fns, value, default_factory):
+        # Caller must hold self._lock
+        if key in self._pending:
+            self._pending[key][1].extend(fns)
+        else:
+            self._pending[key] = (default_factory, list(fns))
+        self._values[key] = value
+
+    def _schedule_flush(self, delay):
+        # Caller must hold self._lock; the flush runs on a timer thread, never the caller's
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def get(self, key, default=None):
+        """
+        Get a copy of the record stored under key
+
+        Args:
+            key (str): Record key (user_id)
+            default: Value returned when the key does not exist
+
+        Returns:
+            Copy of the record, including unflushed changes
+        """
+        with self._lock:
+            value = self._current(key, None)
+            if value is None:
+                return default
+            return clone_json(value)
+
+    def mutate(self, key, fn, default_factory=list):
+        """
+        Apply an in-place mutation to the record stored under key
+
+        fn is kept until the next flush and applied again to the stored
+        record then, so it must only depend on its argument and values
+        captured when it was created.
+
+        Args:
+            key (str): Record key (user_id)
+            fn (callable): Receives the record, mutates it in place and
+                returns True if anything changed
+            default_factory (callable): Builds the record for new keys
+
+        Returns:
+            Copy of the record after the mutation
+        """
+        with self._lock:
+            value = clone_json(self._current(key, default_factory))
+            if fn(value):
+                self._record(key, [fn], value, default_factory)
+                self._pending_ops += 1
+                self._metrics['mutations'] += 1
+                self._schedule_flush(0 if self._pending_ops >= self.max_pending else self.flush_interval)
+            return clone_json(value)
+
+    def get_many(self, keys, default=None):
+        """
+        Get copies of the records stored under several keys
+
+        Args:
+            keys (list): Record keys (user_ids)
+            default: Value used for keys that do not exist
+
+        Returns:
+            dict: key -> copy of the record
+        """
+        return {key: self.get(key, clone_json(default)) for key in keys}
+
+    def mutate_many(self, mutations, default_factory=list):
+        """
+        Apply a list of mutations atomically and persist them in one flush
+
+        Every mutation runs against a staged copy; if any of them raises,
+        nothing is applied. Otherwise all changed records are written to
+        the backend immediately in a single flush, and a failed write is
+        raised to the caller. The mutations then stay pending and are
+        retried like any other failed flush.
+
+        Args:
+            mutations (list): (key, fn) pairs, fn as for mutate()
+            default_factory (callable): Builds the record for new keys
+
+        Returns:
+            dict: key -> copy of the record after all mutations
+
+        Raises:
+            Exception: If the batch could not be written; it stays pending
+        """
+        with self._lock:
+            staged = {}
+            fns = {}
+            changed = set()
+            count = 0
+            for key, fn in mutations:
+                if key not in staged:
+                    staged[key] = clone_json(self._current(key, default_factory))
+                fns.setdefault(key, []).append(fn)
+                if fn(staged[key]):
+                    changed.add(key)
+                    count += 1
+
+            if changed:
+                for key in changed:
+                    self._record(key, fns[key], staged[key], default_factory)
+                self._pending_ops += count
+                self._metrics['mutations'] += count
+            result = {key: clone_json(value) for key, value in staged.items()}
+
+        if changed:
+            self.flush(raise_errors=True)
+        return result
+
+    def flush(self, raise_errors=False):
+        """
+        Replay all pending mutations against the stored records in one backend update
+
+        The pending batch is swapped out under the lock and written
+        without it, so readers and new mutations are not blocked by the
+        disk write. A failed batch is merged back in front of anything
+        recorded meanwhile and retried on the next window.
+
+        Args:
+            raise_errors (bool): Re-raise a failed backend update after
+                keeping the batch, instead of only logging it
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending:
+                    return
+                pending, ops = self._pending, self._pending_ops
+                self._pending = {}
+                self._pending_ops = 0
+
+            started = time.perf_counter()
+            try:
+                self.backend.update({key: _replay(default_factory, fns)
+                                     for key, (default_factory, fns) in pending.items()})
+            except Exception as e:
+                with self._lock:
+                    for key, (default_factory, fns) in pending.items():
+                        if key in self._pending:
+                            fns = fns + self._pending[key][1]
+                        self._pending[key] = (default_factory, fns)
+                    self._pending_ops += ops
+                    self._metrics['flush_errors'] += 1
+                    self._schedule_flush(self.flush_interval)
+                logger.error(f"Write-behind flush failed, {len(pending)} records kept pending: {str(e)}")
+                if raise_errors:
+                    raise
+                return
+
+            with self._lock:
+                # The stored records may now include other workers' changes; read them back on
+                # demand, except where newer mutations are still pending on top of them
+                for key in pending:
+                    if key not in self._pending:
+                        self._values.pop(key, None)
+                self._metrics['flushes'] += 1
+                self._metrics['flushed_mutations'] += ops
+                self._metrics['flushed_keys'] += len(pending)
+                self._metrics['last_flush_seconds'] = round(time.perf_counter() - started, 6)
+
+    def stats(self):
+        """
+        Get write coalescing metrics for this store
+
+        Returns:
+            dict: Mutation/flush counters and the coalescing ratio
+                (mutations persisted per disk write)
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['pending_mutations'] = self._pending_ops
+            stats['pending_keys'] = len(self._pending)
+        flushes = stats['flushes']
+        stats['coalescing_ratio'] = round(stats['flushed_mutations'] / flushes, 2) if flushes else 0.0
+        return stats
+
+
+def _replay(default_factory, fns):
+    """Build a backend change applying pending mutation functions to the stored record"""
+    def change(current):
+        value = clone_json(current) if current is not None else default_factory()
+        for fn in fns:
+            fn(value)
+        return value
+    return change
+
+
+def flush_all_stores():
+    """Flush every write-behind store in this process"""
+    for store in list(_stores):
+        try:
+            store.flush()
+        except Exception as e:
+            logger.error(f"Error flushing store on shutdown: {str(e)}")
+
+
+atexit.register(flush_all_stores)
@@ -0,0 +1,90 @@
+"""
+Stage timers for SchemeAssist AI Backend
+Records where a request spends its time (catalog, filter, score, sort,
+serialize) for the Server-Timing header. Code outside a timed request
+pays only a context variable lookup.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('stage_timer', default=None)
+
+
+class StageTimer:
+    """
+    Exclusive time per stage for one request
+
+    Time spent in a stage nested inside another is only counted for the
+    inner stage, so the stages add up to (at most) the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self._nested = []
+
+    def add(self, name, seconds):
+        """Add time measured by the caller to a stage"""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        if self._nested:
+            self._nested[-1] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as one stage"""
+        self._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """Stage durations in milliseconds, plus the total so far"""
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+        timings['total'] = round(self.total() * 1000, 3)
+        return timings
+
+    def header(self):
+        """Format the stages as a Server-Timing header value"""
+        return ', '.join(f"{name};dur={duration}" for name, duration in self.as_dict().items())
+
+
+def current_timer():
+    """Get the timer of the request being handled, or None"""
+    return _current.get()
+
+
+def start_timer():
+    """
+    Start timing stages in the current context
+
+    Returns:
+        tuple: (timer, token to pass to stop_timer)
+    """
+    timer = StageTimer()
+    return timer, _current.set(timer)
+
+
+def stop_timer(token):
+    _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage of the current request, if one is being timed"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
@@ -5,8 +5,16 @@ Provides common helper functions used across the application
 
 import os
 import csv
+import logging
 from datetime import datetime
-import json
+
+from analytics import note_request
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the CSV data files
+DATA_DIR = os.environ.get('SCHEMEASSIST_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
 
 
 def validate_user_profile(user_profile):
@@ -44,6 +52,23 @@ def validate_user_profile(user_profile):
     return True, None
 
 
+def build_user_profile(data):
+    """Build a recommendation profile from request data, raising KeyError for missing fields"""
+    required_fields = ['state', 'income', 'category']
+    for field in required_fields:
+        if field not in data:
+            raise KeyError(field)
+    
+    # Create user profile with caste category support
+    return {
+        "state": data['state'],
+        "income": int(data['income']),
+        "category": data['category'],
+        "age": int(data.get('age', 30)) if data.get('age') else 30,
+        "caste_category": data.get('caste_category', 'General')
+    }
+
+
 def get_data_path(filename):
     """
     Get absolute path to a file in the data directory
@@ -54,8 +79,7 @@ def get_data_path(filename):
     Returns:
         str: Absolute path to the file
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(current_dir, "..", "data", filename)
+    return os.path.join(DATA_DIR, filename)
 
 
 def load_csv_data(filename):
@@ -203,21 +227,24 @@ def get_scheme_statistics(schemes):
     return stats
 
 
-def log_request(user_profile, results_count):
+def log_request(user_profile, results_count, endpoint='recommend'):
     """
-    Log recommendation request for analytics
+    Log a recommendation or search request and record it in the request analytics
     
     Args:
-        user_profile (dict): User profile data
-        results_count (int): Number of recommendations returned
+        user_profile (dict): User profile data (or the search filters)
+        results_count (int): Number of results returned (None if streamed)
+        endpoint (str): recommend or search
     """
+    note_request(endpoint, user_profile, results_count)
     log_entry = {
-        'timestamp': datetime.now().isoformat(),
+        'event': f'{endpoint}_request',
         'state': user_profile.get('state'),
         'income': user_profile.get('income'),
         'category': user_profile.get('category'),
         'results_count': results_count
     }
     
-    # In a production environment, this would write to a proper logging system
-    print(f"[LOG] Recommendation request: {json.dumps(log_entry)}")
+    # Extra fields become keys of the structured (JSON) log record
+    results = 'recommendations' if endpoint == 'recommend' else 'search results'
+    logger.info(f"Generated {results_count} {results} for state: {log_entry['state']}", extra=log_entry)
@@ -0,0 +1,104 @@
+"""
+Warm recommendation cache for SchemeAssist AI Backend
+Precomputed recommendations and alerts for registered users, refreshed in
+the background when a profile is saved or the catalog changes
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+
+from recommender import recommend_schemes, get_catalog_version
+from alerts import generate_alerts
+from storage import file_lock
+from utils import build_user_profile
+
+logger = logging.getLogger(__name__)
+
+# Minimum score of the cached recommendations (the /api/recommend default)
+WARM_CACHE_MIN_MATCH_SCORE = 95
+
+# Seconds after which an entry is recomputed even if nothing changed (alerts depend on the date)
+WARM_CACHE_MAX_AGE = int(os.environ.get('WARM_CACHE_MAX_AGE', str(6 * 3600)))
+
+# Users refreshed by one background job
+WARM_CACHE_BATCH = int(os.environ.get('WARM_CACHE_BATCH', '100'))
+
+# Seconds between checks for a new catalog version in each process
+WARM_CACHE_CHECK_INTERVAL = 30
+
+
+def profile_fingerprint(user_profile):
+    """Identify the recommendation-relevant part of a profile"""
+    canonical = json.dumps(user_profile, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def build_cache_profile(profile):
+    """Get the recommendation profile of a stored user profile, or None if it is incomplete"""
+    try:
+        return build_user_profile(profile or {})
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+def compute_entry(profile):
+    """
+    Compute the cached results for a stored user profile
+
+    Returns:
+        dict: catalog_version, fingerprint, computed_at, min_match_score,
+            recommendations and alerts; None for incomplete profiles
+    """
+    user_profile = build_cache_profile(profile)
+    if user_profile is None:
+        return None
+    catalog_version = get_catalog_version()
+    return {
+        'catalog_version': catalog_version,
+        'fingerprint': profile_fingerprint(user_profile),
+        'computed_at': time.time(),
+        'min_match_score': WARM_CACHE_MIN_MATCH_SCORE,
+        'recommendations': recommend_schemes(user_profile, WARM_CACHE_MIN_MATCH_SCORE),
+        'alerts': generate_alerts(user_profile)
+    }
+
+
+def is_fresh(entry, profile, catalog_version=None, now=None):
+    """Check that a cached entry matches the profile and catalog and is not too old"""
+    if not entry:
+        return False
+    user_profile = build_cache_profile(profile)
+    if user_profile is None or entry.get('fingerprint') != profile_fingerprint(user_profile):
+        return False
+    if entry.get('catalog_version') != (catalog_version or get_catalog_version()):
+        return False
+    return (now or time.time()) - entry.get('computed_at', 0) < WARM_CACHE_MAX_AGE
+
+
+def claim_catalog_change(directory, catalog_version):
+    """
+    Record catalog_version as warmed; True for the one caller (across
+    processes) that sees it change and should schedule the refresh
+    """
+    marker = os.path.join(directory, 'catalog_version')
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(marker + '.lock'):
+        previous = None
+        if os.path.exists(marker):
+            with open(marker, encoding='utf-8') as f:
+                previous = f.read().strip()
+        if previous == catalog_version:
+            return False
+        with open(marker, 'w', encoding='utf-8') as f:
+            f.write(catalog_version)
+    # The first start only records the version; entries are filled as profiles are read or saved
+    return previous is not None
+
+
+def chunks(items, size=None):
+    """Split a list into WARM_CACHE_BATCH sized lists"""
+    size = size or WARM_CACHE_BATCH
+    return [items[start:start + size] for start in range(0, len(items), size)]
@@ -0,0 +1,14 @@
+"""
+WSGI entrypoint for SchemeAssist AI Backend
+Sets up the logging pipeline before loading the app, so only the server
+process (not tests, benchmarks or scripts importing app) takes over the
+root logger:
+
+    gunicorn --chdir backend wsgi:app
+"""
+
+from logconfig import configure_logging
+
+configure_logging()
+
+from app import app  # noqa: E402,F401
@@ -0,0 +1,8 @@
+"""
+Benchmarks for SchemeAssist AI
+Synthetic catalog/profile generation and microbenchmarks of the backend
+functions, with baseline comparison
+
+Usage:
+    python -m benchmarks.run --rows 1000 10000
+"""
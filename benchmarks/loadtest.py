@@ -0,0 +1,456 @@
+"""
+HTTP load test for SchemeAssist AI
+Drives the Flask app with many concurrent clients, in process through the
+WSGI test client or over HTTP against a local gunicorn (or any URL), with
+a weighted endpoint mix or a replayed request log, and reports throughput,
+latency percentiles/histograms and error rates per endpoint
+
+Usage:
+    python -m benchmarks.loadtest --clients 50 --duration 30
+    python -m benchmarks.loadtest --gunicorn 4 --clients 100 --rows 100000
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --mix recommend=70,search=30
+    python -m benchmarks.loadtest --replay requests.log.jsonl --replay-speed 1
+
+Replay logs are JSON lines:
+    {"method": "POST", "path": "/api/recommend", "json": {...}, "headers": {...}, "offset": 0.25}
+where offset is the time (seconds) since the start of the recording.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+from benchmarks.stats import histogram, summarize
+from benchmarks.synthetic import generate_profiles, write_data_dir
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+DEFAULT_MIX = 'recommend=45,search=25,favorites=15,applications=10,login=5'
+
+SEARCH_QUERIES = ['', 'yojana', 'education', 'health', 'kisan', 'scholarship', 'mission', 'housing']
+
+LOADTEST_PASSWORD = 'loadtest-password'
+
+
+def parse_mix(spec):
+    """
+    Parse an endpoint mix such as "recommend=70,search=30"
+
+    Returns:
+        list: (endpoint, weight) pairs
+    """
+    mix = []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in REQUEST_BUILDERS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(REQUEST_BUILDERS)})")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+class VirtualClient:
+    """One simulated user: a profile, an identity and a source address"""
+
+    def __init__(self, index, profile, users):
+        self.index = index
+        self.profile = profile
+        self.user_id = f"loadtest-{index % users}"
+        self.rng = random.Random(index)
+        self.headers = {}
+        # Distinct peer address per client, so per-client rate limits apply as in production (in-process runs only)
+        self.source = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}"
+
+
+def build_recommend(client):
+    return 'POST', '/api/recommend', dict(client.profile, min_match_score=client.rng.choice([50, 80, 95]))
+
+
+def build_search(client):
+    return 'POST', '/api/search', {
+        'query': client.rng.choice(SEARCH_QUERIES),
+        'state': client.profile['state'],
+        'category': client.rng.choice([None, client.profile['category']])
+    }
+
+
+def build_favorites(client):
+    if client.rng.random() < 0.6:
+        return 'GET', f"/api/favorites?user_id={client.user_id}", None
+    scheme = f"Scheme {client.rng.randrange(1000)}"
+    method = 'POST' if client.rng.random() < 0.7 else 'DELETE'
+    return method, f"/api/favorites?user_id={client.user_id}", {'scheme_name': scheme}
+
+
+def build_applications(client):
+    if client.rng.random() < 0.6:
+        return 'GET', f"/api/applications?user_id={client.user_id}", None
+    return 'POST', f"/api/applications?user_id={client.user_id}", {
+        'scheme_name': f"Scheme {client.rng.randrange(1000)}",
+        'status': client.rng.choice(['applied', 'in_progress', 'approved'])
+    }
+
+
+def build_login(client):
+    return 'POST', '/api/login', {'username': client.user_id, 'password': LOADTEST_PASSWORD}
+
+
+REQUEST_BUILDERS = {
+    'recommend': build_recommend,
+    'search': build_search,
+    'favorites': build_favorites,
+    'applications': build_applications,
+    'login': build_login
+}
+
+
+def endpoint_label(path):
+    """Group requests by endpoint: /api/scheme/<name> -> /api/scheme"""
+    parts = path.split('?', 1)[0].strip('/').split('/')
+    return '/' + '/'.join(parts[:2])
+
+
+class WSGITransport:
+    """Sends requests to the app in this process through Flask's test client"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body, headers, source=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        environ = {'REMOTE_ADDR': source} if source else {}
+        with client.open(path, method=method, json=body, headers=headers, environ_base=environ) as response:
+            response.get_data()  # Drain streamed bodies so the full response time is measured
+            return response.status_code
+
+
+class HTTPTransport:
+    """Sends requests over HTTP, one keep-alive session per client thread"""
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, method, path, body, headers, source=None):
+        """Send a request; the server sees this machine as the source, whatever source is"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(method, self.base_url + path, json=body, headers=headers, timeout=self.timeout)
+        return response.status_code
+
+
+class Recorder:
+    """Collects (endpoint, status, latency) samples from all client threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, latency):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed):
+        """
+        Summarise the run per endpoint
+
+        Returns:
+            dict: endpoint -> throughput, latency percentiles, histogram and error counts
+        """
+        report = {}
+        for endpoint in sorted(self.latencies):
+            statuses = self.statuses[endpoint]
+            total = sum(statuses.values())
+            errors = sum(count for status, count in statuses.items() if status == 'error' or status >= 500)
+            summary = summarize(self.latencies[endpoint], elapsed)
+            summary.update({
+                'status_counts': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+                'client_errors': sum(count for status, count in statuses.items()
+                                     if status != 'error' and 400 <= status < 500),
+                'rejected_429': statuses.get(429, 0),
+                'errors': errors,
+                'error_rate': round(errors / total, 4) if total else 0.0,
+                'histogram': histogram(self.latencies[endpoint])
+            })
+            report[endpoint] = summary
+        return report
+
+
+def _send(transport, recorder, method, path, body, headers, source=None):
+    started = time.perf_counter()
+    try:
+        status = transport.send(method, path, body, headers, source)
+    except Exception:
+        status = 'error'
+    recorder.record(endpoint_label(path), status, time.perf_counter() - started)
+
+
+def run_mix(transport, mix, clients, duration=None, total_requests=None, think_time=0.0, seed=42, users=100):
+    """
+    Run closed-loop virtual clients sending a weighted mix of requests
+
+    Args:
+        transport: WSGITransport or HTTPTransport
+        mix (list): (endpoint, weight) pairs
+        clients (int): Concurrent clients
+        duration (float): Seconds to run
+        total_requests (int): Stop after this many requests instead
+        think_time (float): Pause between a client's requests (seconds)
+        seed (int): Seed for profiles
+        users (int): Distinct user ids shared by the clients
+
+    Returns:
+        tuple: (Recorder, elapsed seconds)
+    """
+    recorder = Recorder()
+    profiles = generate_profiles(clients, seed)
+    endpoints, weights = zip(*mix)
+    deadline = time.perf_counter() + duration if duration else None
+    budget = [total_requests]
+    budget_lock = threading.Lock()
+
+    def take_request():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if budget[0] is None:
+            return True
+        with budget_lock:
+            if budget[0] <= 0:
+                return False
+            budget[0] -= 1
+            return True
+
+    def client_loop(index):
+        client = VirtualClient(index, profiles[index], users)
+        while take_request():
+            endpoint = client.rng.choices(endpoints, weights)[0]
+            method, path, body = REQUEST_BUILDERS[endpoint](client)
+            _send(transport, recorder, method, path, body, client.headers, client.source)
+            if think_time:
+                time.sleep(client.rng.uniform(0, 2 * think_time))
+
+    return recorder, _run_threads(client_loop, clients)
+
+
+def load_replay(path):
+    """Read a recorded request log (JSON lines), ordered by offset"""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry.get('offset', 0))
+    return entries
+
+
+def run_replay(transport, entries, clients, speed=0.0):
+    """
+    Replay recorded requests with a pool of clients
+
+    Args:
+        transport: WSGITransport or HTTPTransport
+        entries (list): Recorded requests
+        clients (int): Concurrent clients
+        speed (float): 0 replays as fast as possible, 1 keeps the recorded
+            timing, 2 replays twice as fast, ...
+
+    Returns:
+        tuple: (Recorder, elapsed seconds)
+    """
+    recorder = Recorder()
+    position = [0]
+    position_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def client_loop(index):
+        while True:
+            with position_lock:
+                if position[0] >= len(entries):
+                    return
+                entry = entries[position[0]]
+                position[0] += 1
+            if speed:
+                delay = started + entry.get('offset', 0) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            _send(transport, recorder, entry.get('method', 'GET'), entry['path'],
+                  entry.get('json'), entry.get('headers') or {})
+
+    return recorder, _run_threads(client_loop, clients)
+
+
+def _run_threads(target, count):
+    started = time.perf_counter()
+    threads = [threading.Thread(target=target, args=(index,), daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def prepare_environment(workdir, rows, seed, rate_limit):
+    """
+    Create a synthetic catalog and scratch state for the app under test
+
+    Returns:
+        dict: Environment variables for the app
+    """
+    data_dir = write_data_dir(os.path.join(workdir, 'data'), rows, seed)
+    state_dir = os.path.join(workdir, 'state')
+    os.makedirs(state_dir, exist_ok=True)
+    env = {
+        'SCHEMEASSIST_DATA_DIR': data_dir,
+        'SCHEMEASSIST_STATE_DIR': state_dir,
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'PROFILE_DIR': os.path.join(workdir, 'profiles'),
+        'LOG_FILE': os.path.join(workdir, 'app.log'),
+        'ANALYTICS_DIR': os.path.join(workdir, 'analytics'),
+        'JOBS_DB': os.path.join(workdir, 'jobs.db'),
+        'EXPORT_DIR': os.path.join(workdir, 'exports'),
+        'PARALLEL_SCORING_DIR': os.path.join(workdir, 'scoring'),
+        # Request logs would dominate the console during a load test
+        'LOG_LEVEL': 'WARNING'
+    }
+    if not rate_limit:
+        env['RATE_LIMIT_RATE'] = '1000000'
+        env['RATE_LIMIT_BURST'] = '1000000'
+    return env
+
+
+def register_users(transport, users):
+    """Create the accounts used by login traffic"""
+    for index in range(users):
+        transport.send('POST', '/api/register',
+                       {'username': f"loadtest-{index}", 'password': LOADTEST_PASSWORD}, {})
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers, threads=1):
+    """
+    Start gunicorn for the app on a free local port and wait until it is healthy
+
+    Returns:
+        tuple: (process, base URL)
+    """
+    import requests
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--chdir', BACKEND_DIR, '-w', str(workers), '--threads', str(threads),
+         '-b', f"127.0.0.1:{port}", '--log-level', 'warning', 'wsgi:app'],
+        env=dict(os.environ, **env)
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            if requests.get(base_url + '/api/health', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not become healthy within 30s')
+
+
+def print_report(report, elapsed):
+    total = sum(summary['calls'] for summary in report.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)\n")
+    print(f"{'endpoint':<20}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'4xx':>7}{'429':>6}{'errors':>8}{'err %':>7}")
+    for endpoint, summary in report.items():
+        print(f"{endpoint:<20}{summary['calls']:>9}{summary['ops_per_sec']:>9}{summary['p50_ms']:>9}"
+              f"{summary['p95_ms']:>9}{summary['p99_ms']:>9}{summary['client_errors']:>7}"
+              f"{summary['rejected_429']:>6}{summary['errors']:>8}{summary['error_rate'] * 100:>7.2f}")
+    print()
+    for endpoint, summary in report.items():
+        bars = '  '.join(f"{bucket}:{count}" for bucket, count in summary['histogram'].items() if count)
+        print(f"{endpoint:<20}{bars}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SchemeAssist AI HTTP load test')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--gunicorn', type=int, metavar='WORKERS', help='Start a local gunicorn with this many workers')
+    target.add_argument('--url', help='Test an already running server instead')
+    parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker')
+    parser.add_argument('--clients', type=int, default=20, help='Concurrent virtual clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests instead')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Weighted endpoint mix')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between requests of a client')
+    parser.add_argument('--rows', type=int, default=10000, help='Synthetic catalog size')
+    parser.add_argument('--users', type=int, default=100, help='Registered users shared by the clients')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rate-limit', action='store_true', help='Keep the per-client rate limits on')
+    parser.add_argument('--replay', help='Replay a recorded request log instead of the mix')
+    parser.add_argument('--replay-speed', type=float, default=0.0, help='0 = as fast as possible, 1 = recorded pace')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    process = None
+    with tempfile.TemporaryDirectory(prefix='schemeassist-load-') as workdir:
+        if args.rate_limit and (args.url or args.gunicorn):
+            # The limiter keys on the peer address, which all HTTP clients of this process share
+            print('Note: over HTTP every virtual client shares one rate limit bucket')
+        if args.url:
+            transport = HTTPTransport(args.url)
+        else:
+            env = prepare_environment(workdir, args.rows, args.seed, args.rate_limit)
+            if args.gunicorn:
+                process, base_url = start_gunicorn(env, args.gunicorn, args.threads)
+                transport = HTTPTransport(base_url)
+            else:
+                # The app reads its configuration at import time
+                os.environ.update(env)
+                if BACKEND_DIR not in sys.path:
+                    sys.path.insert(0, BACKEND_DIR)
+                import app as app_module
+                transport = WSGITransport(app_module.app)
+
+        try:
+            if args.replay:
+                recorder, elapsed = run_replay(transport, load_replay(args.replay), args.clients, args.replay_speed)
+            else:
+                if any(name == 'login' for name, _ in mix) and not args.url:
+                    register_users(transport, args.users)
+                recorder, elapsed = run_mix(transport, mix, args.clients, args.duration if not args.requests else None,
+                                            args.requests, args.think_time, args.seed, args.users)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    report = recorder.report(elapsed)
+    print_report(report, elapsed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed': elapsed, 'endpoints': report}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
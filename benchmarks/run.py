@@ -0,0 +1,197 @@
+"""
+Microbenchmarks for SchemeAssist AI
+Times recommend_schemes, search_schemes, compare_schemes,
+get_scheme_statistics and generate_alerts against synthetic catalogs and
+compares the results with a stored baseline
+
+Usage:
+    python -m benchmarks.run --rows 1000 10000
+    python -m benchmarks.run --rows 1000 --save-baseline
+    python -m benchmarks.run --rows 1000 --threshold 0.15   # fail on >15% regressions
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+
+# Backend modules use flat imports
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import recommender  # noqa: E402
+import utils  # noqa: E402
+from alerts import generate_alerts  # noqa: E402
+
+from benchmarks.stats import summarize  # noqa: E402
+from benchmarks.synthetic import generate_profiles, write_data_dir  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+SEARCH_QUERIES = ['', 'yojana', 'education', 'health', 'kisan', 'scholarship', 'mission', 'housing']
+
+
+def time_calls(fn, args_list, iterations, budget):
+    """
+    Call fn with successive argument tuples until iterations or budget run out
+
+    Returns:
+        dict: See summarize
+    """
+    latencies = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        args = args_list[index % len(args_list)]
+        call_started = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - call_started)
+        if time.perf_counter() - started > budget:
+            break
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def benchmark_cases(profiles, scheme_names, seed):
+    """
+    Build the argument lists for each benchmarked function
+
+    Returns:
+        dict: name -> (function, list of argument tuples)
+    """
+    rng = random.Random(seed)
+    searches = [
+        (rng.choice(SEARCH_QUERIES), {'state': profile['state'], 'category': rng.choice([None, profile['category']]),
+                                      'max_income': profile['income']})
+        for profile in profiles
+    ]
+    comparisons = [(rng.sample(scheme_names, min(len(scheme_names), rng.randint(2, 4))), profile)
+                   for profile in profiles]
+    return {
+        'recommend_schemes': (recommender.recommend_schemes, [(profile,) for profile in profiles]),
+        'search_schemes': (recommender.search_schemes, searches),
+        'compare_schemes': (recommender.compare_schemes, comparisons),
+        'get_scheme_statistics': (recommender.get_scheme_statistics, [()]),
+        'generate_alerts': (generate_alerts, [(profile,) for profile in profiles])
+    }
+
+
+def use_data_dir(directory):
+    """Point the recommender and the alerts at a data directory"""
+    recommender.CATALOG_PATH = os.path.join(directory, 'combined_schemes.csv')
+    utils.DATA_DIR = directory
+
+
+def run_benchmarks(rows_list, iterations=50, budget=10.0, seed=42, only=None):
+    """
+    Run every benchmark for each catalog size
+
+    Args:
+        rows_list (list): Catalog sizes
+        iterations (int): Maximum calls per benchmark
+        budget (float): Maximum seconds per benchmark
+        seed (int): Seed for catalog, profiles and arguments
+        only (list): Benchmark names to run (default all)
+
+    Returns:
+        dict: "name@rows" -> summary
+    """
+    results = {}
+    profiles = generate_profiles(max(iterations, 1), seed)
+    with tempfile.TemporaryDirectory(prefix='schemeassist-bench-') as tmp:
+        for rows in rows_list:
+            directory = write_data_dir(os.path.join(tmp, str(rows)), rows, seed)
+            use_data_dir(directory)
+
+            load_started = time.perf_counter()
+            catalog = recommender.get_catalog()
+            results[f"catalog_load@{rows}"] = summarize([time.perf_counter() - load_started], 0)
+
+            scheme_names = [scheme['scheme_name'] for scheme in catalog.schemes]
+            for name, (fn, args_list) in benchmark_cases(profiles, scheme_names, seed).items():
+                if only and name not in only:
+                    continue
+                fn(*args_list[0])  # warm up
+                results[f"{name}@{rows}"] = time_calls(fn, args_list, iterations, budget)
+                summary = results[f"{name}@{rows}"]
+                print(f"{name:<24}{rows:>9} rows  {summary['calls']:>5} calls  "
+                      f"{summary['ops_per_sec']:>10} ops/s  p50 {summary['p50_ms']:>9} ms  "
+                      f"p95 {summary['p95_ms']:>9} ms  p99 {summary['p99_ms']:>9} ms")
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=0.2, metric='p50_ms'):
+    """
+    Find benchmarks that got slower than the baseline
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results
+        threshold (float): Allowed relative slowdown (0.2 = 20%)
+        metric (str): Latency metric compared
+
+    Returns:
+        list: (name, baseline value, current value, relative change) for regressions
+    """
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name, {}).get(metric)
+        after = summary.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        if change > threshold:
+            regressions.append((name, before, after, round(change, 4)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SchemeAssist AI microbenchmarks')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='Catalog sizes (1k to 1M)')
+    parser.add_argument('--iterations', type=int, default=50, help='Maximum calls per benchmark')
+    parser.add_argument('--budget', type=float, default=10.0, help='Maximum seconds per benchmark')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help='Run only these benchmarks')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before failing')
+    parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p95_ms', 'p99_ms'])
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.rows, args.iterations, args.budget, args.seed, args.only)
+    report = {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(), 'seed': args.seed},
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (use --save-baseline)")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare_to_baseline(results, baseline, args.threshold, args.metric)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {args.metric} {before} -> {after} ms (+{change:.0%})")
+    if regressions:
+        return 1
+    print(f"No regressions above {args.threshold:.0%} on {args.metric}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Latency statistics shared by the SchemeAssist AI benchmarks and load tests
+"""
+
+import math
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, elapsed):
+    """
+    Summarise per-call latencies
+
+    Args:
+        latencies (list): Seconds per call
+        elapsed (float): Wall time of the whole run
+
+    Returns:
+        dict: Calls, throughput and p50/p95/p99/max latency in milliseconds
+    """
+    return {
+        'calls': len(latencies),
+        'ops_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else 0.0
+    }
+
+
+def histogram(latencies, buckets=HISTOGRAM_BUCKETS_MS):
+    """
+    Count latencies per bucket
+
+    Args:
+        latencies (list): Seconds per call
+        buckets (tuple): Bucket upper bounds in milliseconds
+
+    Returns:
+        dict: "<=bound" -> count, plus ">last" for slower calls
+    """
+    counts = {f"<={bound}ms": 0 for bound in buckets}
+    counts[f">{buckets[-1]}ms"] = 0
+    for latency in latencies:
+        ms = latency * 1000
+        for bound in buckets:
+            if ms <= bound:
+                counts[f"<={bound}ms"] += 1
+                break
+        else:
+            counts[f">{buckets[-1]}ms"] += 1
+    return counts
@@ -0,0 +1,166 @@
+"""
+Synthetic data for SchemeAssist AI benchmarks
+Deterministic scheme catalogs and user profiles with realistic
+distributions of states, categories, target groups and income/age ranges
+"""
+
+import os
+import csv
+import random
+from datetime import date, timedelta
+
+CATALOG_FIELDS = [
+    'scheme_id', 'scheme_name', 'level', 'state', 'category', 'min_age', 'max_age',
+    'min_income', 'max_income', 'target_group', 'benefits', 'is_active', 'last_updated', 'caste_category'
+]
+
+# (value, weight) pairs; roughly a third of schemes are central ("All")
+STATES = [
+    ('All', 30), ('Uttar Pradesh', 6), ('Maharashtra', 6), ('Bihar', 5), ('West Bengal', 5),
+    ('Madhya Pradesh', 5), ('Tamil Nadu', 5), ('Rajasthan', 5), ('Karnataka', 4), ('Gujarat', 4),
+    ('Andhra Pradesh', 4), ('Odisha', 3), ('Telangana', 3), ('Kerala', 3), ('Jharkhand', 2),
+    ('Assam', 2), ('Punjab', 2), ('Chhattisgarh', 2), ('Haryana', 2), ('Delhi', 2)
+]
+
+CATEGORIES = [
+    ('Education', 18), ('Health', 14), ('Agriculture', 14), ('Social Welfare', 12), ('Employment', 10),
+    ('Housing', 8), ('Women and Child', 8), ('Financial Inclusion', 6), ('Skill Development', 6),
+    ('Senior Citizens', 4)
+]
+
+# (target group, caste_category column) pairs with weights; most schemes are open to all
+TARGET_GROUPS = [
+    (('All Citizens', 'All'), 25), (('Eligible Citizens', 'All'), 10), (('BPL Households', 'All'), 8),
+    (('Farmers', 'All'), 8), (('Women', 'All'), 8), (('Students', 'All'), 8),
+    (('Senior Citizens', 'All'), 4), (('SC Students', 'SC'), 5), (('ST Students', 'ST'), 4),
+    (('Scheduled Castes and Tribes', 'SC'), 4), (('Tribal Communities', 'ST'), 3),
+    (('OBC Students', 'OBC'), 5), (('Other Backward Classes', 'OBC'), 3),
+    (('General Category Students', 'General'), 3), (('Unreserved Category', 'General'), 2)
+]
+
+# Upper income limits (INR per year)
+MAX_INCOMES = [(100000, 15), (250000, 20), (300000, 15), (500000, 15), (800000, 15),
+               (1000000, 10), (2500000, 5), (9999999, 5)]
+
+# (min_age, max_age) windows
+AGE_WINDOWS = [((0, 100), 30), ((18, 60), 20), ((14, 35), 12), ((18, 40), 10), ((60, 100), 8),
+               ((0, 18), 8), ((21, 45), 7), ((25, 65), 5)]
+
+NAME_PREFIXES = ['Pradhan Mantri', 'Mukhyamantri', 'National', 'Rashtriya', 'State', 'Integrated', 'Rural',
+                 'Urban', 'Digital', 'Mahila', 'Yuva', 'Kisan', 'Jan', 'Swasthya', 'Shiksha']
+NAME_SUFFIXES = ['Yojana', 'Mission', 'Scheme', 'Abhiyan', 'Programme', 'Nidhi', 'Scholarship', 'Bima']
+
+CASTES = [('General', 35), ('OBC', 40), ('SC', 17), ('ST', 8)]
+INCOMES = [(50000, 20), (120000, 25), (250000, 20), (400000, 15), (700000, 10), (1500000, 10)]
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def iter_catalog(rows, seed=42, reference_date=None):
+    """
+    Yield synthetic scheme rows
+
+    Args:
+        rows (int): Number of schemes
+        seed (int): Random seed; the same seed and date give the same catalog
+        reference_date (date): last_updated values fall in the two years
+            before this date (default today, so alert windows stay populated)
+
+    Returns:
+        generator: Dicts with the columns of combined_schemes.csv
+    """
+    rng = random.Random(seed)
+    reference_date = reference_date or date.today()
+    for index in range(rows):
+        state = _weighted(rng, STATES)
+        category = _weighted(rng, CATEGORIES)
+        target_group, caste_category = _weighted(rng, TARGET_GROUPS)
+        max_income = _weighted(rng, MAX_INCOMES)
+        min_income = 0 if rng.random() < 0.8 else max_income // 4
+        min_age, max_age = _weighted(rng, AGE_WINDOWS)
+        updated = reference_date - timedelta(days=int(rng.expovariate(1 / 120)) % 730)
+        yield {
+            'scheme_id': f"S{index:07d}",
+            'scheme_name': f"{rng.choice(NAME_PREFIXES)} {category} {rng.choice(NAME_SUFFIXES)} {index}",
+            'level': 'Central' if state == 'All' else 'State',
+            'state': state,
+            'category': category,
+            'min_age': min_age,
+            'max_age': max_age,
+            'min_income': min_income,
+            'max_income': max_income,
+            'target_group': target_group,
+            'benefits': f"Financial assistance of Rs {rng.randrange(1, 200) * 500} for {target_group.lower()}",
+            'is_active': 'Yes' if rng.random() < 0.9 else 'No',
+            'last_updated': updated.isoformat(),
+            'caste_category': caste_category
+        }
+
+
+def write_catalog(path, rows, seed=42, reference_date=None):
+    """
+    Write a synthetic catalog CSV
+
+    Args:
+        path (str): Output file
+        rows (int): Number of schemes
+        seed (int): Random seed
+        reference_date (date): See iter_catalog
+
+    Returns:
+        str: path
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        writer.writerows(iter_catalog(rows, seed, reference_date))
+    return path
+
+
+def write_data_dir(directory, rows, seed=42, reference_date=None):
+    """
+    Write a data directory usable as SCHEMEASSIST_DATA_DIR
+
+    The recommender reads combined_schemes.csv and the alerts read
+    schemes.csv; both get the same synthetic catalog.
+
+    Returns:
+        str: directory
+    """
+    catalog = write_catalog(os.path.join(directory, 'combined_schemes.csv'), rows, seed, reference_date)
+    with open(catalog, 'rb') as src, open(os.path.join(directory, 'schemes.csv'), 'wb') as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            dst.write(chunk)
+    return directory
+
+
+def generate_profiles(count, seed=7):
+    """
+    Generate synthetic user profiles
+
+    Args:
+        count (int): Number of profiles
+        seed (int): Random seed
+
+    Returns:
+        list: Profiles with state, income, category, age and caste_category
+    """
+    rng = random.Random(seed)
+    states = [(state, weight) for state, weight in STATES if state != 'All']
+    return [
+        {
+            'state': _weighted(rng, states),
+            'income': _weighted(rng, INCOMES),
+            'category': _weighted(rng, CATEGORIES),
+            'age': rng.randint(16, 80),
+            'caste_category': _weighted(rng, CASTES)
+        }
+        for _ in range(count)
+    ]
@@ -51,6 +51,16 @@ class PerformanceMonitor {
                 });
 
                 navigationObserver.observe({ entryTypes: ['navigation'] });
+
+                // Observe the first input to measure First Input Delay
+                const firstInputObserver = new PerformanceObserver((list) => {
+                    const entry = list.getEntries()[0];
+                    if (entry) {
+                        this.metrics.firstInputDelay = entry.processingStart - entry.startTime;
+                    }
+                });
+
+                firstInputObserver.observe({ type: 'first-input', buffered: true });
             } catch (error) {
                 console.warn('Performance Observer not fully supported:', error);
             }
@@ -160,9 +170,9 @@ class PerformanceMonitor {
             }
         }
 
-        // First Input Delay (FID) - approximation
-        if (this.metrics.interactions.length > 0) {
-            vitals.FID = this.metrics.interactions[0].timestamp;
+        // First Input Delay (FID) - from the first-input entry
+        if (this.metrics.firstInputDelay !== undefined) {
+            vitals.FID = this.metrics.firstInputDelay;
         }
 
         // Cumulative Layout Shift (CLS) - requires layout-shift entries
@@ -179,6 +189,8 @@ class PerformanceMonitor {
         return JSON.stringify({
             summary: this.getSummary(),
             coreWebVitals: this.getCoreWebVitals(),
+            page: window.location.pathname,
+            connection: navigator.connection?.effectiveType || null,
             timestamp: new Date().toISOString(),
             userAgent: navigator.userAgent
         }, null, 2);
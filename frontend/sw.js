@@ -1,5 +1,5 @@
 // Service Worker for Civora Nexus
-const CACHE_NAME = 'civoranexus-v1.1.0';
+const CACHE_NAME = 'civoranexus-v1.1.1';
 const OFFLINE_URL = '/offline.html';
 
 // Files to cache for offline functionality
@@ -33,7 +33,8 @@ const EXTERNAL_CACHE = [
 // API endpoints to cache (GET only)
 const API_CACHE_PATTERNS = [
     /\/api\/health/,
-    /\/api\/statistics/
+    /\/api\/statistics/,
+    /\/api\/scheme\//
 ];
 
 // Install event - pre-cache resources
@@ -0,0 +1,7 @@
+"""
+Reports for SchemeAssist AI
+Batch rendering of per-user recommendation reports
+
+Usage:
+    python -m reports.report_generator --users
+"""
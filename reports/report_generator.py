@@ -1,3 +1,61 @@
+"""
+Recommendation reports for SchemeAssist AI
+Renders per-user recommendation reports as HTML, plus print-ready (A4,
+one report per page) bundles, for every registered user or for a file
+of profiles, using a process pool
+
+Usage:
+    python -m reports.report_generator --users --output reports/output
+    python -m reports.report_generator --profiles village.csv --workers 4 --format print
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+# Backend modules use flat imports
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import recommender  # noqa: E402
+from storage import iter_json_object  # noqa: E402
+from utils import build_user_profile, format_currency  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), 'output')
+
+# Users file of the backend (SCHEMEASSIST_STATE_DIR points at a scratch copy)
+USERS_FILE = os.path.join(os.environ.get('SCHEMEASSIST_STATE_DIR', backend_path), 'users.json')
+
+# Reports rendered per task; also the number of reports in one print bundle
+REPORT_CHUNK_SIZE = int(os.environ.get('REPORT_CHUNK_SIZE', '200'))
+
+# Minimum score of schemes listed in a report
+REPORT_MIN_MATCH_SCORE = 95
+
+OUTPUT_FORMATS = ('html', 'print', 'both')
+
+# Index entries of a run, spooled to disk while reports are rendered
+INDEX_ENTRIES_FILENAME = '.index-entries.jsonl'
+
+# Per-process state set by init_worker: one catalog snapshot and compiled templates
+_worker = {}
+
+
 def generate_report(user, schemes):
     print("\n=== Recommendation Report ===")
     print(f"State: {user['state']}")
@@ -7,3 +65,268 @@ def generate_report(user, schemes):
         print(f"Scheme: {scheme['scheme_name']}")
         print(f"Score: {scheme['score']}")
         print(f"Last Updated: {scheme['last_updated']}\n")
+
+
+# --- Sources ---
+
+def iter_user_profiles(users_file=None):
+    """
+    Yield (report id, profile data) for registered users with a profile
+
+    users.json is parsed one user at a time, never loaded whole.
+
+    Args:
+        users_file (str): users.json of the backend (default USERS_FILE)
+
+    Returns:
+        generator: (username, profile dict) pairs
+    """
+    users_file = users_file or USERS_FILE
+    if not os.path.exists(users_file):
+        logger.info(f"File {users_file} does not exist, no user reports")
+        return
+    for username, user in iter_json_object(users_file):
+        profile = user.get('profile') or {}
+        if profile:
+            yield username, dict(profile, name=profile.get('name') or username)
+
+
+def iter_profile_file(path):
+    """
+    Yield (report id, profile data) from a CSV or JSON Lines file, one line at a time
+
+    CSV files need state, income and category columns; an optional name
+    or id column names the report.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, 1):
+            yield str(row.get('id') or row.get('name') or f"profile-{number}"), row
+
+
+def chunked(items, size):
+    """Yield lists of up to size items without reading ahead further"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Rendering (runs in the worker processes) ---
+
+def init_worker(catalog_path, catalog_version, min_match_score=REPORT_MIN_MATCH_SCORE):
+    """
+    Load the catalog snapshot and compile the templates once per process
+
+    Forked workers inherit the catalog the parent loaded; other workers
+    load it again and refuse to run if the file changed in between, so
+    every report of a run uses the same catalog.
+    """
+    catalog = recommender.loaded_catalog()
+    if catalog is None or catalog.version != catalog_version:
+        recommender.CATALOG_PATH = catalog_path
+        catalog = recommender.get_catalog()
+        if catalog.version != catalog_version:
+            raise RuntimeError(f"Catalog changed during the run ({catalog_version} -> {catalog.version})")
+
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+    _worker.update(
+        catalog=catalog,
+        min_match_score=min_match_score,
+        report_template=env.get_template('report.html'),
+        bundle_template=env.get_template('bundle.html'),
+        context={'generated_at': datetime.now().strftime('%d %b %Y %H:%M'), 'catalog_version': catalog.version}
+    )
+
+
+def build_report(report_id, data):
+    """
+    Compute one user's report against the worker's catalog snapshot
+
+    Returns:
+        dict: id, name, profile, income and sorted schemes
+    """
+    catalog = _worker['catalog']
+    profile = build_user_profile(data)
+    schemes = [
+        recommender.build_recommendation(catalog.schemes[index], score, age_eligible, caste_eligible)
+        for index, score, age_eligible, caste_eligible
+        in recommender.iter_recommendation_matches(profile, _worker['min_match_score'], catalog)
+    ]
+    schemes.sort(key=lambda scheme: scheme['score'], reverse=True)
+    return {
+        'id': report_id,
+        'name': data.get('name') or data.get('username'),
+        'profile': profile,
+        'income': format_currency(profile['income']),
+        'schemes': schemes
+    }
+
+
+def report_filename(report_id):
+    """Build a safe file name for a report id"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', report_id).strip('._') or 'report'
+
+
+def render_chunk(chunk_number, items, output_dir, output_format):
+    """
+    Render one chunk of profiles and write its files
+
+    Only a small summary goes back to the parent, so memory stays bounded
+    by the chunks in flight.
+
+    Returns:
+        dict: reports (id, file, schemes), skipped (id, reason) and bundle file
+    """
+    reports, summary = [], {'reports': [], 'skipped': [], 'bundle': None}
+    for report_id, data in items:
+        try:
+            report = build_report(report_id, data)
+        except (KeyError, ValueError, TypeError) as e:
+            summary['skipped'].append((report_id, f"Invalid profile: {str(e)}"))
+            continue
+        reports.append(report)
+
+        filename = None
+        if output_format in ('html', 'both'):
+            filename = f"{report_filename(report_id)}.html"
+            with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+                f.write(_worker['report_template'].render(report=report, **_worker['context']))
+        summary['reports'].append((report_id, filename, len(report['schemes'])))
+
+    if reports and output_format in ('print', 'both'):
+        summary['bundle'] = f"print-{chunk_number:05d}.html"
+        with open(os.path.join(output_dir, summary['bundle']), 'w', encoding='utf-8') as f:
+            f.write(_worker['bundle_template'].render(reports=reports, **_worker['context']))
+    return summary
+
+
+# --- Pipeline ---
+
+def generate_reports(items, output_dir=DEFAULT_OUTPUT, output_format='both', workers=None,
+                     chunk_size=REPORT_CHUNK_SIZE, min_match_score=REPORT_MIN_MATCH_SCORE):
+    """
+    Render reports for a stream of profiles
+
+    Profiles are read lazily and at most two chunks per worker are in
+    flight, so memory is bounded by the chunk size rather than the
+    number of profiles. The index entries of finished chunks are spooled
+    to a file in output_dir (in input order) and the summary only keeps
+    counts.
+
+    Args:
+        items (iterable): (report id, profile data) pairs
+        output_dir (str): Directory for the report files and index.html
+        output_format (str): html (one file per user), print (A4 bundles) or both
+        workers (int): Worker processes (default CPU count; 0 renders in this process)
+        chunk_size (int): Profiles per task and per print bundle
+        min_match_score (int): Minimum score of listed schemes
+
+    Returns:
+        dict: Run summary: catalog version, counts of reports, scheme rows,
+            skipped profiles and print bundles, and seconds taken
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(OUTPUT_FORMATS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    # The snapshot every worker renders against
+    catalog = recommender.get_catalog()
+    initargs = (recommender.CATALOG_PATH, catalog.version, min_match_score)
+    started = time.perf_counter()
+    summary = {'catalog_version': catalog.version, 'reports': 0, 'schemes': 0, 'skipped': 0, 'bundles': 0}
+    entries_path = os.path.join(output_dir, INDEX_ENTRIES_FILENAME)
+    # Chunk results that finished ahead of an earlier chunk (at most the chunks in flight)
+    finished = {}
+    next_chunk = [1]
+
+    def collect(number, result):
+        finished[number] = result
+        while next_chunk[0] in finished:
+            result = finished.pop(next_chunk[0])
+            next_chunk[0] += 1
+            for report_id, filename, count in result['reports']:
+                entries.write(json.dumps(['report', report_id, filename, count]) + '\n')
+                summary['reports'] += 1
+                summary['schemes'] += count
+            for report_id, reason in result['skipped']:
+                logger.warning(f"Skipped {report_id}: {reason}")
+                entries.write(json.dumps(['skipped', report_id, reason]) + '\n')
+                summary['skipped'] += 1
+            if result['bundle']:
+                entries.write(json.dumps(['bundle', result['bundle']]) + '\n')
+                summary['bundles'] += 1
+
+    chunks = enumerate(chunked(items, chunk_size), 1)
+    with open(entries_path, 'w', encoding='utf-8') as entries:
+        if workers == 0:
+            init_worker(*initargs)
+            for number, chunk in chunks:
+                collect(number, render_chunk(number, chunk, output_dir, output_format))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+                pending = {}
+                for number, chunk in chunks:
+                    pending[pool.submit(render_chunk, number, chunk, output_dir, output_format)] = number
+                    if len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(pending.pop(future), future.result())
+                for future, number in pending.items():
+                    collect(number, future.result())
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    try:
+        write_index(output_dir, summary, entries_path)
+    finally:
+        os.remove(entries_path)
+    logger.info(f"Rendered {summary['reports']} reports ({summary['skipped']} skipped) "
+                f"in {summary['seconds']}s")
+    return summary
+
+
+def write_index(output_dir, summary, entries_path):
+    """Write index.html linking every report and print bundle, streaming the spooled entries"""
+    def entries(kind):
+        with open(entries_path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry[0] == kind:
+                    yield entry[1:]
+
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+    env.get_template('index.html').stream(summary=summary, entries=entries,
+                                          generated_at=datetime.now().strftime('%d %b %Y %H:%M')
+                                          ).dump(os.path.join(output_dir, 'index.html'), encoding='utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SchemeAssist AI recommendation reports')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--users', nargs='?', const=USERS_FILE, help='Report on every user in users.json')
+    source.add_argument('--profiles', help='CSV or JSON Lines file of profiles')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Output directory')
+    parser.add_argument('--format', default='both', choices=OUTPUT_FORMATS)
+    parser.add_argument('--workers', type=int, help='Worker processes (0 = no pool)')
+    parser.add_argument('--chunk-size', type=int, default=REPORT_CHUNK_SIZE)
+    parser.add_argument('--min-match-score', type=int, default=REPORT_MIN_MATCH_SCORE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    items = iter_user_profiles(args.users) if args.users else iter_profile_file(args.profiles)
+    summary = generate_reports(items, args.output, args.format, args.workers, args.chunk_size,
+                               args.min_match_score)
+    print(f"{summary['reports']} reports ({summary['skipped']} skipped), {summary['schemes']} scheme rows, "
+          f"{summary['bundles']} print bundles in {summary['seconds']}s -> "
+          f"{os.path.join(args.output, 'index.html')}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Unit tests for SchemeAssist AI analytics storage
+Tests hourly partitions, batched buffers, error fingerprinting and
+Web Vitals percentiles
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import analytics # type: ignore
+from analytics import PartitionedLog, EventBuffer, ErrorAggregator, error_fingerprint, parse_vitals # type: ignore
+
+
+def test_partitioned_log_windows_and_prune():
+    """Test that records land in hourly partitions and window queries skip other hours"""
+    print("\n=== Testing PartitionedLog ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = PartitionedLog(tmp, 'events', retention_days=0)
+        now = time.time()
+        log.append([{'ts': now - 3 * 86400, 'n': 0}, {'ts': now - 7200, 'n': 1}, {'ts': now, 'n': 2}])
+        assert len(log.partitions()) == 3, "Each hour should get its own partition"
+        assert [r['n'] for r in log.iter_records(since=now - 3600)] == [2], "Window should exclude older records"
+        assert len(log.partitions(since=now - 3600)) == 1, "Queries should only open overlapping partitions"
+
+        log.retention_days = 1
+        log.prune()
+        assert [r['n'] for r in log.iter_records()] == [1, 2], "Partitions past retention should be deleted"
+        print(f"✓ {len(log.partitions())} partitions kept after pruning")
+
+    return True
+
+
+def test_event_buffer_batches_and_drops():
+    """Test that a buffer writes in batches and drops events when full"""
+    print("\n=== Testing EventBuffer ===")
+    batches = []
+    buffer = EventBuffer('test', batches.append, flush_interval=60, batch_size=3, max_buffer=5)
+    for n in range(3):
+        buffer.add({'n': n})
+    deadline = time.time() + 5
+    while not batches and time.time() < deadline:
+        time.sleep(0.01)
+    assert batches == [[{'n': 0}, {'n': 1}, {'n': 2}]], "A full batch should be written at once"
+
+    buffer.batch_size = 100
+    results = [buffer.add({'n': n}) for n in range(7)]
+    assert results.count(False) == 2, "Events beyond max_buffer should be dropped"
+    buffer.flush()
+    stats = buffer.stats()
+    assert stats['written'] == 8 and stats['dropped'] == 2 and stats['batches'] == 2, "Counters should add up"
+    print(f"✓ {stats}")
+
+    return True
+
+
+def test_error_aggregator_deduplicates():
+    """Test that repeated errors are counted once per fingerprint with bounded samples"""
+    print("\n=== Testing ErrorAggregator ===")
+    assert error_fingerprint({'type': 'script_error', 'message': 'Item 12 failed'}) == \
+        error_fingerprint({'type': 'script_error', 'message': 'Item 13 failed'}), "Numbers should be masked"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = PartitionedLog(tmp, 'errors')
+        aggregator = ErrorAggregator(log, flush_interval=60, samples=2)
+        for n in range(100):
+            aggregator.add({'type': 'network_error', 'message': f'HTTP 500 for id {n}', 'url': f'/page{n}'})
+        aggregator.add({'type': 'script_error', 'message': 'x is undefined', 'source': 'app.js', 'line': 4})
+        aggregator.flush()
+
+        records = sorted(log.iter_records(), key=lambda record: record['count'])
+        assert [record['count'] for record in records] == [1, 100], "One record per fingerprint"
+        assert len(records[1]['samples']) == 2, "Samples should be capped"
+        print(f"✓ 101 errors stored as {len(records)} records")
+
+    return True
+
+
+def test_vitals_parsing_and_percentiles():
+    """Test Web Vitals validation and per-connection percentiles"""
+    print("\n=== Testing Web Vitals ===")
+    record = parse_vitals({'coreWebVitals': {'LCP': 1800.5, 'FID': 1e12, 'CLS': 0.1},
+                           'url': 'https://example.org/profile.html?x=1', 'connection': 'warp'})
+    assert record['page'] == '/profile.html' and record['connection'] == 'unknown', "Page and connection normalised"
+    assert 'FID' not in record and record['LCP'] == 1800.5, "Implausible values should be dropped"
+
+    try:
+        parse_vitals({'coreWebVitals': {}})
+        assert False, "Payloads without vitals should be rejected"
+    except ValueError:
+        pass
+
+    log = analytics.vitals_log
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            analytics.vitals_log = PartitionedLog(tmp, 'vitals')
+            now = time.time()
+            analytics.vitals_log.append([{'ts': now, 'page': '/', 'connection': '4g' if n % 2 else '3g', 'LCP': n}
+                                         for n in range(1, 101)])
+            groups = analytics.vitals_percentiles(hours=1, group_by='connection', now=now + 1)
+            assert groups['3g']['count'] == 50 and groups['3g']['LCP']['p50'] == 50, "3g p50 should be 50"
+            assert groups['4g']['LCP']['p95'] == 95, "4g p95 should be 95"
+            assert groups['4g']['FID']['p50'] is None, "Missing vitals should have no percentiles"
+            print(f"✓ Percentiles: {groups['4g']['LCP']}")
+        finally:
+            analytics.vitals_log = log
+
+    return True
+
+
+def test_request_analytics_records_and_aggregates():
+    """Test that noted requests are recorded with latency and aggregated by segment"""
+    print("\n=== Testing request analytics ===")
+    from flask import Flask, jsonify
+
+    assert [analytics.income_band(v) for v in (0, 150000, 10 ** 7, None)] == ['<1L', '1L-2.5L', '10L+', 'any'], \
+        "Incomes should map to bands"
+
+    log, buffer = analytics.request_log, analytics.request_buffer
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            analytics.request_log = PartitionedLog(tmp, 'requests')
+            analytics.request_buffer = EventBuffer('requests-test', analytics.request_log.append, flush_interval=60)
+            app = Flask(__name__)
+            analytics.install_request_analytics(app)
+
+            @app.route('/recommend/<state>')
+            def recommend(state):
+                analytics.note_request('recommend', {'state': state, 'income': 90000, 'category': 'Health'}, 3)
+                return jsonify({})
+
+            @app.route('/other')
+            def other():
+                return jsonify({})
+
+            client = app.test_client()
+            for state in ['bihar', 'Bihar', 'Kerala', 'Bihar']:
+                client.get(f'/recommend/{state}')
+            client.get('/other')
+            analytics.request_buffer.flush()
+
+            result = analytics.request_aggregates(hours=1, group_by=('state', 'income_band'))
+            assert result['total'] == 4, "Only noted requests should be recorded"
+            top = result['groups'][0]
+            assert (top['state'], top['income_band'], top['count']) == ('Bihar', '<1L', 3), "States are normalised"
+            assert top['share'] == 0.75 and top['mean_results'] == 3, "Share and mean results per segment"
+            assert top['p50_ms'] is not None, "Latency should be recorded"
+            print(f"✓ {result['groups']}")
+        finally:
+            analytics.request_log, analytics.request_buffer = log, buffer
+
+    return True
@@ -0,0 +1,75 @@
+"""
+Unit tests for the SchemeAssist AI benchmark suite
+Tests the synthetic data generator, percentiles and baseline comparison
+"""
+
+import sys
+import os
+
+# Add repository root to path to import the benchmarks package
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+from benchmarks.synthetic import generate_profiles, iter_catalog # type: ignore
+from benchmarks.run import compare_to_baseline # type: ignore
+from benchmarks.stats import percentile # type: ignore
+
+
+def test_synthetic_catalog_is_deterministic():
+    """Test that the same seed produces the same catalog and profiles"""
+    print("\n=== Testing synthetic catalog generator ===")
+    first = list(iter_catalog(200, seed=1))
+    second = list(iter_catalog(200, seed=1))
+    other = list(iter_catalog(200, seed=2))
+
+    assert first == second, "Same seed should give the same catalog"
+    assert first != other, "Different seeds should give different catalogs"
+    assert len({row['scheme_id'] for row in first}) == 200, "Scheme ids should be unique"
+    assert any(row['state'] == 'All' for row in first), "Catalog should include central schemes"
+    assert all(int(row['min_income']) <= int(row['max_income']) for row in first), "Income ranges should be valid"
+    assert generate_profiles(5, seed=3) == generate_profiles(5, seed=3), "Profiles should be deterministic"
+    print(f"✓ 200 rows, {len({row['category'] for row in first})} categories")
+
+    return True
+
+
+def test_percentiles_and_regressions():
+    """Test nearest-rank percentiles and regression detection"""
+    print("\n=== Testing percentile() and compare_to_baseline() ===")
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50, "p50 of 1..100 should be 50"
+    assert percentile(samples, 99) == 99, "p99 of 1..100 should be 99"
+
+    baseline = {'recommend_schemes@1000': {'p50_ms': 10.0}, 'search_schemes@1000': {'p50_ms': 5.0}}
+    results = {'recommend_schemes@1000': {'p50_ms': 13.0}, 'search_schemes@1000': {'p50_ms': 5.5}}
+    regressions = compare_to_baseline(results, baseline, threshold=0.2)
+    assert [name for name, *_ in regressions] == ['recommend_schemes@1000'], "Only the 30% slowdown should be flagged"
+    print(f"✓ Regressions: {regressions}")
+
+    return True
+
+
+def test_load_test_mix_and_report():
+    """Test endpoint mix parsing and per-endpoint error accounting"""
+    print("\n=== Testing load test mix and report ===")
+    from benchmarks.loadtest import Recorder, endpoint_label, parse_mix # type: ignore
+
+    assert parse_mix('recommend=70,search=30') == [('recommend', 70.0), ('search', 30.0)], "Mix should parse"
+    try:
+        parse_mix('unknown=1')
+        assert False, "Unknown endpoints should be rejected"
+    except ValueError:
+        pass
+    assert endpoint_label('/api/scheme/PM Kisan') == '/api/scheme', "Scheme paths should be grouped"
+    assert endpoint_label('/api/favorites?user_id=a') == '/api/favorites', "Query strings should be ignored"
+
+    recorder = Recorder()
+    for status in (200, 200, 429, 500, 'error'):
+        recorder.record('/api/recommend', status, 0.01)
+    summary = recorder.report(1.0)['/api/recommend']
+    assert summary['errors'] == 2 and summary['rejected_429'] == 1, "5xx and failures should count as errors"
+    assert summary['error_rate'] == 0.4, "Error rate should be errors / requests"
+    print(f"✓ {summary['calls']} requests, error rate {summary['error_rate']}")
+
+    return True
@@ -0,0 +1,65 @@
+"""
+Unit tests for the SchemeAssist AI export pipeline
+Tests the streaming CSV, JSONL and XLSX writers
+"""
+
+import sys
+import os
+import io
+import csv
+import json
+import zipfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from exporter import EXPORT_COLUMNS, iter_export # type: ignore
+
+SAMPLE_ROWS = [
+    {"scheme_id": "S1", "scheme_name": 'Scheme "One", Part A', "min_income": "0", "max_income": "250000"},
+    {"scheme_id": "S2", "scheme_name": "Scheme <Two> & Co", "min_income": 1000, "max_income": 999999}
+]
+
+
+def test_csv_export_quotes_fields():
+    """Test that CSV export round-trips names with commas and quotes"""
+    print("\n=== Testing iter_export() - CSV ===")
+    data = b''.join(iter_export('csv', iter(SAMPLE_ROWS), EXPORT_COLUMNS)).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(data)))
+
+    assert rows[0][1] == 'Scheme Name', "First row should be the header"
+    assert rows[1][1] == 'Scheme "One", Part A', "Quotes and commas should round-trip"
+    assert len(rows) == 3, "Should have header plus one row per scheme"
+    print(f"✓ CSV export produced {len(rows) - 1} rows")
+
+    return True
+
+
+def test_jsonl_export_converts_numbers():
+    """Test that JSONL export writes one record per line with numeric incomes"""
+    print("\n=== Testing iter_export() - JSONL ===")
+    data = b''.join(iter_export('jsonl', iter(SAMPLE_ROWS), EXPORT_COLUMNS)).decode('utf-8')
+    records = [json.loads(line) for line in data.splitlines()]
+
+    assert len(records) == 2, "Should have one line per scheme"
+    assert records[0]['max_income'] == 250000, "Income columns should be numbers"
+    print("✓ JSONL export produced typed records")
+
+    return True
+
+
+def test_xlsx_export_is_valid_workbook():
+    """Test that the streamed XLSX is a readable zip with one sheet row per scheme"""
+    print("\n=== Testing iter_export() - XLSX ===")
+    data = b''.join(iter_export('xlsx', iter(SAMPLE_ROWS), EXPORT_COLUMNS))
+    workbook = zipfile.ZipFile(io.BytesIO(data))
+
+    assert workbook.testzip() is None, "Workbook zip should not be corrupt"
+    sheet = workbook.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert sheet.count('<row ') == 3, "Sheet should have header plus one row per scheme"
+    assert 'Scheme &lt;Two&gt; &amp; Co' in sheet, "Cell text should be XML escaped"
+    print("✓ XLSX export is a valid workbook")
+
+    return True
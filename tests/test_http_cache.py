@@ -0,0 +1,69 @@
+"""
+Unit tests for SchemeAssist AI HTTP caching
+Tests ETags and conditional requests for GET and POST endpoints
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from http_cache import conditional, etag_matches # type: ignore
+
+
+def _app():
+    from flask import Flask, jsonify
+
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/items', methods=['GET', 'POST'])
+    @conditional(lambda: 'v1')
+    def items():
+        calls.append(1)
+        return jsonify({'items': [1, 2]})
+
+    return app, calls
+
+
+def test_get_revalidates_with_304():
+    """Test that a GET with a matching If-None-Match gets 304 without running the handler"""
+    print("\n=== Testing conditional() - GET ===")
+    app, calls = _app()
+    client = app.test_client()
+    first = client.get('/items')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('"v1-'), "GET responses should carry a catalog ETag"
+    assert 'max-age' in first.headers['Cache-Control'], "GET responses should be cacheable"
+
+    second = client.get('/items', headers={'If-None-Match': etag})
+    assert second.status_code == 304 and len(calls) == 1, "A matching ETag should short-circuit to 304"
+    assert etag_matches(etag, f'W/{etag}, "other"'), "Weak and listed ETags should match"
+    print(f"✓ 304 for {etag}")
+
+    return True
+
+
+def test_post_never_returns_304():
+    """Test that POST requests get no validators and 412 instead of 304 on a matching If-None-Match"""
+    print("\n=== Testing conditional() - POST ===")
+    app, calls = _app()
+    client = app.test_client()
+    etag = client.get('/items').headers['ETag']
+
+    response = client.post('/items', json={'q': 'x'})
+    assert response.status_code == 200, "POST should run the handler"
+    assert 'ETag' not in response.headers and 'Cache-Control' not in response.headers, \
+        "POST responses should carry no cache validators"
+
+    response = client.post('/items', json={'q': 'x'}, headers={'If-None-Match': '*'})
+    assert response.status_code == 412, "A matching If-None-Match on POST should fail with 412"
+    response = client.post('/items', json={'q': 'x'}, headers={'If-None-Match': etag})
+    assert response.status_code == 200, "An ETag of another request should not match"
+    assert len(calls) == 3, "The handler should run for every POST that passes"
+    print("✓ POST gets 200 or 412, never 304")
+
+    return True
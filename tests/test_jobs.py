@@ -0,0 +1,216 @@
+"""
+Unit tests for SchemeAssist AI background jobs
+Tests submission, retries, cancellation and expiry in the SQLite job
+queue, and export jobs
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+repo_path = os.path.dirname(backend_path)
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
+
+import exporter # type: ignore
+import jobs # type: ignore
+import recommender # type: ignore
+from jobs import JobQueue, register_job # type: ignore
+from benchmarks.synthetic import write_data_dir # type: ignore
+
+calls = {'flaky': 0, 'expired': []}
+
+
+@register_job('test_echo')
+def echo_job(payload, context):
+    return {'echo': payload['value'], 'attempt': context.attempt}
+
+
+@register_job('test_flaky')
+def flaky_job(payload, context):
+    calls['flaky'] += 1
+    raise RuntimeError('temporary failure')
+
+
+@register_job('test_slow')
+def slow_job(payload, context):
+    time.sleep(payload['seconds'])
+    row = context.queue._connect().execute('SELECT started_at, heartbeat FROM jobs WHERE id = ?',
+                                           (context.job_id,)).fetchone()
+    return {'heartbeat_after': row['heartbeat'] - row['started_at']}
+
+
+@register_job('test_cancel_ignored')
+def cancel_ignored_job(payload, context):
+    context.queue.cancel(context.job_id)
+    return {'ignored': True}
+
+
+@register_job('test_cancellable', on_expire=lambda result: calls['expired'].append(result))
+def cancellable_job(payload, context):
+    if payload.get('cancel'):
+        context.queue.cancel(context.job_id)
+        context.check_cancelled()
+    return {'done': True}
+
+
+def test_submit_and_run():
+    """Test that a submitted job is claimed once and stores its result"""
+    print("\n=== Testing JobQueue submit/run ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=0)
+        job = queue.submit('test_echo', {'value': 42})
+        assert job['status'] == 'queued', "New jobs should be queued"
+
+        claimed = queue._claim()
+        assert claimed['id'] == job['id'] and claimed['attempts'] == 1, "Job should be claimed with attempt 1"
+        assert queue._claim() is None, "A running job should not be claimed twice"
+
+        queue.run_job(claimed)
+        job = queue.get(job['id'])
+        assert job['status'] == 'done', "Job should be done"
+        assert job['result'] == {'echo': 42, 'attempt': 1}, "Result should be stored as JSON"
+        assert job['expires_at'] > job['finished_at'], "Finished jobs should get an expiry"
+        print(f"✓ Job {job['id'][:8]} finished with {job['result']}")
+
+        try:
+            queue.submit('no_such_kind', {})
+            assert False, "Unknown kinds should be rejected"
+        except ValueError:
+            print("✓ Unknown job kind rejected")
+
+    return True
+
+
+def test_retry_with_backoff_then_fail():
+    """Test that failing jobs are retried later and fail after max_attempts"""
+    print("\n=== Testing JobQueue retries ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=0)
+        job = queue.submit('test_flaky', {}, max_attempts=2)
+
+        queue.run_job(queue._claim())
+        retried = queue.get(job['id'])
+        assert retried['status'] == 'queued', "Failed job should be requeued"
+        assert retried['run_after'] > retried['created_at'], "Retry should be delayed"
+        assert queue._claim() is None, "Retry should not run before its backoff"
+
+        queue._connect().execute('UPDATE jobs SET run_after = 0')
+        queue.run_job(queue._claim())
+        failed = queue.get(job['id'])
+        assert failed['status'] == 'failed', "Job should fail after max_attempts"
+        assert failed['attempts'] == 2 and 'temporary failure' in failed['error'], "Error should be recorded"
+        print(f"✓ Failed after {failed['attempts']} attempts: {failed['error']}")
+
+    return True
+
+
+def test_cancel_and_expiry():
+    """Test cancelling queued and running jobs, and expiry cleanup"""
+    print("\n=== Testing JobQueue cancel/expiry ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=0)
+        queued = queue.submit('test_cancellable', {})
+        assert queue.cancel(queued['id'])['status'] == 'cancelled', "Queued jobs should cancel at once"
+        assert queue._claim() is None, "Cancelled jobs should not run"
+
+        running = queue.submit('test_cancellable', {'cancel': True})
+        queue.run_job(queue._claim())
+        assert queue.get(running['id'])['status'] == 'cancelled', "Running jobs should stop at check_cancelled"
+        print("✓ Queued and running jobs cancelled")
+
+        ignored = queue.submit('test_cancel_ignored', {})
+        queue.run_job(queue._claim())
+        ignored = queue.get(ignored['id'])
+        assert ignored['status'] == 'cancelled', "A job cancelled while running should not be marked done"
+        assert ignored['result'] == {'ignored': True}, "Its result should be kept for on_expire"
+        print("✓ Cancellation wins over a job that finished anyway")
+        queue._connect().execute('DELETE FROM jobs')
+
+        done = queue.submit('test_cancellable', {})
+        queue.run_job(queue._claim())
+        queue._connect().execute('UPDATE jobs SET expires_at = 0')
+        queue.maintain()
+        assert queue.get(done['id']) is None, "Expired jobs should be deleted"
+        assert calls['expired'] == [{'done': True}], "on_expire should receive the result"
+        assert queue.stats() == {}, "All jobs should be gone"
+        print("✓ Expired jobs deleted and cleaned up")
+
+    return True
+
+
+def test_export_job_writes_file():
+    """Test that an export job writes its file and removes it on expiry"""
+    print("\n=== Testing export jobs ===")
+    catalog_path = recommender.CATALOG_PATH
+    export_dir = exporter.EXPORT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(os.path.join(tmp, 'data'), 50), 'combined_schemes.csv')
+            exporter.EXPORT_DIR = os.path.join(tmp, 'exports')
+            queue = JobQueue(os.path.join(tmp, 'jobs.db'), workers=0)
+            job = queue.submit('export', {'format': 'csv', 'query': '', 'filters': None})
+            queue.run_job(queue._claim())
+
+            result = queue.get(job['id'])['result']
+            path = exporter.export_file_path(result)
+            with open(path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            assert len(lines) == result['rows'] + 1, "File should have a header plus one line per row"
+            assert result['rows'] > 0, "Export should contain rows"
+            assert exporter.export_file_path({'file': '../jobs.db'}) is None, "Paths outside EXPORT_DIR are rejected"
+            print(f"✓ Exported {result['rows']} rows to {result['file']}")
+
+            queue._connect().execute('UPDATE jobs SET expires_at = 0')
+            queue.maintain()
+            assert not os.path.exists(path), "Expired export files should be removed"
+            print("✓ Export file removed on expiry")
+
+            try:
+                queue.submit('export', {'format': 'pdf'})
+                assert False, "Bad export formats should be rejected"
+            except ValueError:
+                print("✓ Bad export format rejected at submission")
+        finally:
+            recommender.CATALOG_PATH = catalog_path
+            exporter.EXPORT_DIR = export_dir
+
+    return True
+
+
+def test_lost_jobs_respect_max_attempts():
+    """Test that jobs of a dead worker are requeued until their attempts are used up"""
+    print("\n=== Testing JobQueue.maintain() ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state', 'jobs.db')
+        queue = JobQueue(path, workers=0)
+        assert not os.path.exists(path), "The database should be created on first use"
+
+        job = queue.submit('test_echo', {'value': 1}, max_attempts=2)
+        assert os.path.exists(path), "Submitting should create the database"
+        for attempt in (1, 2):
+            assert queue._claim()['attempts'] == attempt, "The lost job should be claimed again"
+            queue._connect().execute('UPDATE jobs SET heartbeat = 0')
+            queue.maintain()
+        lost = queue.get(job['id'])
+        assert lost['status'] == 'failed' and 'Worker lost' in lost['error'], "Lost jobs should fail after max_attempts"
+        assert lost['expires_at'] is not None, "Failed lost jobs should expire"
+        print(f"✓ {lost['error']}")
+
+        interval = jobs.JOB_HEARTBEAT_INTERVAL
+        try:
+            jobs.JOB_HEARTBEAT_INTERVAL = 0.05
+            slow = queue.submit('test_slow', {'seconds': 0.3})
+            queue.run_job(queue._claim())
+        finally:
+            jobs.JOB_HEARTBEAT_INTERVAL = interval
+        assert queue.get(slow['id'])['result']['heartbeat_after'] > 0, \
+            "The heartbeat should be refreshed while the job function runs"
+        print("✓ Heartbeat refreshed without check_cancelled()")
+
+    return True
@@ -0,0 +1,75 @@
+"""
+Unit tests for SchemeAssist AI logging pipeline
+Tests JSON formatting, info sampling and the bounded, dropping queue
+"""
+
+import io
+import sys
+import os
+import json
+import queue
+import logging
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from logconfig import DroppingQueueHandler, JsonFormatter, SamplingFilter, console_formatter, log_stats # type: ignore
+
+
+def _record(level=logging.INFO, msg='message %s', args=('arg',), **extra):
+    record = logging.LogRecord('test', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    """Test that records become JSON objects with their extra fields"""
+    print("\n=== Testing JsonFormatter ===")
+    entry = json.loads(JsonFormatter().format(_record(event='recommendation_request', results_count=3)))
+
+    assert entry['message'] == 'message arg', "Message should be rendered"
+    assert entry['level'] == 'INFO' and entry['logger'] == 'test', "Level and logger should be present"
+    assert entry['event'] == 'recommendation_request' and entry['results_count'] == 3, "Extra fields should be kept"
+    print(f"✓ {entry}")
+
+    return True
+
+
+def test_sampling_and_dropping():
+    """Test that info logs are sampled and a full queue drops instead of blocking"""
+    print("\n=== Testing SamplingFilter and DroppingQueueHandler ===")
+    sampler = SamplingFilter(0.0)
+    assert not sampler.filter(_record(logging.INFO)), "Info should be sampled out at rate 0"
+    assert sampler.filter(_record(logging.ERROR)), "Errors should never be sampled out"
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2), lambda: None)
+    dropped_before = log_stats()['dropped']
+    for _ in range(5):
+        handler.emit(_record())
+
+    assert handler.queue.qsize() == 2, "Queue should stay bounded"
+    assert log_stats()['dropped'] - dropped_before == 3, "Overflowing records should be counted as dropped"
+    queued = handler.queue.get_nowait()
+    assert queued.msg == 'message arg' and queued.args is None, "Records should be rendered before queueing"
+    print("✓ 2 queued, 3 dropped")
+
+    return True
+
+
+def test_console_format_selection():
+    """Test that the console uses JSON when asked to or when stderr is not a terminal"""
+    print("\n=== Testing console_formatter() ===")
+
+    class Terminal(io.StringIO):
+        def isatty(self):
+            return True
+
+    assert isinstance(console_formatter('json', Terminal()), JsonFormatter), "LOG_FORMAT=json should use JSON"
+    assert not isinstance(console_formatter('text', io.StringIO()), JsonFormatter), "LOG_FORMAT=text should use text"
+    assert isinstance(console_formatter('auto', io.StringIO()), JsonFormatter), "Piped stderr should get JSON"
+    assert not isinstance(console_formatter('auto', Terminal()), JsonFormatter), "A terminal should get text"
+    print("✓ Console format follows LOG_FORMAT and the terminal check")
+
+    return True
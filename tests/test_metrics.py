@@ -0,0 +1,98 @@
+"""
+Unit tests for SchemeAssist AI request metrics
+Tests histogram rendering and aggregation across worker snapshots
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from metrics import MetricsRegistry # type: ignore
+
+
+def _registry(directory, pid):
+    registry = MetricsRegistry(directory, pid=pid)
+    registry.describe('requests_total', 'counter', 'Requests')
+    registry.describe('in_flight', 'gauge', 'In flight')
+    registry.describe('latency_seconds', 'histogram', 'Latency', buckets=(0.1, 1.0))
+    return registry
+
+
+def test_histogram_rendering():
+    """Test that histograms render cumulative buckets, sum and count"""
+    print("\n=== Testing MetricsRegistry.render() ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = _registry(tmp, os.getpid())
+        for value in (0.05, 0.5, 3.0):
+            registry.observe('latency_seconds', (('route', '/api/search'),), value)
+        text = registry.render()
+
+        assert 'latency_seconds_bucket{route="/api/search",le="0.1"} 1' in text, "First bucket should hold one"
+        assert 'latency_seconds_bucket{route="/api/search",le="1"} 2' in text, "Buckets should be cumulative"
+        assert 'latency_seconds_bucket{route="/api/search",le="+Inf"} 3' in text, "+Inf should hold every sample"
+        assert 'latency_seconds_count{route="/api/search"} 3' in text, "Count should be rendered"
+        print("✓ Cumulative buckets rendered")
+
+    return True
+
+
+def test_aggregation_across_workers():
+    """Test that counters are summed and gauges of dead workers are dropped"""
+    print("\n=== Testing MetricsRegistry.aggregate() ===")
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worker = _registry(tmp, dead.pid)
+        worker.inc('requests_total', (('status', '200'),), 5)
+        worker.add('in_flight', (), 3)
+        worker.observe('latency_seconds', (), 0.5)
+        worker.flush()
+
+        current = _registry(tmp, os.getpid())
+        current.inc('requests_total', (('status', '200'),), 2)
+        current.add('in_flight', (), 1)
+        current.observe('latency_seconds', (), 0.05)
+
+        merged = current.aggregate()
+        assert merged['counter'][('requests_total', (('status', '200'),))] == 7, "Counters should be summed"
+        assert merged['gauge'][('in_flight', ())] == 1, "Gauges of dead workers should be dropped"
+        assert merged['histogram'][('latency_seconds', ())][2] == 2, "Histograms should be merged"
+        print("✓ 2 snapshots merged")
+
+    return True
+
+
+def test_exited_workers_are_archived():
+    """Test that snapshots of exited workers are folded into the archive and a reused pid keeps its totals"""
+    print("\n=== Testing MetricsRegistry archive of exited workers ===")
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for pid, amount in ((dead.pid, 5), (os.getpid(), 3)):
+            worker = _registry(tmp, pid)
+            worker.inc('requests_total', (), amount)
+            worker.observe('latency_seconds', (), 0.5)
+            worker.flush()
+
+        # A new worker that was given the same pid as the last one
+        current = _registry(tmp, os.getpid())
+        current.inc('requests_total', (), 1)
+        merged = current.aggregate()
+        assert merged['counter'][('requests_total', ())] == 9, "Totals of exited workers should be kept"
+        assert merged['histogram'][('latency_seconds', ())][2] == 2, "Histograms of exited workers should be kept"
+        assert sorted(os.listdir(tmp)) == ['archive.json', 'archive.json.lock'], \
+            "Snapshots of exited workers should be deleted"
+
+        current.flush()
+        assert current.aggregate()['counter'][('requests_total', ())] == 9, "Archived totals should not be counted twice"
+        print(f"✓ Exited workers archived: {sorted(os.listdir(tmp))}")
+
+    return True
@@ -0,0 +1,105 @@
+"""
+Unit tests for SchemeAssist AI parallel recommendation scoring
+Tests catalog sharding and that the process pool ranks matches exactly
+like a serial scan
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+repo_path = os.path.dirname(backend_path)
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
+
+import recommender # type: ignore
+import parallel_scoring # type: ignore
+from parallel_scoring import (ranked_matches, shard_ranges, shutdown_pool, parallel_scoring_stats, # type: ignore
+                              attach_columns, columns_path, iter_column_matches, write_columns)
+from benchmarks.synthetic import generate_profiles, write_data_dir # type: ignore
+from utils import build_user_profile # type: ignore
+
+
+def test_shard_ranges():
+    """Test that shards cover the catalog once, in order"""
+    print("\n=== Testing shard_ranges() ===")
+    assert shard_ranges(10, 3) == [(0, 4), (4, 8), (8, 10)], "Shards should be contiguous and cover every index"
+    assert shard_ranges(2, 8) == [(0, 1), (1, 2)], "There should be no empty shards"
+    assert shard_ranges(0, 4) == [], "An empty catalog has no shards"
+    print("✓ Shards cover the catalog")
+
+    return True
+
+
+def test_parallel_matches_serial():
+    """Test that sharded scoring returns the serial ranking, with and without a limit"""
+    print("\n=== Testing ranked_matches() in parallel ===")
+    catalog_path = recommender.CATALOG_PATH
+    settings = (parallel_scoring.PARALLEL_SCORING_WORKERS, parallel_scoring.PARALLEL_SCORING_MIN_SCHEMES,
+                parallel_scoring.PARALLEL_SCORING_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            parallel_scoring.PARALLEL_SCORING_DIR = os.path.join(tmp, 'scoring')
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(os.path.join(tmp, 'data'), 2000), 'combined_schemes.csv')
+            catalog = recommender.get_catalog()
+            profiles = [build_user_profile(profile) for profile in generate_profiles(5)]
+
+            parallel_scoring.PARALLEL_SCORING_WORKERS = 0
+            serial = [ranked_matches(profile, 50, catalog) for profile in profiles]
+
+            parallel_scoring.PARALLEL_SCORING_WORKERS, parallel_scoring.PARALLEL_SCORING_MIN_SCHEMES = 2, 1000
+            before = parallel_scoring_stats()['parallel']
+            parallel = [ranked_matches(profile, 50, catalog) for profile in profiles]
+            assert parallel == serial, "Parallel scoring should rank exactly like a serial scan"
+            assert parallel_scoring_stats()['parallel'] == before + len(profiles), "Requests should use the pool"
+            assert os.listdir(parallel_scoring.PARALLEL_SCORING_DIR) == [
+                os.path.basename(columns_path(recommender.CATALOG_PATH, catalog.version))], \
+                "Workers should share one columns file per catalog version"
+            assert ranked_matches(profiles[0], 50, catalog, limit=3) == serial[0][:3], "Limit should keep the best matches"
+            print(f"✓ {sum(len(matches) for matches in parallel)} matches ranked like the serial scan")
+
+            parallel_scoring.PARALLEL_SCORING_MIN_SCHEMES = 5000
+            assert ranked_matches(profiles[0], 50, catalog) == serial[0], "Small catalogs are scored serially"
+            print("✓ Catalogs below the threshold are scored serially")
+        finally:
+            shutdown_pool()
+            (parallel_scoring.PARALLEL_SCORING_WORKERS, parallel_scoring.PARALLEL_SCORING_MIN_SCHEMES,
+             parallel_scoring.PARALLEL_SCORING_DIR) = settings
+            recommender.CATALOG_PATH = catalog_path
+
+    return True
+
+
+def test_column_matches_equal_row_matches():
+    """Test that scoring the mapped columns gives the same matches as scoring the parsed rows"""
+    print("\n=== Testing iter_column_matches() ===")
+    catalog_path, scoring_dir = recommender.CATALOG_PATH, parallel_scoring.PARALLEL_SCORING_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            parallel_scoring.PARALLEL_SCORING_DIR = os.path.join(tmp, 'scoring')
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(os.path.join(tmp, 'data'), 1500), 'combined_schemes.csv')
+            catalog = recommender.get_catalog()
+            path = columns_path(recommender.CATALOG_PATH, catalog.version)
+            write_columns(catalog, path)
+            columns = attach_columns(path)
+            assert columns['version'] == catalog.version, "The columns should record the catalog version"
+
+            total = 0
+            for profile in [build_user_profile(profile) for profile in generate_profiles(10)]:
+                for min_score in (50, 95):
+                    for start, stop in ((0, 1500), (400, 900)):
+                        expected = sorted(recommender.iter_recommendation_matches(profile, min_score, catalog,
+                                                                                  (start, stop)))
+                        got = sorted(iter_column_matches(columns, profile, min_score, start, stop))
+                        assert got == expected, "Column scoring should match row scoring"
+                        total += len(got)
+            print(f"✓ {total} matches identical from the mapped columns")
+        finally:
+            parallel_scoring.PARALLEL_SCORING_DIR = scoring_dir
+            recommender.CATALOG_PATH = catalog_path
+
+    return True
@@ -0,0 +1,116 @@
+"""
+Unit tests for SchemeAssist AI request profiling
+Tests the token check, the .pstats ring buffer and the stack sampler
+"""
+
+import sys
+import os
+import cProfile
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+import profiling # type: ignore
+from profiling import StackSampler, is_authorized, list_profiles, profile_path, save_profile # type: ignore
+
+
+def test_profile_ring_buffer():
+    """Test that only the newest profiles are kept"""
+    print("\n=== Testing save_profile() - Ring buffer ===")
+    assert not is_authorized('anything', expected=''), "Profiling should be off without a token"
+    assert is_authorized('secret', expected='secret'), "Matching token should be accepted"
+    assert not is_authorized('sécret', expected='secret'), "Non-ASCII tokens should be rejected, not raise"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = []
+        for _ in range(5):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            sum(range(1000))
+            profiler.disable()
+            ids.append(save_profile(profiler, 'recommend', directory=tmp, keep=3))
+            time.sleep(0.002)
+
+        stored = [profile['profile_id'] for profile in list_profiles(tmp)]
+        assert stored == list(reversed(ids[-3:])), "The three newest profiles should be kept, newest first"
+        assert profile_path(ids[-1], tmp) is not None, "Stored profile should be found"
+        assert profile_path('../etc/passwd', tmp) is None, "Path traversal should be rejected"
+        print(f"✓ Kept {len(stored)} of {len(ids)} profiles")
+
+    return True
+
+
+def test_stack_sampler_collapses_stacks():
+    """Test that the sampler records the stack of a busy thread"""
+    print("\n=== Testing StackSampler ===")
+    done = threading.Event()
+
+    def busy_loop():
+        while not done.is_set():
+            sum(range(100))
+
+    worker = threading.Thread(target=busy_loop)
+    worker.start()
+    sampler = StackSampler(worker.ident, interval=0.001)
+    sampler.start()
+    time.sleep(0.05)
+    sampler.stop()
+    done.set()
+    worker.join()
+
+    collapsed = sampler.collapsed()
+    assert 'busy_loop (test_profiling.py:' in collapsed, "Samples should include the busy function"
+    stack, count = collapsed.splitlines()[0].rsplit(' ', 1)
+    assert int(count) > 0 and ';' in stack, "Lines should be 'frame;frame count'"
+    print(f"✓ {sum(sampler.counts.values())} samples collected")
+
+    return True
+
+
+def test_profiled_requests_are_serialised():
+    """Test that the token is only taken from the header and concurrent profiles get 409"""
+    print("\n=== Testing profiled() ===")
+    from flask import Flask
+
+    app = Flask(__name__)
+    entered, release = threading.Event(), threading.Event()
+    original = (profiling.PROFILING_TOKEN, profiling.PROFILE_DIR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        profiling.PROFILING_TOKEN, profiling.PROFILE_DIR = 'secret', tmp
+        try:
+            @app.route('/slow')
+            @profiling.profiled
+            def slow():
+                entered.set()
+                release.wait(5)
+                return 'done'
+
+            client = app.test_client()
+            release.set()
+            response = client.get('/slow?_profile=secret', headers={'X-Profile-Format': 'pstats'})
+            assert 'X-Profile-Id' not in response.headers, "The query-string token should be ignored"
+
+            entered.clear()
+            release.clear()
+            results = {}
+            first = threading.Thread(target=lambda: results.setdefault(
+                'first', app.test_client().get('/slow', headers={'X-Profile': 'secret'})))
+            first.start()
+            assert entered.wait(5), "First profiled request should start"
+            busy = client.get('/slow', headers={'X-Profile': 'secret'})
+            release.set()
+            first.join(5)
+        finally:
+            profiling.PROFILING_TOKEN, profiling.PROFILE_DIR = original
+
+        assert busy.status_code == 409, "A second concurrent profile should be refused"
+        assert 'X-Profile-Id' in results['first'].headers, "The first request should be profiled"
+        print("✓ Header-only token, one profiler at a time")
+
+    return True
@@ -0,0 +1,110 @@
+"""
+Unit tests for SchemeAssist AI admission control
+Tests token buckets, the SQLite bucket store and the concurrency limiter
+"""
+
+import sys
+import os
+import tempfile
+import threading
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from flask import Flask, Response # type: ignore
+from ratelimit import (MemoryBucketStore, SQLiteBucketStore, ConcurrencyLimiter, # type: ignore
+                       admission_control, admission_stats, set_user_resolver)
+
+
+def test_token_bucket_allows_burst_then_limits():
+    """Test that a bucket allows its burst, then asks the client to wait"""
+    print("\n=== Testing token buckets ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        for store in (MemoryBucketStore(), SQLiteBucketStore(os.path.join(tmp, 'buckets.db'))):
+            now = 1000.0
+            waits = [store.take('client', 2.0, 3, now) for _ in range(3)]
+            assert waits == [0.0, 0.0, 0.0], "Burst should be allowed"
+
+            wait = store.take('client', 2.0, 3, now)
+            assert abs(wait - 0.5) < 1e-9, "Empty bucket should refill one token in 1/rate seconds"
+            assert store.take('other', 2.0, 3, now) == 0.0, "Clients should have separate buckets"
+            assert store.take('client', 2.0, 3, now + 0.5) == 0.0, "Bucket should refill over time"
+            print(f"✓ {type(store).__name__}: burst of 3, retry after {wait}s")
+
+    return True
+
+
+def test_concurrency_limiter_sheds_when_queue_full():
+    """Test that requests beyond the slots and queue are rejected"""
+    print("\n=== Testing ConcurrencyLimiter ===")
+    limiter = ConcurrencyLimiter('test', limit=1, queue=1, queue_timeout=0.2)
+    assert limiter.acquire(), "First request should get the slot"
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        pass
+
+    assert not limiter.acquire(), "Request should be shed when the queue is full"
+    limiter.release()
+    waiter.join()
+    assert results == [True], "Queued request should get the released slot"
+
+    limiter.release()
+    print(f"✓ 1 slot, 1 queued, {limiter.rejected} shed")
+
+    return True
+
+
+def test_admission_control_keys_on_peer_address():
+    """Test that X-Forwarded-For cannot reset a bucket and streams hold their slot"""
+    print("\n=== Testing admission_control() ===")
+    app = Flask(__name__)
+
+    @app.route('/limited')
+    @admission_control('test_peer', rate=0.001, burst=2, limit=4)
+    def limited():
+        return Response(iter([b'a', b'b']))
+
+    client = app.test_client()
+    statuses = []
+    for index in range(4):
+        with client.get('/limited', headers={'X-Forwarded-For': f"1.2.3.{index}"}) as response:
+            statuses.append(response.status_code)
+    assert statuses == [200, 200, 429, 429], "Forged X-Forwarded-For should not give a fresh bucket"
+
+    response = client.get('/limited', environ_base={'REMOTE_ADDR': '10.0.0.9'})
+    assert admission_stats()['test_peer']['active'] == 1, "A streaming response should hold its slot"
+    response.get_data()
+    response.close()
+    assert admission_stats()['test_peer']['active'] == 0, "The slot should be released when the response closes"
+    print(f"✓ Statuses {statuses}, slot released on close")
+
+    return True
+
+
+def test_admission_control_keys_on_authenticated_user():
+    """Test that users sharing one address get separate buckets, and unknown tokens do not"""
+    print("\n=== Testing admission_control() - Authenticated users ===")
+    app = Flask(__name__)
+
+    @app.route('/limited')
+    @admission_control('test_user', rate=0.001, burst=1)
+    def limited():
+        return 'ok'
+
+    client = app.test_client()
+    set_user_resolver({'token-a': 'alice', 'token-b': 'bob'}.get)
+    try:
+        statuses = [client.get('/limited', headers={'Authorization': token}).status_code
+                    for token in ('token-a', 'token-b', 'token-a', 'forged-1', 'forged-2')]
+    finally:
+        set_user_resolver(None)
+    assert statuses[:3] == [200, 200, 429], "Each user behind one address should get their own bucket"
+    assert statuses[3:] == [200, 429], "Unknown tokens should share the address bucket"
+    print(f"✓ Statuses {statuses}")
+
+    return True
@@ -5,14 +5,22 @@ Tests the recommendation logic and data loading functions
 
 import sys
 import os
+import tempfile
+from contextlib import contextmanager
 
 # Add parent directory to path to import backend modules
 backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
+repo_path = os.path.dirname(backend_path)
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
 
 try:
-    from recommender import recommend_schemes, load_schemes # type: ignore
+    import recommender # type: ignore
+    from benchmarks.synthetic import write_data_dir # type: ignore
+    from recommender import (recommend_schemes, load_schemes, iter_recommendations, # type: ignore
+                             iter_recommendation_matches, recommendation_delta, match_scheme)
     from utils import validate_user_profile, categorize_by_priority # type: ignore
     from alerts import check_scheme_updates, check_eligibility_changes # type: ignore
 except ImportError as e:
@@ -22,6 +30,18 @@ except ImportError as e:
     sys.exit(1)
 
 
+@contextmanager
+def synthetic_catalog(rows=2000):
+    """Point the recommender at a synthetic catalog in a temporary directory"""
+    catalog_path = recommender.CATALOG_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(tmp, rows), 'combined_schemes.csv')
+            yield recommender.get_catalog()
+        finally:
+            recommender.CATALOG_PATH = catalog_path
+
+
 def test_load_schemes():
     """Test that schemes are loaded correctly from CSV"""
     print("\n=== Testing load_schemes() ===")
@@ -129,6 +149,98 @@ def test_recommend_schemes_scoring():
     return True
 
 
+def test_iter_recommendations_matches_list():
+    """Test that the streaming generator yields the same schemes as recommend_schemes"""
+    print("\n=== Testing iter_recommendations() ===")
+    
+    user_profile = {
+        "state": "All",
+        "income": 150000,
+        "category": "Health"
+    }
+    
+    with synthetic_catalog():
+        streamed = list(iter_recommendations(user_profile, 50))
+        listed = recommend_schemes(user_profile, 50)
+    
+    assert streamed, "Synthetic catalog should have matching schemes"
+    assert len(streamed) == len(listed), "Generator should yield every recommended scheme"
+    assert sorted(s['scheme_id'] for s in streamed) == sorted(s['scheme_id'] for s in listed), \
+        "Generator and list should contain the same schemes"
+    print(f"✓ Streamed {len(streamed)} schemes matching the list result")
+    
+    return True
+
+
+def test_pruned_matches_equal_full_scan():
+    """Test that partition pruning returns exactly the schemes a full scan scores"""
+    print("\n=== Testing iter_recommendation_matches() pruning ===")
+    
+    profiles = [
+        {"state": "Bihar", "income": 90000, "category": "Education", "age": 20, "caste_category": "SC"},
+        {"state": "Kerala", "income": 300000, "category": "Agriculture", "age": 45, "caste_category": "General"},
+        {"state": "All", "income": 150000, "category": "Health", "age": 70, "caste_category": "OBC"}
+    ]
+    
+    high_matches = 0
+    with synthetic_catalog(5000) as catalog:
+        for user_profile in profiles:
+            for min_match_score in (0, 50, 80, 95, 100):
+                full_scan = [
+                    (index,) + match
+                    for index, scheme in enumerate(catalog.schemes)
+                    for match in [match_scheme(scheme, user_profile, min_match_score)]
+                    if match is not None
+                ]
+                pruned = list(iter_recommendation_matches(user_profile, min_match_score, catalog))
+                assert pruned == full_scan, f"Pruned matches should equal a full scan at {min_match_score}"
+                if min_match_score == 95:
+                    high_matches += len(pruned)
+            print(f"✓ {user_profile['state']}/{user_profile['category']}: pruned results match the full scan")
+    
+    assert high_matches > 0, "The default threshold should keep some schemes, or the check proves nothing"
+    print(f"✓ {high_matches} matches at the default threshold of 95")
+    
+    return True
+
+
+def test_recommendation_delta():
+    """Test that applying a delta gives the same result as recommending again"""
+    print("\n=== Testing recommendation_delta() ===")
+    
+    base = {"state": "Bihar", "income": 90000, "category": "Education", "age": 20, "caste_category": "SC"}
+    changes = [
+        {"income": 450000}, {"age": 65}, {"state": "Kerala"},
+        {"category": "Agriculture"}, {"category": "Health"}, {"caste_category": "General"},
+        {"age": 40, "income": 20000}
+    ]
+    
+    with synthetic_catalog() as catalog:
+        for change in changes:
+            updated = dict(base, **change)
+            for min_match_score in (95, 50):
+                expected = {match[0]: match[1:]
+                            for match in iter_recommendation_matches(updated, min_match_score, catalog)}
+                result = {match[0]: match[1:] for match in iter_recommendation_matches(base, min_match_score, catalog)}
+            
+                delta = recommendation_delta(base, updated, min_match_score, catalog)
+                assert delta['fields'] == [field for field in ("state", "income", "age", "category", "caste_category")
+                                           if field in change], "Delta should report the changed fields"
+                for index in delta['removed']:
+                    del result[index]
+                for match in delta['added'] + delta['updated']:
+                    result[match[0]] = match[1:]
+                assert result == expected, \
+                    f"Delta for {change} at {min_match_score} should match a full recommendation"
+            print(f"✓ {change}: {delta['candidates']} schemes scored, "
+                  f"+{len(delta['added'])} -{len(delta['removed'])} ~{len(delta['updated'])}")
+    
+        unchanged = recommendation_delta(base, dict(base), 50, catalog)
+        assert unchanged['candidates'] == 0 and not unchanged['added'], "An unchanged profile should score nothing"
+    
+    return True
+
+
 def test_validate_user_profile():
     """Test user profile validation"""
     print("\n=== Testing validate_user_profile() ===")
@@ -242,6 +354,9 @@ def run_all_tests():
         test_recommend_schemes_basic,
         test_recommend_schemes_filtering,
         test_recommend_schemes_scoring,
+        test_iter_recommendations_matches_list,
+        test_pruned_matches_equal_full_scan,
+        test_recommendation_delta,
         test_validate_user_profile,
         test_categorize_by_priority,
         # test_check_eligibility_changes,
@@ -0,0 +1,86 @@
+"""
+Unit tests for SchemeAssist AI recommendation reports
+Tests profile sources and batch rendering with and without a process pool
+"""
+
+import sys
+import os
+import re
+import json
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+repo_path = os.path.dirname(backend_path)
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
+
+import recommender # type: ignore
+from benchmarks.synthetic import generate_profiles, write_data_dir # type: ignore
+from reports.report_generator import generate_reports, iter_profile_file, iter_user_profiles # type: ignore
+
+
+def test_profile_sources():
+    """Test reading profiles from users.json and JSON Lines files"""
+    print("\n=== Testing report sources ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        users_file = os.path.join(tmp, 'users.json')
+        with open(users_file, 'w', encoding='utf-8') as f:
+            json.dump({'asha': {'profile': {'state': 'Bihar', 'income': 90000, 'category': 'Health'}},
+                       'no_profile': {'profile': {}}}, f)
+        users = list(iter_user_profiles(users_file))
+        assert [report_id for report_id, _ in users] == ['asha'], "Users without a profile should be skipped"
+        assert users[0][1]['name'] == 'asha', "Reports should be named after the user"
+
+        profiles_file = os.path.join(tmp, 'village.jsonl')
+        with open(profiles_file, 'w', encoding='utf-8') as f:
+            f.write('{"state": "Bihar", "income": 1, "category": "Health"}\n\n{"id": "x7", "state": "Kerala"}\n')
+        assert [report_id for report_id, _ in iter_profile_file(profiles_file)] == ['profile-1', 'x7'], \
+            "Profiles should get ids in file order"
+        print(f"✓ Read {len(users)} user and 2 file profiles")
+
+    return True
+
+
+def test_generate_reports_inline_and_pool():
+    """Test that reports render the same in-process and in a process pool"""
+    print("\n=== Testing generate_reports() ===")
+    catalog_path = recommender.CATALOG_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(os.path.join(tmp, 'data'), 300), 'combined_schemes.csv')
+            items = [(f"resident-{index}", profile) for index, profile in enumerate(generate_profiles(25))]
+            items.append(('broken <b>', {'state': 'Bihar'}))
+
+            inline = generate_reports(iter(items), os.path.join(tmp, 'inline'), workers=0, chunk_size=10,
+                                      min_match_score=50)
+            pooled = generate_reports(iter(items), os.path.join(tmp, 'pooled'), workers=2, chunk_size=10,
+                                      min_match_score=50)
+
+            assert inline['reports'] == pooled['reports'] == 25, "Every valid profile should get a report"
+            assert inline['schemes'] == pooled['schemes'] > 0, "Reports should list matching schemes"
+            assert inline['skipped'] == 1 and inline['bundles'] == 3, "Invalid profiles are skipped, one bundle per chunk"
+            assert set(inline) == {'catalog_version', 'reports', 'schemes', 'skipped', 'bundles', 'seconds'}, \
+                "The summary should only hold counts"
+
+            with open(os.path.join(tmp, 'inline', 'print-00001.html'), encoding='utf-8') as f:
+                assert f.read().count('class="report"') == 10, "Bundle should hold one page per report"
+            indexes = []
+            for run in ('inline', 'pooled'):
+                assert sorted(name for name in os.listdir(os.path.join(tmp, run)) if name.startswith('.')) == [], \
+                    "Spooled index entries should be removed"
+                with open(os.path.join(tmp, run, 'index.html'), encoding='utf-8') as f:
+                    indexes.append(f.read())
+            rows = re.findall(r'<tr>\s*<td>.*?</tr>', indexes[0], re.S)
+            assert len(rows) == 25 and 'resident-0.html' in rows[0], "The index should list reports in input order"
+            assert rows == re.findall(r'<tr>\s*<td>.*?</tr>', indexes[1], re.S), "Pool and inline indexes should match"
+            assert 'print-00003.html' in indexes[0], "The index should link the print bundles"
+            assert 'broken &lt;b&gt;' in indexes[0], "Report ids should be HTML-escaped"
+            print(f"✓ {inline['reports']} reports, {inline['schemes']} scheme rows, "
+                  f"{inline['bundles']} print bundles")
+        finally:
+            recommender.CATALOG_PATH = catalog_path
+
+    return True
@@ -0,0 +1,104 @@
+"""
+Unit tests for the SchemeAssist AI response serialisers
+Tests the cached per-scheme JSON fragments
+"""
+
+import sys
+import os
+import json
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from recommender import Catalog, build_recommendation # type: ignore
+import serializers # type: ignore
+from serializers import recommendation_fragment, scheme_fragment, fragments_response, columnar_payload, project # type: ignore
+
+SAMPLE_SCHEME = {
+    "scheme_id": "S1", "scheme_name": "Pradhan Mantri \"Awas\" Yojana", "level": "Central", "state": "All",
+    "category": "Housing", "min_age": "18", "max_age": "70", "min_income": "0", "max_income": "300000",
+    "target_group": "SC Families", "benefits": "Housing subsidy", "is_active": "Yes", "last_updated": "2026-01-01"
+}
+
+
+def test_recommendation_fragment_matches_record():
+    """Test that spliced fragments decode to the same record as build_recommendation"""
+    print("\n=== Testing recommendation_fragment() ===")
+    catalog = Catalog("test", [SAMPLE_SCHEME])
+
+    for match in [(0, 95, True, True), (0, 40, False, True)]:
+        decoded = json.loads(recommendation_fragment(catalog, match))
+        assert decoded == build_recommendation(SAMPLE_SCHEME, *match[1:]), "Fragment should match the record"
+
+    assert len(catalog.derived('recommendation_fragments', dict)) == 1, "Static part should be cached once"
+    print("✓ Fragments decode to the full recommendation record")
+
+    return True
+
+
+def test_fragments_response_builds_valid_json():
+    """Test that an envelope and fragments combine into one JSON document"""
+    print("\n=== Testing fragments_response() ===")
+    catalog = Catalog("test", [SAMPLE_SCHEME, dict(SAMPLE_SCHEME, scheme_id="S2")])
+
+    response = fragments_response({"success": True, "count": 2}, "schemes",
+                                  [scheme_fragment(catalog, 0), scheme_fragment(catalog, 1)])
+    body = json.loads(response.get_data())
+    assert body["count"] == 2 and len(body["schemes"]) == 2, "All fragments should be in the list"
+    assert body["schemes"][1]["scheme_id"] == "S2", "Fragments should keep their order"
+
+    empty = json.loads(fragments_response({}, "schemes", []).get_data())
+    assert empty == {"schemes": []}, "Empty envelope should still be valid JSON"
+    print("✓ Response body is valid JSON")
+
+    return True
+
+
+def test_columnar_payload_lists_fields_once():
+    """Test the columnar layout and field projection"""
+    print("\n=== Testing columnar_payload() / project() ===")
+    records = [
+        {"scheme_name": "A", "score": 95, "state": "All"},
+        {"scheme_name": "B", "score": 90, "state": "Kerala"}
+    ]
+
+    payload = columnar_payload(records)
+    assert payload["fields"] == ["scheme_name", "score", "state"], "Field names should be listed once"
+    assert payload["values"][1] == ["B", 90, "Kerala"], "Values should follow the field order"
+
+    projected = [project(record, ["score", "missing"]) for record in records]
+    assert projected[0] == {"score": 95}, "Projection should keep only known requested fields"
+    assert columnar_payload([], ["score"]) == {"fields": ["score"], "values": []}, "Empty list keeps fields"
+    print("✓ Columnar layout and projection work")
+
+    return True
+
+
+def test_msgpack_is_optional():
+    """Test that MessagePack is only negotiated when msgpack is installed"""
+    print("\n=== Testing response_format() without msgpack ===")
+    from flask import Flask
+
+    app = Flask(__name__)
+    catalog = Catalog("test", [SAMPLE_SCHEME])
+    installed = serializers.msgpack
+    try:
+        serializers.msgpack = None
+        with app.test_request_context(headers={'Accept': serializers.MSGPACK_MIMETYPE}):
+            assert serializers.response_format() == 'json', "msgpack should not be offered when missing"
+            response = serializers.scheme_list_response('msgpack', {'success': True}, 'schemes', catalog, [0],
+                                                        scheme_fragment, serializers.scheme_record)
+            assert response.mimetype == 'application/json', "A msgpack request should fall back to JSON"
+            assert json.loads(response.get_data())['schemes'] == [SAMPLE_SCHEME], "The JSON body should be complete"
+        print("✓ Falls back to JSON without msgpack")
+    finally:
+        serializers.msgpack = installed
+
+    if installed is not None:
+        with app.test_request_context(headers={'Accept': serializers.MSGPACK_MIMETYPE}):
+            assert serializers.response_format() == 'msgpack', "msgpack should be offered when installed"
+        print("✓ Negotiated when msgpack is installed")
+
+    return True
@@ -0,0 +1,64 @@
+"""
+Unit tests for SchemeAssist AI single-flight coalescing
+Tests that concurrent identical calls share one computation
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from singleflight import SingleFlight, canonical_key # type: ignore
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that identical concurrent calls are coalesced"""
+    print("\n=== Testing SingleFlight.do() - Coalescing ===")
+    flight = SingleFlight('test')
+    executions = []
+    results = []
+
+    def compute():
+        executions.append(1)
+        time.sleep(0.2)
+        return ('result',)
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1, "Computation should run once"
+    assert results == [('result',)] * 8, "Every caller should get the shared result"
+    stats = flight.stats()
+    assert stats['coalesced'] == 7 and stats['in_flight'] == 0, "Seven calls should have been coalesced"
+    print(f"✓ 8 calls, {stats['executions']} execution")
+
+    return True
+
+
+def test_errors_propagate_and_are_not_cached():
+    """Test that a failure reaches every waiter and the next call runs again"""
+    print("\n=== Testing SingleFlight.do() - Errors ===")
+    flight = SingleFlight('test')
+
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        flight.do('key', fail)
+        assert False, "Error should propagate"
+    except ValueError:
+        pass
+
+    assert flight.do('key', lambda: 42) == 42, "Completed calls should not be cached"
+    assert canonical_key({'b': 1, 'a': 2}) == canonical_key({'a': 2, 'b': 1}), "Keys should be order independent"
+    print("✓ Errors propagate and results are not cached")
+
+    return True
@@ -0,0 +1,309 @@
+"""
+Unit tests for the SchemeAssist AI storage layer
+Tests the JSON file helpers and the write-behind store
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from storage import JSONFileBackend, ShardedJSONBackend, WriteBehindStore, load_json_file, save_json_file, read_cache_stats, readonly_items, iter_json_object # type: ignore
+
+
+def make_store(**kwargs):
+    """Create a write-behind store over a fresh temporary file"""
+    filepath = os.path.join(tempfile.mkdtemp(), 'store.json')
+    return filepath, WriteBehindStore(JSONFileBackend(filepath), **kwargs)
+
+
+def test_save_and_load_json_file():
+    """Test that saved data round-trips through load_json_file"""
+    print("\n=== Testing save_json_file() / load_json_file() ===")
+    filepath = os.path.join(tempfile.mkdtemp(), 'data.json')
+
+    assert load_json_file(filepath) == {}, "Missing file should load as empty dict"
+    save_json_file(filepath, {"user": ["Scheme A"]})
+    assert load_json_file(filepath) == {"user": ["Scheme A"]}, "Data should round-trip"
+    print("✓ JSON data round-trips")
+
+    return True
+
+
+def test_write_behind_coalesces_mutations():
+    """Test that a burst of mutations costs a single write"""
+    print("\n=== Testing WriteBehindStore - Coalescing ===")
+    filepath, store = make_store(flush_interval=60, max_pending=100)
+
+    for i in range(5):
+        store.mutate('user', lambda favs, i=i: favs.append(f"Scheme {i}") or True)
+
+    assert not os.path.exists(filepath), "Nothing should be written before the flush"
+    assert len(store.get('user')) == 5, "Pending mutations should be readable"
+
+    store.flush()
+    with open(filepath, encoding='utf-8') as f:
+        assert len(json.load(f)['user']) == 5, "Flush should persist all mutations"
+
+    stats = store.stats()
+    assert stats['flushes'] == 1, "Five mutations should cost one flush"
+    assert stats['coalescing_ratio'] == 5.0, "Coalescing ratio should be 5"
+    print(f"✓ 5 mutations coalesced into {stats['flushes']} write")
+
+    return True
+
+
+def test_write_behind_flushes_at_max_pending():
+    """Test that reaching max_pending forces a flush"""
+    print("\n=== Testing WriteBehindStore - Max pending ===")
+    filepath, store = make_store(flush_interval=60, max_pending=3)
+
+    for i in range(3):
+        store.mutate(f"user{i}", lambda favs: favs.append("Scheme") or True)
+
+    # The flush runs on the background flusher, not on the mutating thread
+    deadline = time.time() + 5
+    while store.stats()['flushes'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.stats()['flushes'] == 1, "Third mutation should trigger a flush"
+    assert len(load_json_file(filepath)) == 3, "All users should be persisted"
+    print("✓ Flush triggered at max_pending")
+
+    return True
+
+
+def test_write_behind_skips_unchanged():
+    """Test that no-op mutations do not schedule writes"""
+    print("\n=== Testing WriteBehindStore - No-op mutations ===")
+    filepath, store = make_store(flush_interval=60)
+
+    result = store.mutate('user', lambda favs: False)
+    assert result == [], "No-op mutation should return the default record"
+    assert store.stats()['pending_mutations'] == 0, "No-op mutation should not be pending"
+    print("✓ Unchanged records are not written")
+
+    return True
+
+
+def test_write_behind_keeps_other_workers_changes():
+    """Test that two stores (workers) changing one record in the same window both persist"""
+    print("\n=== Testing WriteBehindStore - Concurrent workers ===")
+    directory = tempfile.mkdtemp()
+    first = WriteBehindStore(ShardedJSONBackend(directory, shards=4), flush_interval=60)
+    second = WriteBehindStore(ShardedJSONBackend(directory, shards=4), flush_interval=60)
+
+    first.mutate('alice', lambda favs: favs.append("Scheme A") or True)
+    second.mutate('alice', lambda favs: favs.append("Scheme B") or True)
+    first.flush()
+    second.flush()
+
+    stored = ShardedJSONBackend(directory, shards=4).read('alice')
+    assert sorted(stored) == ["Scheme A", "Scheme B"], "The later flush should not overwrite the earlier one"
+    assert sorted(first.get('alice')) == ["Scheme A", "Scheme B"], "Flushed records should be read back"
+    print(f"✓ Both workers' changes kept: {stored}")
+
+    return True
+
+
+def test_write_behind_flush_does_not_block_mutations():
+    """Test that the disk write runs outside the store lock and failed batches are kept"""
+    print("\n=== Testing WriteBehindStore - Flush outside the lock ===")
+    import threading
+    filepath, store = make_store(flush_interval=60, max_pending=100)
+    writing, release = threading.Event(), threading.Event()
+    update = store.backend.update
+    state = {'fail': True}
+
+    def slow_update(changes):
+        writing.set()
+        release.wait(5)
+        if state['fail']:
+            raise OSError("disk full")
+        update(changes)
+
+    store.backend.update = slow_update
+    store.mutate('user', lambda favs: favs.append("Scheme A") or True)
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    assert writing.wait(5), "Flush should reach the backend"
+
+    # The backend write is in flight; readers and writers must not wait for it
+    store.mutate('user', lambda favs: favs.append("Scheme B") or True)
+    assert store.get('user') == ["Scheme A", "Scheme B"], "Mutations should apply during a flush"
+    release.set()
+    flusher.join(5)
+
+    stats = store.stats()
+    assert stats['flush_errors'] == 1 and stats['pending_mutations'] == 2, "Failed batch should be merged back"
+    state['fail'] = False
+    store.flush()
+    assert load_json_file(filepath)['user'] == ["Scheme A", "Scheme B"], "Retried batch should keep mutation order"
+    assert store.stats()['pending_mutations'] == 0, "Nothing should remain pending"
+    print("✓ Flush writes outside the lock and retries failed batches in order")
+
+    return True
+
+
+def test_sharded_backend_writes_only_touched_shards():
+    """Test that the sharded backend routes keys to their own shard files"""
+    print("\n=== Testing ShardedJSONBackend - Routing ===")
+    directory = tempfile.mkdtemp()
+    backend = ShardedJSONBackend(directory, shards=8)
+
+    backend.write({"alice": ["Scheme A"], "bob": ["Scheme B"]})
+
+    assert backend.read("alice") == ["Scheme A"], "Record should be readable after write"
+    assert backend.read("carol") is None, "Unknown key should read as None"
+    shard = load_json_file(backend.shard_path("alice"))
+    assert set(shard) <= {"alice", "bob"}, "Shard should only hold hashed keys"
+    assert len(os.listdir(directory)) <= 4, "Only touched shards (and locks) should exist"
+    print(f"✓ Keys routed to {len(set(map(backend.shard_path, ['alice', 'bob'])))} shard(s)")
+
+    return True
+
+
+def test_sharded_backend_reads_legacy_file():
+    """Test the compatibility reader for the single-file layout"""
+    print("\n=== Testing ShardedJSONBackend - Legacy layout ===")
+    directory = tempfile.mkdtemp()
+    legacy_file = os.path.join(directory, 'legacy.json')
+    save_json_file(legacy_file, {"alice": ["Old Scheme"], "bob": ["Other"]})
+    backend = ShardedJSONBackend(os.path.join(directory, 'shards'), legacy_file=legacy_file, shards=4)
+
+    assert backend.read("alice") == ["Old Scheme"], "Legacy record should be readable"
+    backend.write({"alice": ["New Scheme"]})
+    assert backend.read("alice") == ["New Scheme"], "Shard record should win over legacy"
+
+    assert backend.migrate_legacy() == 1, "Only bob should need migrating"
+    assert load_json_file(backend.shard_path("bob"))["bob"] == ["Other"], "bob should be in a shard"
+    print("✓ Legacy single-file records are read and migrated")
+
+    return True
+
+
+def test_load_json_file_cache_is_copy_on_write():
+    """Test that callers cannot corrupt cached file contents"""
+    print("\n=== Testing load_json_file() - Copy-on-write cache ===")
+    filepath = os.path.join(tempfile.mkdtemp(), 'data.json')
+    save_json_file(filepath, {"user": ["Scheme A"], "other": ["Scheme B"]})
+
+    first = load_json_file(filepath)
+    first["user"].append("Scheme C")
+    first["new_user"] = []
+    for key in first:
+        first[key].append("Leaked")
+    for copied in (dict(load_json_file(filepath)), {**load_json_file(filepath)}):
+        copied["other"].append("Leaked")
+
+    second = load_json_file(filepath)
+    assert second == {"user": ["Scheme A"], "other": ["Scheme B"]}, "Cache should be unaffected by caller mutations"
+    print("✓ Mutating a loaded view leaves the cache intact")
+
+    shared = dict(readonly_items(load_json_file(filepath)))
+    assert shared["user"] is dict(readonly_items(second))["user"], "readonly_items should not copy values"
+    fresh = load_json_file(filepath)
+    assert dict(fresh.items())["other"] is shared["other"], "items() should not copy the values"
+    try:
+        fresh.items().mapping["user"] = []
+        assert False, "items() should be a read-only view"
+    except TypeError:
+        pass
+    assert sorted(fresh.values()) == [["Scheme A"], ["Scheme B"]], "values() should list every record"
+    print("✓ Read-only scans share the cached values")
+
+    return True
+
+
+def test_load_json_file_cache_revalidates():
+    """Test that the cache sees writes from save_json_file and other writers"""
+    print("\n=== Testing load_json_file() - Revalidation ===")
+    filepath = os.path.join(tempfile.mkdtemp(), 'data.json')
+    save_json_file(filepath, {"user": ["Scheme A"]})
+
+    hits = read_cache_stats()['hits']
+    assert load_json_file(filepath) == {"user": ["Scheme A"]}, "Saved data should be served"
+    assert read_cache_stats()['hits'] == hits + 1, "Read after save should hit the cache"
+
+    data = load_json_file(filepath)
+    data["user"].append("Scheme B")
+    save_json_file(filepath, data)
+    assert load_json_file(filepath)["user"] == ["Scheme A", "Scheme B"], "Cache should follow saves"
+
+    # Simulate another process rewriting the file
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump({"user": ["Changed elsewhere"]}, f)
+    assert load_json_file(filepath)["user"] == ["Changed elsewhere"], "External writes should invalidate the cache"
+    print("✓ Cache revalidated on save and on external change")
+
+    return True
+
+
+def test_write_behind_mutate_many_is_atomic():
+    """Test that a batch is applied in one flush, or not at all"""
+    print("\n=== Testing WriteBehindStore.mutate_many() ===")
+    filepath, store = make_store(flush_interval=60, max_pending=100)
+
+    result = store.mutate_many([
+        ('alice', lambda favs: favs.append("Scheme A") or True),
+        ('alice', lambda favs: favs.append("Scheme B") or True),
+        ('bob', lambda favs: favs.append("Scheme C") or True)
+    ])
+    assert result == {'alice': ["Scheme A", "Scheme B"], 'bob': ["Scheme C"]}, "Batch result should hold all users"
+    assert store.stats()['flushes'] == 1, "Batch should be written in one flush"
+    assert load_json_file(filepath)['alice'] == ["Scheme A", "Scheme B"], "Batch should be durable"
+
+    def fail(favs):
+        raise ValueError("bad operation")
+
+    try:
+        store.mutate_many([('alice', lambda favs: favs.clear() or True), ('alice', fail)])
+        assert False, "Failing batch should raise"
+    except ValueError:
+        pass
+    assert store.get('alice') == ["Scheme A", "Scheme B"], "Failed batch should not be applied"
+
+    def broken_update(changes):
+        raise OSError("disk full")
+
+    update, store.backend.update = store.backend.update, broken_update
+    try:
+        store.mutate_many([('bob', lambda favs: favs.append("Scheme D") or True)])
+        assert False, "Batch whose write fails should raise"
+    except OSError:
+        pass
+    assert store.stats()['pending_mutations'] == 1, "Unwritten batch should stay pending for retry"
+    store.backend.update = update
+    store.flush()
+    assert load_json_file(filepath)['bob'] == ["Scheme C", "Scheme D"], "Retried batch should be durable"
+    print("✓ Batches are applied atomically with one write")
+
+    return True
+
+
+def test_iter_json_object_streams_pairs():
+    """Test that a JSON object file is read pair by pair across block boundaries"""
+    print("\n=== Testing iter_json_object() ===")
+    filepath = os.path.join(tempfile.mkdtemp(), 'users.json')
+    data = {f"user{n}": {"profile": {"income": n * 1000.5, "tags": ["a", "}"]}, "n": -n} for n in range(50)}
+    data["empty"] = {}
+    save_json_file(filepath, data)
+    for block_size in (1, 7, 4096):
+        assert list(iter_json_object(filepath, block_size)) == list(data.items()), \
+            f"Pairs should round-trip with {block_size}-character blocks"
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('{"a": 1, "b": ')
+    try:
+        list(iter_json_object(filepath))
+        assert False, "Truncated files should raise"
+    except ValueError:
+        pass
+    print(f"✓ {len(data)} pairs streamed")
+
+    return True
@@ -0,0 +1,49 @@
+"""
+Unit tests for SchemeAssist AI stage timers
+Tests exclusive stage times and the Server-Timing header format
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+
+from timing import current_timer, stage, start_timer, stop_timer # type: ignore
+
+
+def test_nested_stages_are_exclusive():
+    """Test that time in a nested stage is not counted twice"""
+    print("\n=== Testing StageTimer - Nested stages ===")
+    timer, token = start_timer()
+    try:
+        with stage('filter'):
+            with stage('score'):
+                time.sleep(0.05)
+            timer.add('score', 0.01)
+    finally:
+        stop_timer(token)
+
+    assert timer.durations['score'] >= 0.06, "Nested and added time should count for score"
+    assert timer.durations['filter'] < 0.02, "Filter should exclude the nested score time"
+    header = timer.header()
+    assert header.startswith('filter;dur=') or header.startswith('score;dur='), "Header should list stages"
+    assert 'total;dur=' in header, "Header should end with the total"
+    print(f"✓ Server-Timing: {header}")
+
+    return True
+
+
+def test_stage_without_timer_is_noop():
+    """Test that stages outside a timed request record nothing"""
+    print("\n=== Testing stage() - No active timer ===")
+    assert current_timer() is None, "No timer should be active"
+    with stage('filter'):
+        pass
+    assert current_timer() is None, "stage() should not start a timer"
+    print("✓ stage() is a no-op outside timed requests")
+
+    return True
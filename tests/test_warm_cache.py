@@ -0,0 +1,70 @@
+"""
+Unit tests for SchemeAssist AI warm recommendation cache
+Tests entry freshness and the catalog change marker shared between
+processes
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import backend modules
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+repo_path = os.path.dirname(backend_path)
+if repo_path not in sys.path:
+    sys.path.insert(0, repo_path)
+
+import recommender # type: ignore
+import warm_cache # type: ignore
+from warm_cache import build_cache_profile, chunks, claim_catalog_change, compute_entry, is_fresh # type: ignore
+from benchmarks.synthetic import write_data_dir # type: ignore
+
+PROFILE = {'state': 'Bihar', 'income': 90000, 'category': 'Education', 'age': 20}
+
+
+def test_entry_freshness():
+    """Test that entries go stale on profile, catalog and age changes"""
+    print("\n=== Testing warm cache freshness ===")
+    catalog_path = recommender.CATALOG_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            recommender.CATALOG_PATH = os.path.join(write_data_dir(os.path.join(tmp, 'data'), 200), 'combined_schemes.csv')
+            assert build_cache_profile({'state': 'Bihar'}) is None, "Incomplete profiles should not be cached"
+            assert compute_entry({'state': 'Bihar'}) is None, "Incomplete profiles should have no entry"
+
+            entry = compute_entry(PROFILE)
+            version = recommender.get_catalog_version()
+            assert entry['catalog_version'] == version, "Entry should record the catalog version"
+            assert all(r['score'] >= warm_cache.WARM_CACHE_MIN_MATCH_SCORE for r in entry['recommendations']), \
+                "Cached recommendations should respect the minimum score"
+            assert is_fresh(entry, PROFILE, version), "A new entry should be fresh"
+            assert is_fresh(entry, dict(PROFILE, name='Asha'), version), \
+                "Fields that do not affect recommendations should not invalidate the entry"
+            assert not is_fresh(entry, dict(PROFILE, income=500000), version), "Profile changes should invalidate"
+            assert not is_fresh(entry, PROFILE, 'other-version'), "Catalog changes should invalidate"
+            assert not is_fresh(entry, PROFILE, version, now=entry['computed_at'] + warm_cache.WARM_CACHE_MAX_AGE), \
+                "Old entries should be recomputed"
+            assert not is_fresh(None, PROFILE, version), "Missing entries are not fresh"
+            print(f"✓ Entry with {len(entry['recommendations'])} recommendations, {len(entry['alerts'])} alerts")
+        finally:
+            recommender.CATALOG_PATH = catalog_path
+
+    return True
+
+
+def test_claim_catalog_change():
+    """Test that one caller claims each catalog change and the first start is ignored"""
+    print("\n=== Testing claim_catalog_change() ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        assert not claim_catalog_change(tmp, 'v1'), "First start should only record the version"
+        assert not claim_catalog_change(tmp, 'v1'), "Unchanged catalog should not be claimed"
+        assert claim_catalog_change(tmp, 'v2'), "A new catalog version should be claimed"
+        assert not claim_catalog_change(tmp, 'v2'), "A change should be claimed only once"
+        print("✓ Catalog changes claimed once")
+
+    assert chunks(list(range(5)), 2) == [[0, 1], [2, 3], [4]], "chunks should split in order"
+    print("✓ Users split into batches")
+
+    return True